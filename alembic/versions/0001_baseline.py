@@ -0,0 +1,202 @@
+"""Baseline schema
+
+Every table the app used to create with Base.metadata.create_all at startup.
+Tables that already exist are skipped, so databases created the old way upgrade
+cleanly and end up stamped at this revision.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create(name, *columns, indexes=()):
+    """Create a table plus its indexes unless it already exists (legacy create_all databases)"""
+    if sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade():
+    _create(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("microsoft_token", sa.Text(), nullable=True),
+        sa.Column("microsoft_refresh_token", sa.Text(), nullable=True),
+        indexes=[
+            ("ix_users_id", ["id"], False),
+            ("ix_users_email", ["email"], True),
+        ],
+    )
+
+    _create(
+        "tracks",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("artist_name", sa.String(), nullable=False),
+        sa.Column("isrc", sa.String(), nullable=True),
+        sa.Column("spotify_id", sa.String(), nullable=True),
+        sa.Column("tiktok_id", sa.String(), nullable=True),
+        sa.Column("image_url", sa.String(), nullable=True),
+        sa.Column("spotify_url", sa.String(), nullable=True),
+        sa.Column("tiktok_url", sa.String(), nullable=True),
+        sa.Column("spotify_popularity", sa.Integer(), nullable=True),
+        sa.Column("first_discovered", sa.DateTime(), nullable=True),
+        sa.Column("last_updated", sa.DateTime(), nullable=True),
+        indexes=[
+            ("ix_tracks_title", ["title"], False),
+            ("ix_tracks_artist_name", ["artist_name"], False),
+            ("ix_tracks_isrc", ["isrc"], False),
+            ("ix_tracks_spotify_id", ["spotify_id"], False),
+            ("ix_tracks_artist_title", ["artist_name", "title"], False),
+        ],
+    )
+
+    _create(
+        "track_metrics",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("track_id", sa.String(), sa.ForeignKey("tracks.id"), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("spotify_streams", sa.Integer(), nullable=True),
+        sa.Column("spotify_streams_7d", sa.Integer(), nullable=True),
+        sa.Column("spotify_streams_30d", sa.Integer(), nullable=True),
+        sa.Column("spotify_playlist_count", sa.Integer(), nullable=True),
+        sa.Column("spotify_chart_position", sa.Integer(), nullable=True),
+        sa.Column("spotify_chart_country", sa.String(), nullable=True),
+        sa.Column("tiktok_posts", sa.Integer(), nullable=True),
+        sa.Column("tiktok_posts_7d", sa.Integer(), nullable=True),
+        sa.Column("tiktok_posts_30d", sa.Integer(), nullable=True),
+        sa.Column("tiktok_views", sa.Integer(), nullable=True),
+        sa.Column("tiktok_views_7d", sa.Integer(), nullable=True),
+        sa.Column("tiktok_views_30d", sa.Integer(), nullable=True),
+        sa.Column("tiktok_chart_position", sa.Integer(), nullable=True),
+        indexes=[
+            ("ix_track_metrics_track_id", ["track_id"], False),
+            ("ix_track_metrics_timestamp", ["timestamp"], False),
+            ("ix_track_metrics_track_timestamp", ["track_id", "timestamp"], False),
+        ],
+    )
+
+    _create(
+        "track_scores",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("track_id", sa.String(), sa.ForeignKey("tracks.id"), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.Column("trending_score", sa.Float(), nullable=True),
+        sa.Column("evergreen_score", sa.Float(), nullable=True),
+        sa.Column("components", sa.JSON(), nullable=True),
+        sa.Column("why_selected", sa.JSON(), nullable=True),
+        sa.Column("risk_flags", sa.JSON(), nullable=True),
+        indexes=[
+            ("ix_track_scores_track_id", ["track_id"], False),
+            ("ix_track_scores_computed_at", ["computed_at"], False),
+            ("ix_track_scores_trending", ["trending_score"], False),
+            ("ix_track_scores_evergreen", ["evergreen_score"], False),
+            ("ix_track_scores_track_computed", ["track_id", "computed_at"], False),
+        ],
+    )
+
+    _create(
+        "shortlists",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("track_id", sa.String(), sa.ForeignKey("tracks.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("added_at", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("priority", sa.Integer(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("contacted_at", sa.DateTime(), nullable=True),
+        sa.Column("last_updated", sa.DateTime(), nullable=True),
+        indexes=[
+            ("ix_shortlists_track_id", ["track_id"], False),
+            ("ix_shortlists_status", ["status"], False),
+            ("ix_shortlists_status_priority", ["status", "priority"], False),
+            ("ix_shortlists_user_added", ["user_id", "added_at"], False),
+        ],
+    )
+
+    _create(
+        "discovery_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("run_type", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("tracks_processed", sa.Integer(), nullable=True),
+        sa.Column("tracks_new", sa.Integer(), nullable=True),
+        sa.Column("tracks_updated", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("config", sa.JSON(), nullable=True),
+        indexes=[
+            ("ix_discovery_runs_type_started", ["run_type", "started_at"], False),
+        ],
+    )
+
+    _create(
+        "pinned_songs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("song_name", sa.String(), nullable=False),
+        sa.Column("artist_name", sa.String(), nullable=False),
+        sa.Column("spotify_id", sa.String(), nullable=True),
+        sa.Column("song_image_url", sa.String(), nullable=True),
+        sa.Column("label_name", sa.String(), nullable=True),
+        sa.Column("pin_position", sa.Integer(), nullable=False, unique=True),
+        sa.Column("pinned_by", sa.String(), nullable=True),
+        sa.Column("pinned_at", sa.DateTime(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        indexes=[
+            ("ix_pinned_songs_id", ["id"], False),
+        ],
+    )
+
+    _create(
+        "discovery_cache",
+        sa.Column("cache_key", sa.String(), primary_key=True),
+        sa.Column("namespace", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        indexes=[
+            ("ix_discovery_cache_namespace", ["namespace"], False),
+            ("ix_discovery_cache_expires_at", ["expires_at"], False),
+        ],
+    )
+
+    _create(
+        "job_locks",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("owner", sa.String(), nullable=True),
+        sa.Column("acquired_at", sa.DateTime(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    for name in [
+        "job_locks",
+        "discovery_cache",
+        "pinned_songs",
+        "discovery_runs",
+        "shortlists",
+        "track_scores",
+        "track_metrics",
+        "tracks",
+        "users",
+    ]:
+        op.drop_table(name)
@@ -0,0 +1,47 @@
+"""Mailbox header cache for delta sync
+
+Revision ID: 0002_mail_sync
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_mail_sync"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mail_messages",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("folder", sa.String(), nullable=False),
+        sa.Column("message_id", sa.String(), nullable=False),
+        sa.Column("conversation_id", sa.String(), nullable=True),
+        sa.Column("sort_date", sa.DateTime(), nullable=True),
+        sa.Column("header", sa.JSON(), nullable=False),
+        sa.Column("changed_at", sa.Float(), nullable=False),
+        sa.Column("removed", sa.Boolean(), nullable=False),
+        sa.UniqueConstraint("user_id", "folder", "message_id", name="uq_mail_messages_user_folder_message"),
+    )
+    op.create_index("ix_mail_messages_conversation_id", "mail_messages", ["conversation_id"])
+    op.create_index("ix_mail_messages_user_folder_date", "mail_messages", ["user_id", "folder", "sort_date"])
+    op.create_index("ix_mail_messages_user_folder_changed", "mail_messages", ["user_id", "folder", "changed_at"])
+
+    op.create_table(
+        "mail_sync_state",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("folder", sa.String(), primary_key=True),
+        sa.Column("delta_link", sa.Text(), nullable=True),
+        sa.Column("clock", sa.Float(), nullable=False),
+        sa.Column("synced_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("mail_sync_state")
+    op.drop_table("mail_messages")
@@ -0,0 +1,50 @@
+"""Full-text search index over synced mail
+
+SQLite FTS5 table keyed by mail_messages.id. Headers already in the cache are
+indexed right away; bodies arrive as folders resync.
+
+Revision ID: 0003_mail_search
+Revises: 0002_mail_sync
+Create Date: 2026-10-18
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_mail_search"
+down_revision = "0002_mail_sync"
+branch_labels = None
+depends_on = None
+
+
+def _participants(header):
+    people = [header.get("from")] + list(header.get("toRecipients") or [])
+    parts = []
+    for person in people:
+        address = (person or {}).get("emailAddress") or {}
+        parts.extend(value for value in (address.get("name"), address.get("address")) if value)
+    return " ".join(parts)
+
+
+def upgrade():
+    op.execute(
+        "CREATE VIRTUAL TABLE mail_search USING fts5("
+        "subject, participants, body, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, header FROM mail_messages WHERE removed = 0")).all()
+    for row_id, header in rows:
+        header = json.loads(header) if isinstance(header, str) else (header or {})
+        bind.execute(
+            sa.text("INSERT INTO mail_search (rowid, subject, participants, body) VALUES (:id, :subject, :participants, '')"),
+            {"id": row_id, "subject": header.get("subject") or "", "participants": _participants(header)},
+        )
+    # Force a full resync so bodies get indexed too
+    bind.execute(sa.text("UPDATE mail_sync_state SET delta_link = NULL"))
+
+
+def downgrade():
+    op.execute("DROP TABLE mail_search")
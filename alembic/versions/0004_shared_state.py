@@ -0,0 +1,31 @@
+"""Shared state store for multi-worker deployments
+
+Revision ID: 0004_shared_state
+Revises: 0003_mail_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_shared_state"
+down_revision = "0003_mail_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "shared_state",
+        sa.Column("namespace", sa.String(), primary_key=True),
+        sa.Column("key", sa.String(), primary_key=True),
+        sa.Column("value", sa.JSON(), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_shared_state_expires_at", "shared_state", ["expires_at"])
+
+
+def downgrade():
+    op.drop_table("shared_state")
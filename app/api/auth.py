@@ -1,21 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+import logging
 import secrets
+from typing import Optional
 
 from app.db.session import SessionLocal
 from app.models.user import User
+from app.core.config import settings
+from app.core.state_store import get_state_store
 from app.core.security import (
     verify_password, 
     create_access_token, 
     get_auth_url,
     get_token_from_code,
-    get_user_info
+    get_user_info,
+    invalidate_user,
+    verify_token
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/auth",
     tags=["auth"]
@@ -24,8 +32,11 @@ router = APIRouter(
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
-# Store states temporarily (in production, use Redis or database)
-oauth_states = {}
+# Logout works with or without a bearer token
+optional_bearer = HTTPBearer(auto_error=False)
+
+# Pending login states live in the shared store, so the callback may land on any worker
+OAUTH_STATE_NAMESPACE = "oauth_state"
 
 def get_db():
     db = SessionLocal()
@@ -49,6 +60,7 @@ def login(
             detail="Invalid credentials"
         )
 
+    invalidate_user(user.email)  # Fresh login - don't serve a stale cached user
     token = create_access_token({
         "sub": user.email,
         "role": user.role
@@ -62,17 +74,13 @@ def login(
 @router.get("/microsoft/login")
 async def microsoft_login():
     """Initiate Microsoft OAuth login flow"""
-    print("=== Microsoft Login Initiated ===")
-    
     # Generate a random state for CSRF protection
     state = secrets.token_urlsafe(32)
-    oauth_states[state] = True  # Store state temporarily
+    get_state_store().put(OAUTH_STATE_NAMESPACE, state, True, ttl_seconds=settings.OAUTH_STATE_TTL_SECONDS)
     
     # Get Microsoft login URL
     auth_url = get_auth_url(state)
-    
-    print(f"Auth URL: {auth_url}")
-    print(f"State: {state}")
+    logger.info("🔐 Microsoft login initiated")
     
     return {"auth_url": auth_url}
 
@@ -85,12 +93,8 @@ async def microsoft_callback(
     error_description: str = None
 ):
     """Handle Microsoft OAuth callback"""
-    print(f"=== Microsoft Callback Called ===")
-    print(f"Full URL: {request.url}")
-    print(f"Code: {code}")
-    print(f"State: {state}")
-    print(f"Error: {error}")
-    print(f"Error Description: {error_description}")
+    # Never log code/state - they are credentials until consumed
+    logger.info("🔐 Microsoft callback%s", f" with error {error}" if error else "")
     
     # Get DB session inside function to avoid dependency errors
     db = SessionLocal()
@@ -108,16 +112,13 @@ async def microsoft_callback(
             detail="Missing code or state parameter"
         )
     
-    # Verify state to prevent CSRF attacks
-    if state not in oauth_states:
+    # Verify state to prevent CSRF attacks - take() also consumes it, so it can't be replayed
+    if get_state_store().take(OAUTH_STATE_NAMESPACE, state) is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid state parameter"
+            detail="Invalid or expired state parameter"
         )
     
-    # Remove used state
-    oauth_states.pop(state, None)
-    
     # Exchange code for token
     token_result = await get_token_from_code(code)
     
@@ -125,8 +126,7 @@ async def microsoft_callback(
         # Log detailed error for debugging
         error_desc = token_result.get('error_description', 'Unknown error')
         error_code = token_result.get('error', 'unknown')
-        print(f"MSAL Error: {error_code} - {error_desc}")
-        print(f"Full error: {token_result}")
+        logger.warning("MSAL error: %s - %s", error_code, error_desc)
         
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -168,6 +168,9 @@ async def microsoft_callback(
         user.microsoft_refresh_token = token_result.get("refresh_token")
         db.commit()
     
+    # New Microsoft token - drop the cached copy
+    invalidate_user(user.email)
+    
     # Create JWT token for your application
     app_token = create_access_token({
         "sub": user.email,
@@ -189,13 +192,20 @@ async def microsoft_callback(
     return RedirectResponse(url=f"/dashboard?{params}")
 
 @router.get("/logout")
-async def logout():
+async def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer)
+):
     """
     Logout endpoint that redirects to Microsoft logout page.
     This allows the user to sign out completely from their Microsoft account
     and enables switching to a different account.
     """
-    from app.core.config import settings
+    # Drop the cached user when the caller identifies itself
+    if credentials is not None:
+        try:
+            invalidate_user(verify_token(credentials.credentials).get("sub"))
+        except HTTPException:
+            pass
     
     # Microsoft logout URL that will clear the session and allow account switching
     # The post_logout_redirect_uri takes the user back to our login page
@@ -1,14 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Response, Body
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pathlib import Path
-import traceback
-import tempfile
+from typing import List, Optional
+import logging
+import shutil
 import os
+import re
+import json
+import base64
 
-from app.core.contracts.loader import load_template
-from app.core.contracts.builder.builder import build_context
-from app.core.contracts.exporter import render_contract
-from app.core.pdf_converter import docx_to_preview_images
+# The contract stack (docxtpl, python-docx, num2words) and the PDF stack (pdf2image, PIL)
+# are imported inside the endpoints, so they load on first use instead of at app startup.
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/contracts", tags=["contracts"])
 
@@ -16,73 +21,94 @@ router = APIRouter(prefix="/api/contracts", tags=["contracts"])
 async def list_templates():
     """List available contract templates"""
     try:
-        templates_dir = Path(__file__).parent.parent.parent / "static" / "contract_templates"
-        print(f"Looking for templates in: {templates_dir}")
-        
-        if not templates_dir.exists():
-            return {"templates": [], "error": f"Directory not found: {templates_dir}"}
+        from app.core.contracts.loader import template_registry, DEFAULT_TEMPLATE
+
+        if not template_registry.directory.exists():
+            return {"templates": [], "error": f"Directory not found: {template_registry.directory}"}
         
         # Only show the main template
-        templates = ["50_50 template med placeholders.docx"]
-        print(f"Templates available: {templates}")
+        templates = [name for name in template_registry.names() if name == DEFAULT_TEMPLATE]
         
         return {"templates": templates}
     except Exception as e:
-        print(f"Error listing templates: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error listing templates")
         return {"templates": [], "error": str(e)}
 
+def _queue_full(e: Exception) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _download_response(path, filename: str) -> Optional[Response]:
+    """
+    Serve a cached file as a download (None if it was evicted meanwhile)
+    Small files are sent from memory; larger ones are copied into a scratch file
+    (cached files can be evicted while the response streams) that is removed once sent.
+    """
+    from app.core.artifacts import get_artifact_store
+    from app.core.config import settings
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    try:
+        if os.path.getsize(path) <= settings.CONTRACT_INLINE_MAX_KB * 1024:
+            return Response(content=Path(path).read_bytes(), media_type=DOCX_MEDIA_TYPE, headers=headers)
+        store = get_artifact_store()
+        copy_path = store.new_file(Path(path).suffix, prefix="download")
+        shutil.copyfile(path, copy_path)
+    except FileNotFoundError:
+        return None
+    return FileResponse(
+        copy_path,
+        media_type=DOCX_MEDIA_TYPE,
+        filename=filename,
+        background=BackgroundTask(store.remove, copy_path)
+    )
+
+
 @router.post("/generate")
 async def generate_contract(payload: dict):
     """Generate a contract from template and data"""
+    from app.core.contracts.render_pool import get_render_pool, RenderQueueFull
+
+    pool = get_render_pool()
     try:
-        print(f"=== Generating Contract ===")
-        print(f"Payload: {payload}")
+        # Field names only - the values are personal data
+        logger.debug("Generating contract with fields %s", sorted(payload))
         
-        template = load_template(payload.get("template_name"))
-        print(f"Template loaded successfully")
-        
-        context = build_context(payload)
-        print(f"Context built: {context}")
-        
-        output_path = render_contract(template, context)
-        print(f"Contract rendered to: {output_path}")
-
-        return FileResponse(
-            output_path,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            filename="contract_generated.docx"
-        )
+        # Rendered in a worker process; same payload as the last preview -> already cached
+        async with pool.slot():
+            cached_path, cache_hit = await pool.render_docx(payload)
+            response = await pool.in_thread(_download_response, cached_path, "contract_generated.docx")
+        if response is None:
+            raise Exception("Rendered contract was evicted from the cache before it could be sent")
+        logger.info("Contract %s", "served from cache" if cache_hit else "rendered")
+
+        return response
+    except RenderQueueFull as e:
+        raise _queue_full(e)
     except Exception as e:
-        print(f"ERROR generating contract: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error generating contract")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/preview")
 async def preview_contract(payload: dict):
     """Generate contract preview as PDF images"""
+    from app.core.contracts.render_pool import get_render_pool, RenderQueueFull
+
+    pool = get_render_pool()
     try:
-        print(f"=== Generating Contract Preview ===")
-        print(f"Payload: {payload}")
+        logger.debug("Generating contract preview with fields %s", sorted(payload))
         
-        # Generate contract
-        template = load_template(payload.get("template_name"))
-        context = build_context(payload)
-        output_path = render_contract(template, context)
-        print(f"Contract generated: {output_path}")
-        
-        # Convert to PDF images
-        print(f"Converting to PDF images...")
-        images = docx_to_preview_images(output_path, dpi=150)
-        print(f"Generated {len(images)} preview images")
-        
-        # Clean up the DOCX file
-        try:
-            os.remove(output_path)
-        except:
-            pass
+        from app.core.pdf_converter import png_data_url
+
+        # Rendered, converted and rasterized only if this exact contract isn't cached yet
+        async with pool.slot():
+            pages, cache_hit = await pool.render_preview(payload, 150)
+            images = await pool.in_thread(lambda: [png_data_url(page.read_bytes()) for page in pages])
+        logger.info("Preview: %d pages (%s)", len(images), "cache hit" if cache_hit else "rendered")
         
         return {
             "success": True,
@@ -90,12 +116,230 @@ async def preview_contract(payload: dict):
             "images": images
         }
         
+    except RenderQueueFull as e:
+        raise _queue_full(e)
     except Exception as e:
-        print(f"ERROR generating preview: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error generating preview")
         return {
             "success": False,
             "error": str(e)
         }
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error generating contract: {str(e)}")
+
+
+# ------------------------
+# Streaming preview: page by page, first page first
+# ------------------------
+_PREVIEW_ID = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _check_page_format(format: str):
+    from app.core.pdf_converter import PAGE_FORMATS
+    if format not in PAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(PAGE_FORMATS)}")
+
+
+def _page_url(preview_id: str, page: int, format: str, width: int) -> str:
+    return f"{router.prefix}/preview/{preview_id}/pages/{page}?format={format}&width={width}"
+
+
+@router.post("/preview/pages")
+async def preview_pages(
+    payload: dict,
+    format: str = Query("webp", description="Page image format: webp, jpeg or png"),
+    width: int = Query(1240, ge=200, le=2480, description="Page width in pixels")
+):
+    """
+    Render the contract to PDF once and return one URL per page
+    Pages are rasterized individually when fetched, so the first page shows up
+    without waiting for the rest.
+    """
+    from app.core.contracts.render_pool import get_render_pool, RenderQueueFull
+    from app.core.contracts.rendering import preview_page_count
+
+    _check_page_format(format)
+    pool = get_render_pool()
+    try:
+        async with pool.slot():
+            preview_id, _ = await pool.render_pdf(payload)
+            pages = await pool.in_thread(preview_page_count, preview_id) or 0
+        return {
+            "success": True,
+            "preview_id": preview_id,
+            "pages": pages,
+            "page_urls": [_page_url(preview_id, page, format, width) for page in range(1, pages + 1)]
+        }
+    except RenderQueueFull as e:
+        raise _queue_full(e)
+    except Exception as e:
+        logger.exception("Error generating preview")
+        return {"success": False, "error": str(e)}
+
+
+@router.get("/preview/{preview_id}/pages/{page}")
+async def preview_page(
+    preview_id: str,
+    page: int,
+    format: str = Query("webp", description="Page image format: webp, jpeg or png"),
+    width: int = Query(1240, ge=200, le=2480, description="Page width in pixels")
+):
+    """A single preview page image (content-addressed, so browsers may cache it)"""
+    from app.core.contracts.render_pool import get_render_pool, RenderQueueFull
+    from app.core.contracts.rendering import render_page_cached
+    from app.core.pdf_converter import PAGE_FORMATS
+
+    _check_page_format(format)
+    if not _PREVIEW_ID.match(preview_id) or page < 1:
+        raise HTTPException(status_code=404, detail="Preview page not found")
+
+    pool = get_render_pool()
+    try:
+        async with pool.slot():
+            data = await pool.in_thread(render_page_cached, preview_id, page, width, format)
+    except RenderQueueFull as e:
+        raise _queue_full(e)
+    except Exception as e:
+        logger.warning("Error rendering preview page: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error rendering preview page: {str(e)}")
+    if data is None:
+        raise HTTPException(status_code=404, detail="Preview expired - request /preview/pages again")
+
+    return Response(
+        content=data,
+        media_type=PAGE_FORMATS[format],
+        headers={"Cache-Control": "private, max-age=86400, immutable"}
+    )
+
+
+@router.post("/preview/stream")
+async def preview_stream(
+    payload: dict,
+    format: str = Query("webp", description="Page image format: webp, jpeg or png"),
+    width: int = Query(1240, ge=200, le=2480, description="Page width in pixels")
+):
+    """
+    Server-sent events: a "meta" event with the page count, then one "page" event
+    per page (data URL + page URL) as soon as that page is rasterized, then "done".
+    Only one page is held in memory at a time.
+    """
+    from app.core.contracts.render_pool import get_render_pool
+    from app.core.contracts.rendering import preview_page_count, render_page_cached
+    from app.core.pdf_converter import PAGE_FORMATS
+
+    _check_page_format(format)
+    pool = get_render_pool()
+    # Checked up front - once the stream has started a 429 can't be sent any more
+    if pool.pending >= pool.max_pending:
+        raise _queue_full(Exception(f"{pool.pending} contract renders already queued"))
+
+    def event(name: str, data: dict) -> str:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    async def events():
+        try:
+            async with pool.slot():
+                preview_id, _ = await pool.render_pdf(payload)
+                pages = await pool.in_thread(preview_page_count, preview_id) or 0
+                yield event("meta", {"preview_id": preview_id, "pages": pages})
+                for page in range(1, pages + 1):
+                    data = await pool.in_thread(render_page_cached, preview_id, page, width, format)
+                    if data is None:
+                        raise Exception("Preview evicted while streaming")
+                    yield event("page", {
+                        "page": page,
+                        "url": _page_url(preview_id, page, format, width),
+                        "image": f"data:{PAGE_FORMATS[format]};base64,{base64.b64encode(data).decode('ascii')}"
+                    })
+                yield event("done", {"pages": pages})
+        except Exception as e:
+            logger.exception("Error streaming preview")
+            yield event("error", {"error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ------------------------
+# Batch jobs
+# ------------------------
+@router.post("/jobs", status_code=202)
+async def create_batch_job(payloads: List[dict] = Body(...)):
+    """
+    Render many contracts in the background
+    Poll GET /jobs/{job_id} for progress, then download each finished item.
+    """
+    from app.core.contracts.render_pool import start_batch_job, batch_job_status, RenderQueueFull
+    from app.core.config import settings
+
+    if not payloads:
+        raise HTTPException(status_code=400, detail="No contracts in batch")
+    if len(payloads) > settings.CONTRACT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {settings.CONTRACT_BATCH_MAX_ITEMS} contracts")
+    try:
+        job = start_batch_job(payloads)
+    except RenderQueueFull as e:
+        raise _queue_full(e)
+    return {**batch_job_status(job), "status_url": f"{router.prefix}/jobs/{job['id']}"}
+
+
+@router.get("/jobs/{job_id}")
+async def get_batch_job_status(job_id: str):
+    """Progress and per-item status of a batch job"""
+    from app.core.contracts.render_pool import get_batch_job, batch_job_status
+
+    job = get_batch_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (finished jobs expire)")
+    status = batch_job_status(job)
+    for item in status["items"]:
+        if item["status"] == "completed":
+            item["download_url"] = f"{router.prefix}/jobs/{job_id}/items/{item['index']}"
+    return status
+
+
+@router.get("/jobs/{job_id}/items/{index}")
+async def download_batch_item(job_id: str, index: int):
+    """Download one finished contract of a batch job"""
+    from app.core.contracts.render_pool import get_batch_job, batch_item_path, get_render_pool
+
+    job = get_batch_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (finished jobs expire)")
+
+    docx_path = batch_item_path(job, index)
+    response = None
+    if docx_path is not None:
+        response = await get_render_pool().in_thread(_download_response, docx_path, f"contract_{index + 1:03d}.docx")
+    if response is None:
+        raise HTTPException(status_code=404, detail="Contract not ready, failed or expired")
+    return response
+
+
+@router.post("/batch")
+async def generate_contract_batch(
+    payloads: List[dict] = Body(..., embed=True, alias="contracts"),
+    include_pdf: bool = Query(False, description="Also include a PDF of every contract")
+):
+    """
+    Generate many contracts at once and stream them back as a ZIP
+    Contracts are rendered in parallel and added to the archive as each one finishes.
+    """
+    from app.core.contracts.render_pool import get_render_pool, stream_batch_zip
+    from app.core.config import settings
+
+    if not payloads:
+        raise HTTPException(status_code=400, detail="No contracts in batch")
+    if len(payloads) > settings.CONTRACT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {settings.CONTRACT_BATCH_MAX_ITEMS} contracts")
+    pool = get_render_pool()
+    # Checked up front - once the ZIP has started a 429 can't be sent any more
+    if pool.pending >= pool.max_pending:
+        raise _queue_full(Exception(f"{pool.pending} contract renders already queued"))
+
+    return StreamingResponse(
+        stream_batch_zip(payloads, include_pdf=include_pdf),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="contracts.zip"'}
+    )
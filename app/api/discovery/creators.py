@@ -3,10 +3,13 @@ TikTok Creators/Influencers Discovery Endpoints
 Fetch trending creators and their analytics
 """
 from fastapi import APIRouter, Depends, Query, Response
+import logging
 from typing import Dict, Optional
 from app.core.security import get_current_user
 from app.core.discovery.chartex_client import ChartexClient
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/api/discovery/creators",
     tags=["creators"]
@@ -38,7 +41,7 @@ async def get_trending_creators(
     page_number = (offset // limit) + 1
     fetch_limit = limit + 1  # Fetch one extra to check if more exist
     
-    print(f"\n🎭 CREATORS API: Fetching creators (sort_by={sort_by}, country={country_code})")
+    logger.debug("🎭 CREATORS API: Fetching creators (sort_by=%s, country=%s)", sort_by, country_code)
     
     # Fetch creators from Chartex
     creators = await chartex_client.get_creators(
@@ -84,7 +87,7 @@ async def get_creator_stats(
     
     chartex_client = ChartexClient()
     
-    print(f"\n📊 CREATOR STATS: Fetching data for @{username}")
+    logger.debug("📊 CREATOR STATS: Fetching data for @%s", username)
     
     # Fetch creator metadata and follower stats in parallel
     metadata = await chartex_client.get_creator_metadata(username)
@@ -126,7 +129,7 @@ async def get_creator_videos(
     page_number = (offset // limit) + 1
     fetch_limit = limit + 1
     
-    print(f"\n🎬 CREATOR VIDEOS: Fetching for @{username} (sort={sort_by})")
+    logger.debug("🎬 CREATOR VIDEOS: Fetching for @%s (sort=%s)", username, sort_by)
     
     videos = await chartex_client.get_creator_videos(
         username=username,
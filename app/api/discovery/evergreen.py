@@ -1,13 +1,14 @@
 """
 Evergreen tracks API endpoints
 """
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.orm import Session
 from typing import Dict
 from datetime import datetime
 
 from app.db.session import SessionLocal
 from app.core.security import get_current_user
+from app.core.http_cache import json_response
 from app.core.discovery.selectors import EvergreenSelector
 from app.models.discovery import Track, TrackScore
 
@@ -27,6 +28,7 @@ def get_db():
 
 @router.get("/")
 async def get_evergreen_tracks(
+    request: Request,
     current_user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1, le=200, description="Max tracks to return"),
@@ -54,13 +56,13 @@ async def get_evergreen_tracks(
             min_months=min_months
         )
         
-        return {
+        return json_response(request, {
             "total": len(tracks),
             "limit": limit,
             "min_score": min_score,
             "min_months": min_months,
             "tracks": tracks
-        }
+        })
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching evergreen tracks: {str(e)}")
@@ -0,0 +1,39 @@
+"""
+Background job monitoring endpoints
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Dict
+
+from app.db.session import SessionLocal
+from app.core.security import get_current_user
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["discovery-jobs"]
+)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.get("/status")
+async def get_jobs_status(
+    current_user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    recent: int = Query(50, ge=1, le=500, description="Runs per job to aggregate")
+):
+    """
+    Duration and failure metrics for the scheduled jobs (pre-warm, rescoring)
+    """
+    from app.jobs import get_job_metrics
+
+    return {
+        "recent": recent,
+        "jobs": get_job_metrics(db, recent=recent)
+    }
@@ -1,6 +1,8 @@
 """
 Pinned Songs Management
 Manual override system for trending charts when API data doesn't match external sources
+Active pins are spliced into /api/discovery/tiktok-trending/songs server-side;
+every edit refreshes the in-process snapshot that splicing reads from.
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
@@ -10,6 +12,7 @@ from datetime import datetime
 from app.db.session import SessionLocal
 from app.models.discovery import PinnedSong
 from app.core.security import get_current_user
+from app.core.discovery.pinned_snapshot import get_pinned_snapshot
 
 router = APIRouter(
     prefix="/api/discovery/pinned-songs",
@@ -25,27 +28,9 @@ def get_db():
 
 
 @router.get("/")
-async def get_pinned_songs(db: Session = Depends(get_db)):
-    """Get all active pinned songs in order"""
-    pinned = db.query(PinnedSong)\
-        .filter(PinnedSong.is_active == True)\
-        .order_by(PinnedSong.pin_position)\
-        .all()
-    
-    return [
-        {
-            "id": p.id,
-            "song_name": p.song_name,
-            "artist_name": p.artist_name,
-            "spotify_id": p.spotify_id,
-            "song_image_url": p.song_image_url,
-            "label_name": p.label_name,
-            "pin_position": p.pin_position,
-            "pinned_at": p.pinned_at,
-            "notes": p.notes
-        }
-        for p in pinned
-    ]
+async def get_pinned_songs():
+    """Get all active pinned songs in order (from the shared snapshot)"""
+    return get_pinned_snapshot().pins()
 
 
 @router.post("/")
@@ -90,6 +75,7 @@ async def add_pinned_song(
     db.add(pinned)
     db.commit()
     db.refresh(pinned)
+    get_pinned_snapshot().invalidate()
     
     return {
         "success": True,
@@ -116,6 +102,7 @@ async def remove_pinned_song(
     # Soft delete - mark as inactive
     pinned.is_active = False
     db.commit()
+    get_pinned_snapshot().invalidate()
     
     return {"success": True, "message": "Pinned song removed"}
 
@@ -157,6 +144,7 @@ async def update_pinned_song(
         pinned.notes = notes
     
     db.commit()
+    get_pinned_snapshot().invalidate()
     
     return {
         "success": True,
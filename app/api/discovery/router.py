@@ -3,7 +3,7 @@ Main discovery router
 Coordinates all discovery endpoints
 """
 from fastapi import APIRouter
-from . import trending, evergreen, shortlists, explain
+from . import trending, evergreen, shortlists, explain, jobs
 
 router = APIRouter(
     prefix="/api/discovery",
@@ -15,6 +15,7 @@ router.include_router(trending.router)
 router.include_router(evergreen.router)
 router.include_router(shortlists.router)
 router.include_router(explain.router)
+router.include_router(jobs.router)
 
 
 @router.get("/health")
@@ -2,15 +2,18 @@
 A&R shortlists management API
 Human curation and workflow tracking
 """
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, aliased
 from typing import Dict, Optional, List
 from pydantic import BaseModel
+from datetime import datetime
+import base64
+import json
 
 from app.db.session import SessionLocal
-from app.core.security import get_current_user
-from app.models.discovery import Shortlist, Track
-from app.models.user import User
+from app.core.security import AuthenticatedUser, get_authenticated_user
+from app.models.discovery import Shortlist, Track, TrackMetric, TrackScore
 
 router = APIRouter(
     prefix="/shortlist",
@@ -38,15 +41,105 @@ class UpdateShortlistRequest(BaseModel):
     notes: Optional[str] = None
 
 
+VALID_STATUSES = ["new", "contacted", "interested", "passed", "signed"]
+BULK_MAX_TRACKS = 500
+
+
+class BulkAddRequest(BaseModel):
+    track_ids: List[str]
+    priority: int = 0
+    notes: Optional[str] = None
+
+
+class BulkStatusRequest(BaseModel):
+    track_ids: List[str]
+    status: str
+
+
+class BulkPriorityRequest(BaseModel):
+    track_ids: List[str]
+    priority: int
+
+
+def _latest_per_track(model, order_column, track_ids):
+    """
+    Aliased `model` bound to each track's newest row (row_number() over track_id),
+    restricted to `track_ids` - outer-join it with a `rank == 1` condition
+    """
+    ranked = (
+        select(
+            model,
+            func.row_number().over(
+                partition_by=model.track_id,
+                order_by=(order_column.desc(), model.id.desc())
+            ).label("rank")
+        )
+        .where(model.track_id.in_(track_ids))
+        .subquery()
+    )
+    return aliased(model, ranked), ranked.c.rank
+
+
+def _encode_cursor(item: Shortlist) -> str:
+    raw = json.dumps([item.priority or 0, item.added_at.isoformat(), item.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        priority, added_at, item_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(priority), datetime.fromisoformat(added_at), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _metric_dict(metric: Optional[TrackMetric]) -> Optional[Dict]:
+    if metric is None:
+        return None
+    return {
+        "timestamp": metric.timestamp.isoformat(),
+        "spotify_streams": metric.spotify_streams,
+        "spotify_streams_7d": metric.spotify_streams_7d,
+        "spotify_streams_30d": metric.spotify_streams_30d,
+        "spotify_playlist_count": metric.spotify_playlist_count,
+        "spotify_chart_position": metric.spotify_chart_position,
+        "tiktok_posts": metric.tiktok_posts,
+        "tiktok_posts_7d": metric.tiktok_posts_7d,
+        "tiktok_views": metric.tiktok_views,
+        "tiktok_views_7d": metric.tiktok_views_7d,
+        "tiktok_chart_position": metric.tiktok_chart_position
+    }
+
+
+def _score_dict(score: Optional[TrackScore]) -> Optional[Dict]:
+    if score is None:
+        return None
+    return {
+        "computed_at": score.computed_at.isoformat(),
+        "trending_score": score.trending_score,
+        "evergreen_score": score.evergreen_score,
+        "why_selected": score.why_selected,
+        "risk_flags": score.risk_flags
+    }
+
+
 @router.get("/")
 async def get_shortlist(
-    current_user: Dict = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_authenticated_user),
     db: Session = Depends(get_db),
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit for the whole list"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
     """
     Get A&R shortlist with optional status filter
     
+    Each item carries its track, the track's latest metric snapshot and latest
+    score, all from one joined query. Without `limit` the whole list is returned;
+    with it, pages are keyset-paginated in display order (priority, then newest
+    first): pass next_cursor to get the following page. Items whose track no
+    longer exists are left out, of the counts too.
+    
     Statuses:
     - new: Just added
     - contacted: Outreach initiated
@@ -54,63 +147,91 @@ async def get_shortlist(
     - passed: Not pursuing
     - signed: Deal closed
     """
-    # Get user
-    user = db.query(User).filter(User.email == current_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Counts per status for the tabs (one GROUP BY through the same track join, independent of the filter/page)
+    status_counts = dict(
+        db.query(Shortlist.status, func.count(Shortlist.id))
+        .join(Track, Track.id == Shortlist.track_id)
+        .filter(Shortlist.user_id == user.id)
+        .group_by(Shortlist.status)
+        .all()
+    )
+    
+    user_track_ids = select(Shortlist.track_id).where(Shortlist.user_id == user.id).scalar_subquery()
+    LatestMetric, metric_rank = _latest_per_track(TrackMetric, TrackMetric.timestamp, user_track_ids)
+    LatestScore, score_rank = _latest_per_track(TrackScore, TrackScore.computed_at, user_track_ids)
     
     # Build query
-    query = db.query(Shortlist).filter(Shortlist.user_id == user.id)
+    query = (
+        db.query(Shortlist, Track, LatestMetric, LatestScore)
+        .join(Track, Track.id == Shortlist.track_id)
+        .outerjoin(LatestMetric, and_(LatestMetric.track_id == Shortlist.track_id, metric_rank == 1))
+        .outerjoin(LatestScore, and_(LatestScore.track_id == Shortlist.track_id, score_rank == 1))
+        .filter(Shortlist.user_id == user.id)
+    )
     
     if status:
         query = query.filter(Shortlist.status == status)
     
-    # Get results with track info
-    shortlist_items = query.order_by(
-        Shortlist.priority.desc(),
-        Shortlist.added_at.desc()
-    ).all()
+    priority = func.coalesce(Shortlist.priority, 0)
+    if cursor:
+        after_priority, after_added_at, after_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            priority < after_priority,
+            and_(priority == after_priority, Shortlist.added_at < after_added_at),
+            and_(priority == after_priority, Shortlist.added_at == after_added_at, Shortlist.id < after_id)
+        ))
+    
+    query = query.order_by(
+        priority.desc(),
+        Shortlist.added_at.desc(),
+        Shortlist.id.desc()
+    )
+    rows = query.limit(limit + 1).all() if limit else query.all()
+    has_more = limit is not None and len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
     
     results = []
-    for item in shortlist_items:
-        track = db.query(Track).filter(Track.id == item.track_id).first()
-        if track:
-            results.append({
-                "id": item.id,
-                "track": {
-                    "id": track.id,
-                    "title": track.title,
-                    "artist_name": track.artist_name
-                },
-                "status": item.status,
-                "priority": item.priority,
-                "notes": item.notes,
-                "added_at": item.added_at.isoformat(),
-                "contacted_at": item.contacted_at.isoformat() if item.contacted_at else None,
-                "last_updated": item.last_updated.isoformat()
-            })
+    for item, track, metric, score in rows:
+        results.append({
+            "id": item.id,
+            "track": {
+                "id": track.id,
+                "title": track.title,
+                "artist_name": track.artist_name,
+                "image_url": track.image_url,
+                "spotify_url": track.spotify_url,
+                "tiktok_url": track.tiktok_url,
+                "spotify_popularity": track.spotify_popularity
+            },
+            "latest_metric": _metric_dict(metric),
+            "latest_score": _score_dict(score),
+            "status": item.status,
+            "priority": item.priority,
+            "notes": item.notes,
+            "added_at": item.added_at.isoformat(),
+            "contacted_at": item.contacted_at.isoformat() if item.contacted_at else None,
+            "last_updated": item.last_updated.isoformat()
+        })
     
     return {
-        "total": len(results),
+        "total": status_counts.get(status, 0) if status else sum(status_counts.values()),
         "status_filter": status,
-        "items": results
+        "status_counts": status_counts,
+        "items": results,
+        "next_cursor": _encode_cursor(rows[-1][0]) if has_more else None
     }
 
 
 @router.post("/")
 async def add_to_shortlist(
     request: AddToShortlistRequest,
-    current_user: Dict = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_authenticated_user),
     db: Session = Depends(get_db)
 ):
     """
     Add track to A&R shortlist
     """
-    # Get user
-    user = db.query(User).filter(User.email == current_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Check if track exists
     track = db.query(Track).filter(Track.id == request.track_id).first()
     if not track:
@@ -147,21 +268,130 @@ async def add_to_shortlist(
     }
 
 
+def _bulk_track_ids(track_ids: List[str]) -> List[str]:
+    """De-duplicated track ids in request order, capped at BULK_MAX_TRACKS"""
+    unique = list(dict.fromkeys(track_ids))
+    if not unique:
+        raise HTTPException(status_code=400, detail="No track_ids given")
+    if len(unique) > BULK_MAX_TRACKS:
+        raise HTTPException(status_code=413, detail=f"Bulk operations are limited to {BULK_MAX_TRACKS} tracks")
+    return unique
+
+
+def _bulk_shortlist_query(db: Session, user: AuthenticatedUser, track_ids: List[str]):
+    return db.query(Shortlist).filter(Shortlist.user_id == user.id, Shortlist.track_id.in_(track_ids))
+
+
+@router.post("/bulk")
+async def bulk_add_to_shortlist(
+    request: BulkAddRequest,
+    user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add many tracks to the A&R shortlist in one transaction
+    Unknown tracks and tracks already shortlisted are reported, not errors.
+    """
+    track_ids = _bulk_track_ids(request.track_ids)
+    
+    # One IN query each for existing tracks and existing shortlist entries
+    known = {track_id for (track_id,) in db.query(Track.id).filter(Track.id.in_(track_ids))}
+    shortlisted = {
+        track_id for (track_id,) in db.query(Shortlist.track_id).filter(
+            Shortlist.user_id == user.id,
+            Shortlist.track_id.in_(track_ids)
+        )
+    }
+    
+    to_add = [track_id for track_id in track_ids if track_id in known and track_id not in shortlisted]
+    items = [
+        Shortlist(
+            track_id=track_id,
+            user_id=user.id,
+            priority=request.priority,
+            notes=request.notes,
+            status="new"
+        )
+        for track_id in to_add
+    ]
+    db.add_all(items)
+    db.flush()  # Assigns ids without a refresh per item after commit
+    added = [{"id": item.id, "track_id": item.track_id} for item in items]
+    db.commit()
+    
+    return {
+        "added": added,
+        "already_shortlisted": [track_id for track_id in track_ids if track_id in shortlisted],
+        "not_found": [track_id for track_id in track_ids if track_id not in known]
+    }
+
+
+@router.patch("/bulk/status")
+async def bulk_update_status(
+    request: BulkStatusRequest,
+    user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Move many shortlisted tracks to a new status in one UPDATE
+    contacted_at is set for items moving to "contacted" for the first time.
+    """
+    if request.status not in VALID_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {VALID_STATUSES}")
+    
+    track_ids = _bulk_track_ids(request.track_ids)
+    query = _bulk_shortlist_query(db, user, track_ids)
+    found = {track_id for (track_id,) in query.with_entities(Shortlist.track_id)}
+    
+    values = {Shortlist.status: request.status, Shortlist.last_updated: datetime.utcnow()}
+    if request.status == "contacted":
+        values[Shortlist.contacted_at] = func.coalesce(Shortlist.contacted_at, datetime.utcnow())
+    updated = query.update(values, synchronize_session=False)
+    db.commit()
+    
+    return {
+        "status": request.status,
+        "updated": updated,
+        "not_shortlisted": [track_id for track_id in track_ids if track_id not in found]
+    }
+
+
+@router.patch("/bulk/priority")
+async def bulk_update_priority(
+    request: BulkPriorityRequest,
+    user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Reprioritize many shortlisted tracks in one UPDATE
+    """
+    track_ids = _bulk_track_ids(request.track_ids)
+    query = _bulk_shortlist_query(db, user, track_ids)
+    found = {track_id for (track_id,) in query.with_entities(Shortlist.track_id)}
+    
+    updated = query.update(
+        {Shortlist.priority: request.priority, Shortlist.last_updated: datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.commit()
+    
+    return {
+        "priority": request.priority,
+        "updated": updated,
+        "not_shortlisted": [track_id for track_id in track_ids if track_id not in found]
+    }
+
+
 @router.patch("/{shortlist_id}")
 async def update_shortlist_item(
     shortlist_id: int,
     request: UpdateShortlistRequest,
-    current_user: Dict = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_authenticated_user),
     db: Session = Depends(get_db)
 ):
     """
     Update shortlist item status, priority, or notes
     """
-    # Get user
-    user = db.query(User).filter(User.email == current_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Get shortlist item
     item = db.query(Shortlist).filter(
         Shortlist.id == shortlist_id,
@@ -173,9 +403,8 @@ async def update_shortlist_item(
     
     # Update fields
     if request.status is not None:
-        valid_statuses = ["new", "contacted", "interested", "passed", "signed"]
-        if request.status not in valid_statuses:
-            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
+        if request.status not in VALID_STATUSES:
+            raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {VALID_STATUSES}")
         item.status = request.status
         
         # Set contacted_at if moving to contacted status
@@ -205,17 +434,12 @@ async def update_shortlist_item(
 @router.delete("/{shortlist_id}")
 async def remove_from_shortlist(
     shortlist_id: int,
-    current_user: Dict = Depends(get_current_user),
+    user: AuthenticatedUser = Depends(get_authenticated_user),
     db: Session = Depends(get_db)
 ):
     """
     Remove track from shortlist
     """
-    # Get user
-    user = db.query(User).filter(User.email == current_user["sub"]).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Get shortlist item
     item = db.query(Shortlist).filter(
         Shortlist.id == shortlist_id,
@@ -229,3 +453,34 @@ async def remove_from_shortlist(
     db.commit()
     
     return {"message": "Removed from shortlist", "id": shortlist_id}
+
+
+@router.get("/{shortlist_id}/correspondence")
+async def get_shortlist_correspondence(
+    shortlist_id: int,
+    user: AuthenticatedUser = Depends(get_authenticated_user),
+    db: Session = Depends(get_db)
+):
+    """
+    All synced outreach mail with the shortlisted track's artist
+    Served from the local mail index (sync the outreach folders first)
+    """
+    from app.core.mail_index import artist_correspondence
+
+    item = db.query(Shortlist).filter(
+        Shortlist.id == shortlist_id,
+        Shortlist.user_id == user.id
+    ).first()
+    
+    if not item:
+        raise HTTPException(status_code=404, detail="Shortlist item not found")
+    
+    conversations = artist_correspondence(db, user.id, item.track.artist_name)
+    
+    return {
+        "id": item.id,
+        "track_id": item.track_id,
+        "artist_name": item.track.artist_name,
+        "total": len(conversations),
+        "conversations": conversations
+    }
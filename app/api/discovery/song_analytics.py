@@ -1,11 +1,16 @@
 """
 Song Analytics Endpoint
 Detailed analytics for individual songs (TikTok or Spotify)
+Responses carry an ETag of the body - polling an unchanged song answers 304.
 """
-from fastapi import APIRouter, Depends, Query, Response, Path
+from fastapi import APIRouter, Depends, Query, Request, Path
+import logging
 from typing import Dict, Optional
 from app.core.security import get_current_user
 from app.core.discovery.chartex_client import ChartexClient
+from app.core.http_cache import json_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/discovery/song-analytics",
@@ -15,9 +20,9 @@ router = APIRouter(
 
 @router.get("/{platform}/{platform_id}/stats")
 async def get_song_analytics(
+    request: Request,
     platform: str = Path(..., description="Platform: tiktok or spotify"),
     platform_id: str = Path(..., description="Platform-specific song/sound ID"),
-    response: Response = None,
     current_user: Dict = Depends(get_current_user),
     history_days: int = Query(30, ge=7, le=90, description="Days of historical data")
 ):
@@ -27,14 +32,9 @@ async def get_song_analytics(
     - Spotify: streaming stats over time
     - Cross-platform: linked TikTok sounds for Spotify tracks
     """
-    # Add cache-control headers
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    
     chartex_client = ChartexClient()
     
-    print(f"\n🎵 SONG ANALYTICS: {platform}/{platform_id} (history={history_days}d)")
+    logger.debug("🎵 SONG ANALYTICS: %s/%s (history=%sd)", platform, platform_id, history_days)
     
     result = {
         "platform": platform,
@@ -80,14 +80,14 @@ async def get_song_analytics(
         )
         result["video_views"] = video_views
     
-    return result
+    return json_response(request, result)
 
 
 @router.get("/{platform}/{platform_id}/videos")
 async def get_song_videos(
+    request: Request,
     platform: str = Path(..., description="Platform: tiktok or spotify"),
     platform_id: str = Path(..., description="Platform-specific song/sound ID"),
-    response: Response = None,
     current_user: Dict = Depends(get_current_user),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
@@ -100,17 +100,12 @@ async def get_song_videos(
     Get top TikTok videos using this song/sound
     Works for both TikTok sounds and Spotify tracks
     """
-    # Add cache-control headers
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    
     chartex_client = ChartexClient()
     
     page_number = (offset // limit) + 1
     fetch_limit = limit + 1
     
-    print(f"\n🎬 SONG VIDEOS: {platform}/{platform_id} (sort={sort_by}, time_range={time_range})")
+    logger.debug("🎬 SONG VIDEOS: %s/%s (sort=%s, time_range=%s)", platform, platform_id, sort_by, time_range)
     
     videos = await chartex_client.get_song_videos(
         platform=platform,
@@ -127,7 +122,7 @@ async def get_song_videos(
     if has_more:
         videos = videos[:limit]
     
-    return {
+    return json_response(request, {
         "platform": platform,
         "platform_id": platform_id,
         "total": len(videos),
@@ -135,14 +130,14 @@ async def get_song_videos(
         "limit": limit,
         "has_more": has_more,
         "videos": videos
-    }
+    })
 
 
 @router.get("/{platform}/{platform_id}/influencers")
 async def get_song_influencers(
+    request: Request,
     platform: str = Path(..., description="Platform: tiktok or spotify"),
     platform_id: str = Path(..., description="Platform-specific song/sound ID"),
-    response: Response = None,
     current_user: Dict = Depends(get_current_user),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
@@ -153,17 +148,12 @@ async def get_song_influencers(
     Get top influencers who have used this song/sound
     Sorted by total views, number of videos, or follower count
     """
-    # Add cache-control headers
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    
     chartex_client = ChartexClient()
     
     page_number = (offset // limit) + 1
     fetch_limit = limit + 1
     
-    print(f"\n👥 SONG INFLUENCERS: {platform}/{platform_id} (sort={sort_by})")
+    logger.debug("👥 SONG INFLUENCERS: %s/%s (sort=%s)", platform, platform_id, sort_by)
     
     influencers = await chartex_client.get_song_influencers(
         platform=platform,
@@ -178,7 +168,7 @@ async def get_song_influencers(
     if has_more:
         influencers = influencers[:limit]
     
-    return {
+    return json_response(request, {
         "platform": platform,
         "platform_id": platform_id,
         "total": len(influencers),
@@ -186,14 +176,14 @@ async def get_song_influencers(
         "limit": limit,
         "has_more": has_more,
         "influencers": influencers
-    }
+    })
 
 
 @router.get("/{platform}/{platform_id}/countries")
 async def get_song_countries(
+    request: Request,
     platform: str = Path(..., description="Platform: tiktok or spotify"),
     platform_id: str = Path(..., description="Platform-specific song/sound ID"),
-    response: Response = None,
     current_user: Dict = Depends(get_current_user),
     limit: int = Query(50, ge=1, le=100)
 ):
@@ -201,14 +191,9 @@ async def get_song_countries(
     Get country breakdown for this song
     Shows which countries have the most TikTok activity
     """
-    # Add cache-control headers
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    
     chartex_client = ChartexClient()
     
-    print(f"\n🌍 SONG COUNTRIES: {platform}/{platform_id}")
+    logger.debug("🌍 SONG COUNTRIES: %s/%s", platform, platform_id)
     
     countries = await chartex_client.get_song_countries(
         platform=platform,
@@ -216,9 +201,9 @@ async def get_song_countries(
         limit=limit
     )
     
-    return {
+    return json_response(request, {
         "platform": platform,
         "platform_id": platform_id,
         "total": len(countries),
         "countries": countries
-    }
+    })
@@ -2,11 +2,13 @@
 TikTok Trending Songs Discovery with Historical Time Series
 Combines Chartex TikTok data with Spotify metrics and historical trends
 """
-from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import lru_cache
 import hashlib
 import json
@@ -16,7 +18,13 @@ import sys
 from app.db.session import SessionLocal
 from app.core.security import get_current_user
 from app.core.discovery.chartex_client import get_chartex_client
+from app.core.discovery.chartex_records import Song, parse_songs, parse_song_detail, parse_song_list, parse_stats
 from app.core.discovery.spotify_client import SpotifyClient
+from app.core.discovery.response_cache import ResponseCache
+from app.core.discovery.pinned_snapshot import get_pinned_snapshot
+from app.core.config import settings
+from app.core.http_cache import json_response
+from app.core.tracing import annotate, span, timing_summary, traced
 
 logger = logging.getLogger(__name__)
 
@@ -25,10 +33,42 @@ router = APIRouter(
     tags=["discovery-tiktok"]
 )
 
-# Simple in-memory cache with configurable TTL
-_response_cache = {}
-_cache_ttl = 0  # DISABLED - No caching to force fresh API calls every time
-_label_filter_cache_ttl = 0  # DISABLED - No caching for label queries either
+# Two-level cache (memory + discovery_cache table), pre-warmed by the scheduled jobs in app.jobs
+_response_cache = ResponseCache("tiktok_trending", settings.TIKTOK_TRENDING_CACHE_TTL_SECONDS)
+# Per-song series, memory only - looked up once per song during enrichment, where a
+# synchronous DB round trip each would block the event loop; the assembled responses
+# above are what gets persisted
+_history_cache = ResponseCache("tiktok_history", settings.TIKTOK_TRENDING_CACHE_TTL_SECONDS, persist=False)
+# Enriched pinned entries - keyed by snapshot generation, so pin edits never serve stale ones
+_pinned_cache = ResponseCache("tiktok_pinned", settings.TIKTOK_TRENDING_CACHE_TTL_SECONDS, persist=False)
+# Pages with pins spliced in, keyed by the organic page versions + pin generation, so
+# repeat hits reuse their encoded body too
+_spliced_cache = ResponseCache("tiktok_spliced", settings.TIKTOK_TRENDING_CACHE_TTL_SECONDS, persist=False)
+
+# Set by the pre-warm job: recompute history series and overwrite their cache entries,
+# once per song - cache key -> the task refetching it
+_refresh_history: ContextVar[Optional[Dict[str, "asyncio.Task"]]] = ContextVar("refresh_history", default=None)
+
+
+@contextmanager
+def refreshing_history():
+    """
+    History lookups inside this block (and tasks started in it) refetch each series
+    once and overwrite its entry; repeat lookups share that result, nothing else is dropped
+    """
+    token = _refresh_history.set({})
+    try:
+        yield
+    finally:
+        _refresh_history.reset(token)
+
+
+def clear_caches():
+    """Drop cached trending responses and history series (all workers, via their generations)"""
+    _response_cache.clear()
+    _history_cache.clear()
+    _spliced_cache.clear()
+
 
 def get_db():
     db = SessionLocal()
@@ -115,6 +155,7 @@ def _matches_label_filter(label_text: str, label_type: str) -> bool:
 
 @router.get("/songs")
 async def get_trending_songs_with_history(
+    request: Request,
     response: Response,
     current_user: Dict = Depends(get_current_user),
     limit: int = Query(10, ge=1, le=100, description="Number of songs to return (default 10 for faster loading)"),
@@ -132,278 +173,368 @@ async def get_trending_songs_with_history(
     search: Optional[str] = Query(None, description="Search term"),
     include_history: bool = Query(True, description="Include historical TikTok time series data"),
     history_days: int = Query(3, ge=1, le=90, description="Days of historical data to fetch (default 3 for faster loading)"),
-    include_spotify_metadata: bool = Query(False, description="Include Spotify metadata (slower but more details)")
+    include_spotify_metadata: bool = Query(False, description="Include Spotify metadata (slower but more details)"),
+    include_pinned: bool = Query(True, description="Splice active pinned songs in at their pin_position"),
+    debug_timing: bool = Query(False, description="Add a debug_timing section: critical path and slowest upstream calls")
 ):
     """
     Get trending songs from TikTok with:
     - Current TikTok metrics (videos, sounds, growth)
     - Spotify data (popularity, images, streams if available)
     - Historical time series for TikTok and Spotify metrics (7 days by default)
+    - Pinned songs at their pin_position (marked "pinned": true, not applied to searches)
     
     Perfect for discovering viral tracks and analyzing their growth trajectory.
+    Common filter combinations are pre-computed by the background pre-warm job.
+    Cached responses never contain pins - they are spliced in per request, and pages
+    keep their length (organic songs shift down around the pins).
+    The ETag follows the cache entry and pin versions; unchanged pages answer 304.
+    debug_timing=1 traces the request (see app.core.tracing) and appends its waterfall summary.
     """
-    logger.info(f"\n🔍 API CALLED with sort_by={sort_by}, tiktok_metric={tiktok_metric}, country_code={country_code}")
-    logger.info(f"🔍 Current time: {datetime.now()}")
-    logger.info(f"🔍 Cache size: {len(_response_cache)} items")
+    logger.debug("🔍 API CALLED with sort_by=%s, tiktok_metric=%s, country_code=%s", sort_by, tiktok_metric, country_code)
+    params = trending_params(
+        limit=limit,
+        offset=offset,
+        sort_by=sort_by,
+        tiktok_metric=tiktok_metric,
+        spotify_sort_metric=spotify_sort_metric,
+        min_video_count=min_video_count,
+        country_code=country_code,
+        country_codes=country_codes,
+        label_type=label_type,
+        search=search,
+        include_history=include_history,
+        history_days=history_days,
+        include_spotify_metadata=include_spotify_metadata
+    )
+    
+    pins = _active_pins(label_type) if include_pinned and not params["search"] else []
+    if pins:
+        response_data, version, entry = await _splice_pinned_songs(pins, params)
+    else:
+        response_data, entry = await _trending_page(params)
+        version = entry.version if entry is not None else None
+    
+    if debug_timing:
+        # New dict - the cached payload must not carry one request's timings
+        response.headers["Cache-Control"] = "no-store"
+        return {**response_data, "debug_timing": timing_summary()}
+    
+    if entry is not None and response_data is entry.value:
+        # Nothing spliced in - write the cached encoding as-is
+        return json_response(request, version=version, body=entry.body)
+    return json_response(request, response_data, version)
+
+
+async def _trending_page(params: Dict[str, Any]):
+    """(response, cache entry or None) for one organic page, through the response cache"""
+    cache_key = _response_cache.make_key(params)
+    entry = _response_cache.get_entry(cache_key)
+    annotate(response_cache="hit" if entry is not None else "miss")
+    if entry is not None:
+        logger.debug("⚡ Cache hit (%s items in memory)", len(_response_cache))
+        return entry.value, entry
+    
     try:
-        # FORCE FRESH DATA - Skip cache entirely
-        # Clear the entire cache on every request to guarantee fresh data
-        _response_cache.clear()
-        logger.info(f"🧹 Cache cleared - will fetch fresh data from Chartex")
+        response_data = await build_trending_response(**params)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching trending songs: {str(e)}"
+        )
+    # Don't cache empty results - usually an upstream error
+    if response_data["songs"]:
+        entry = _response_cache.set(cache_key, response_data)
+    return response_data, entry
+
+
+def trending_params(
+    limit: int = 10,
+    offset: int = 0,
+    sort_by: str = "tiktok_last_24_hours_video_count",
+    tiktok_metric: Optional[str] = None,
+    spotify_sort_metric: Optional[str] = None,
+    min_video_count: Optional[int] = None,
+    country_code: Optional[str] = None,
+    country_codes: Optional[str] = None,
+    label_type: Optional[str] = None,
+    search: Optional[str] = None,
+    include_history: bool = True,
+    history_days: int = 3,
+    include_spotify_metadata: bool = False
+) -> Dict[str, Any]:
+    """
+    Normalized /songs parameters - used as the cache key by the endpoint and the pre-warm job
+    Empty strings are treated like missing filters.
+    """
+    return {
+        "limit": limit,
+        "offset": offset,
+        "sort_by": sort_by,
+        "tiktok_metric": tiktok_metric or None,
+        "spotify_sort_metric": spotify_sort_metric or None,
+        "min_video_count": min_video_count,
+        "country_code": country_code or None,
+        "country_codes": country_codes or None,
+        "label_type": label_type or None,
+        "search": search or None,
+        "include_history": include_history,
+        "history_days": history_days,
+        "include_spotify_metadata": include_spotify_metadata
+    }
+
+
+async def build_trending_response(
+    limit: int,
+    offset: int,
+    sort_by: str,
+    tiktok_metric: Optional[str],
+    spotify_sort_metric: Optional[str],
+    min_video_count: Optional[int],
+    country_code: Optional[str],
+    country_codes: Optional[str],
+    label_type: Optional[str],
+    search: Optional[str],
+    include_history: bool,
+    history_days: int,
+    include_spotify_metadata: bool
+) -> Dict[str, Any]:
+    """
+    Fetch, enrich, filter and paginate trending songs from Chartex (uncached)
+    """
+    chartex_client = get_chartex_client()
+    spotify_client = None
+    
+    # Always initialize Spotify client if we're sorting by Spotify OR if metadata is requested
+    if (sort_by == "spotify_streams" or include_spotify_metadata) and settings.SPOTIFY_CLIENT_ID and settings.SPOTIFY_CLIENT_SECRET:
+        spotify_client = SpotifyClient()
+    
+    # Use country_code if provided, fallback to country_codes for backwards compatibility
+    country_param = country_code or country_codes
+    
+    # Fetch songs from Chartex based on sorting strategy
+    # Priority: Spotify sorting > Label filtering > Normal pagination
+    
+    if sort_by == "spotify_streams":
+        # For Spotify sorting, ALWAYS fetch a large batch upfront (regardless of label filter)
+        # because we need to enrich with Spotify data, then filter/sort locally
+        fetch_limit = 200  # Large batch to ensure enough songs after filtering
+        page_number = 1
+        has_more_available = False
+        # Use tiktok_metric parameter for Chartex fetch (respects time period filter)
+        chartex_sort_by = tiktok_metric if tiktok_metric else "tiktok_last_7_days_video_count"
+        logger.debug("📥 Fetching %s songs for Spotify sorting (TikTok metric: %s)", fetch_limit, chartex_sort_by)
+        if label_type:
+            logger.debug("   Label filter %s will be applied after enrichment", label_type)
         
-        chartex_client = get_chartex_client()
-        spotify_client = None
+        songs = parse_songs(await chartex_client.get_songs(
+            limit=fetch_limit,
+            sort_by=chartex_sort_by,
+            min_video_count=min_video_count,
+            search=search,
+            country_codes=country_param,
+            page=page_number,
+            force_refresh=True
+        ))
         
-        # Always initialize Spotify client if we're sorting by Spotify OR if metadata is requested
-        from app.core.config import settings
-        if (sort_by == "spotify_streams" or include_spotify_metadata) and settings.SPOTIFY_CLIENT_ID and settings.SPOTIFY_CLIENT_SECRET:
-            spotify_client = SpotifyClient()
+    elif label_type:
+        # If label filter is applied (and NOT Spotify sorting), paginate through Chartex for matches
+        logger.debug("🏷️  Label filter active: %s", label_type)
+        logger.debug("   Will fetch songs until we have %s matches", limit + offset)
         
-        # Use country_code if provided, fallback to country_codes for backwards compatibility
-        country_param = country_code or country_codes
-        
-        # Fetch songs from Chartex based on sorting strategy
-        # Priority: Spotify sorting > Label filtering > Normal pagination
-        
-        if sort_by == "spotify_streams":
-            # For Spotify sorting, ALWAYS fetch a large batch upfront (regardless of label filter)
-            # because we need to enrich with Spotify data, then filter/sort locally
-            fetch_limit = 200  # Large batch to ensure enough songs after filtering
-            page_number = 1
-            has_more_available = False
-            # Use tiktok_metric parameter for Chartex fetch (respects time period filter)
-            chartex_sort_by = tiktok_metric if tiktok_metric else "tiktok_last_7_days_video_count"
-            logger.info(f"📥 Fetching {fetch_limit} songs for Spotify sorting (TikTok metric: {chartex_sort_by})")
-            logger.info(f"   Label filter '{label_type}' will be applied after enrichment" if label_type else "   No label filter")
-            
-            songs = await chartex_client.get_songs(
-                limit=fetch_limit,
-                sort_by=chartex_sort_by,
+        all_songs = []
+        page_num = 1
+        batch_size = 50  # Fetch 50 at a time
+        max_pages = 20  # Safety limit - stop after 1000 songs (20 * 50)
+        has_more_available = False
+        
+        # Keep fetching until we have enough songs (limit + offset + 1 to check if more exist)
+        target_count = limit + offset + 1  # Fetch one extra to check if more exist
+        
+        while len(all_songs) < target_count and page_num <= max_pages:
+            logger.debug("   Fetching page %s (batch of %s)...", page_num, batch_size)
+            batch_songs = parse_songs(await chartex_client.get_songs(
+                limit=batch_size,
+                sort_by=sort_by,
                 min_video_count=min_video_count,
                 search=search,
                 country_codes=country_param,
-                page=page_number,
-                force_refresh=True
-            )
-            
-        elif label_type:
-            # If label filter is applied (and NOT Spotify sorting), paginate through Chartex for matches
-            logger.info(f"🏷️  Label filter active: {label_type}")
-            logger.info(f"   Will fetch songs until we have {limit + offset} matches")
+                page=page_num
+            ))
             
-            all_songs = []
-            page_num = 1
-            batch_size = 50  # Fetch 50 at a time
-            max_pages = 20  # Safety limit - stop after 1000 songs (20 * 50)
-            has_more_available = False
+            if not batch_songs:
+                logger.debug("   No more songs available from Chartex")
+                break
             
-            # Keep fetching until we have enough songs (limit + offset + 1 to check if more exist)
-            target_count = limit + offset + 1  # Fetch one extra to check if more exist
+            # Log first song's label fields on first batch for debugging
+            if page_num == 1 and batch_songs:
+                s = batch_songs[0]
+                logger.debug("   🏷️ First song label fields: label_name=%s, distributor=%s", s.label_name, s.distributor)
             
-            while len(all_songs) < target_count and page_num <= max_pages:
-                logger.info(f"   Fetching page {page_num} (batch of {batch_size})...")
-                batch_songs = await chartex_client.get_songs(
-                    limit=batch_size,
-                    sort_by=sort_by,
-                    min_video_count=min_video_count,
-                    search=search,
-                    country_codes=country_param,
-                    page=page_num
-                )
+            # Filter this batch by label
+            for song in batch_songs:
+                label = str(song.record_label or "").lower()
                 
-                if not batch_songs:
-                    logger.info(f"   No more songs available from Chartex")
-                    break
-                
-                # Log first song's label fields on first batch for debugging
-                if page_num == 1 and batch_songs:
-                    s = batch_songs[0]
-                    logger.info(f"   🏷️ First song label fields: label_name={s.get('label_name')}, label={s.get('label')}, distributor={s.get('distributor')}")
-                
-                # Filter this batch by label
-                for song in batch_songs:
-                    label = str(song.get("label_name") or song.get("label") or song.get("distributor") or "").lower()
+                # Check if this song matches the label filter
+                if _matches_label_filter(label, label_type):
+                    all_songs.append(song)
                     
-                    # Check if this song matches the label filter
-                    if _matches_label_filter(label, label_type):
-                        all_songs.append(song)
-                        
-                        # Stop early if we have enough (including the extra one)
-                        if len(all_songs) >= target_count:
-                            has_more_available = True
-                            break
-                
-                logger.info(f"   Found {len(all_songs)} matching songs so far")
-                page_num += 1
+                    # Stop early if we have enough (including the extra one)
+                    if len(all_songs) >= target_count:
+                        has_more_available = True
+                        break
             
-            # If we fetched more than needed, there are definitely more available
-            if len(all_songs) > (limit + offset):
-                has_more_available = True
-            
-            songs = all_songs
-            logger.info(f"   ✅ Total filtered songs: {len(songs)}, has_more: {has_more_available}")
-        else:
-            # No label filter and no Spotify sorting - normal pagination
-            has_more_available = False
-            fetch_limit = limit  # Use exact limit to avoid pagination gaps
-            # Calculate which page to fetch from Chartex (1-based)
-            page_number = (offset // limit) + 1
-            chartex_sort_by = sort_by
-            logger.info(f"📥 Fetching {fetch_limit} songs from Chartex page {page_number} (sort_by={chartex_sort_by})")
-            
-            songs = await chartex_client.get_songs(
-                limit=fetch_limit,
-                sort_by=chartex_sort_by,
-                min_video_count=min_video_count,
-                search=search,
-                country_codes=country_param,
-                page=page_number,
-                force_refresh=True  # Always force fresh data from Chartex
-            )
-
-            
-            # If we got a full page, there are likely more available
-            has_more_available = len(songs) >= limit
-            
-            logger.info(f"   ✅ Fetched {len(songs)} songs (page {page_number}, offset {offset}), has_more: {has_more_available}")
-        
-        # Fetch history based on sorting mode:
-        # - For Spotify sorting: always fetch (we need it for sorting even with label filter)
-        # - Always fetch if include_history is true so Spotify streams show in the table
-        fetch_history = include_history
-        
-        if not songs:
-            return {
-                "total": 0,
-                "songs": [],
-                "filters": {
-                    "sort_by": sort_by,
-                    "country_codes": country_codes,
-                    "min_video_count": min_video_count
-                }
-            }
-        
-        # Enrich each song with Spotify and historical data (in parallel for better performance)
-        enriched_songs = []
-        
-        # Process all songs in parallel
-        enrichment_tasks = []
-        for song in songs:
-            # Debug: Log first song structure to see available fields
-            if len(enrichment_tasks) == 0:
-                logger.info(f"🔍 First song raw data from Chartex:")
-                logger.info(f"   Available keys: {list(song.keys())}")
-                logger.info(f"   tiktok_sound_id: {song.get('tiktok_sound_id')}")
-                logger.info(f"   id: {song.get('id')}")
-                logger.info(f"   spotify_id: {song.get('spotify_id')}")
-                logger.info(f"   label_name: {song.get('label_name')}")
-                logger.info(f"   label: {song.get('label')}")
-                logger.info(f"   distributor: {song.get('distributor')}")
-            
-            # Use fetch_history variable to control whether to fetch historical data
-            enrichment_tasks.append(_enrich_song(song, spotify_client, chartex_client, fetch_history, history_days))
-        
-        enriched_songs = await asyncio.gather(*enrichment_tasks)
+            logger.debug("   Found %s matching songs so far", len(all_songs))
+            page_num += 1
         
-        # Apply label filter on enriched songs only for spotify_streams path
-        # (the label_type path already pre-filtered before enrichment)
-        if label_type and sort_by == "spotify_streams":
-            logger.info(f"🏷️  Applying label filter: {label_type} (post-enrichment for Spotify sorting)")
-            original_count = len(enriched_songs)
-            enriched_songs = [
-                song for song in enriched_songs
-                if _matches_label_filter(str(song.get("record_label") or song.get("label") or "").lower(), label_type)
-            ]
-            logger.info(f"   ✅ Filtered from {original_count} to {len(enriched_songs)} songs matching '{label_type}' label")
-        
-        # Sort by Spotify streams if requested
-        if sort_by == "spotify_streams" and spotify_sort_metric:
-            logger.info(f"🎵 Sorting by Spotify metric: {spotify_sort_metric}")
-            
-            # Filter out songs without Spotify data
-            songs_with_spotify = [
-                song for song in enriched_songs 
-                if song.get('history') and song['history'].get('spotify') and 
-                (song['history']['spotify'].get('streams') or song['history']['spotify'].get('total_streams', 0) > 0)
-            ]
-            
-            logger.info(f"📊 Filtered to {len(songs_with_spotify)} songs with Spotify data (from {len(enriched_songs)} total)")
-            
-            def get_spotify_sort_value(song):
-                if not song.get('history') or not song['history'].get('spotify'):
-                    return 0
-                streams = song['history']['spotify'].get('streams', [])
-                total_streams = song['history']['spotify'].get('total_streams', 0)
-                
-                if spotify_sort_metric == 'daily_streams':
-                    # Most recent day's streams
-                    return streams[-1].get('value', 0) if streams else 0
-                elif spotify_sort_metric == 'weekly_streams':
-                    # Last 7 days total
-                    last_7 = streams[-7:] if len(streams) >= 7 else streams
-                    return sum(day.get('value', 0) for day in last_7)
-                elif spotify_sort_metric == 'total_streams':
-                    # All-time total
-                    return total_streams
-                return 0
-            
-            songs_with_spotify.sort(key=get_spotify_sort_value, reverse=True)
-            enriched_songs = songs_with_spotify  # Replace with filtered & sorted list
-            logger.info(f"✅ Sorted {len(enriched_songs)} songs by {spotify_sort_metric}")
-        
-        # For label-filtered queries OR Spotify-sorted queries, apply offset and limit locally
-        # For non-filtered queries, we already fetched the right page from Chartex
-        if label_type or sort_by == "spotify_streams":
-            # Apply offset and limit to support pagination
-            final_songs = enriched_songs[offset:offset + limit]
-            total_available = len(enriched_songs)
-            # Check if there are more songs beyond what we're showing
-            has_more = (offset + limit) < len(enriched_songs)
-        else:
-            # Already fetched the correct page from Chartex, no need to slice
-            has_more = has_more_available
-            final_songs = enriched_songs
-            total_available = len(enriched_songs)  # This is approximate for non-filtered
+        # If we fetched more than needed, there are definitely more available
+        if len(all_songs) > (limit + offset):
+            has_more_available = True
         
-        # Note: has_more is already computed above based on the filtering logic
+        songs = all_songs
+        logger.debug("   ✅ Total filtered songs: %s, has_more: %s", len(songs), has_more_available)
+    else:
+        # No label filter and no Spotify sorting - normal pagination
+        has_more_available = False
+        fetch_limit = limit  # Use exact limit to avoid pagination gaps
+        # Calculate which page to fetch from Chartex (1-based)
+        page_number = (offset // limit) + 1
+        chartex_sort_by = sort_by
+        logger.debug("📥 Fetching %s songs from Chartex page %s (sort_by=%s)", fetch_limit, page_number, chartex_sort_by)
         
-        logger.info(f"🔍 Final pagination state: has_more={has_more}")
-        logger.info(f"   - filtered/sorted locally: {label_type or sort_by == 'spotify_streams'}")
-        logger.info(f"   - offset: {offset}, limit: {limit}, total_available: {total_available}")
-        logger.info(f"   - returning {len(final_songs)} songs")
+        songs = parse_songs(await chartex_client.get_songs(
+            limit=fetch_limit,
+            sort_by=chartex_sort_by,
+            min_video_count=min_video_count,
+            search=search,
+            country_codes=country_param,
+            page=page_number,
+            force_refresh=True  # Always force fresh data from Chartex
+        ))
 
         
-        response_data = {
-            "total": len(final_songs),
-            "total_available": total_available,
-            "offset": offset,
-            "limit": limit,
-            "has_more": has_more,
+        # If we got a full page, there are likely more available
+        has_more_available = len(songs) >= limit
+        
+        logger.debug("   ✅ Fetched %s songs (page %s, offset %s), has_more: %s", len(songs), page_number, offset, has_more_available)
+    
+    # Fetch history based on sorting mode:
+    # - For Spotify sorting: always fetch (we need it for sorting even with label filter)
+    # - Always fetch if include_history is true so Spotify streams show in the table
+    fetch_history = include_history
+    
+    if not songs:
+        return {
+            "total": 0,
+            "songs": [],
             "filters": {
                 "sort_by": sort_by,
                 "country_codes": country_codes,
-                "min_video_count": min_video_count,
-                "label_type": label_type,
-                "history_days": history_days if include_history else None
-            },
-            "songs": final_songs
+                "min_video_count": min_video_count
+            }
         }
+    
+    # Enrich each song with Spotify and historical data (in parallel for better performance)
+    enriched_songs = []
+    
+    # Process all songs in parallel
+    enrichment_tasks = []
+    for song in songs:
+        # Debug: Log first song structure to see available fields
+        if len(enrichment_tasks) == 0:
+            logger.debug("🔍 First song from Chartex: %s", song)
+        
+        # Use fetch_history variable to control whether to fetch historical data
+        enrichment_tasks.append(_enrich_song(song, spotify_client, chartex_client, fetch_history, history_days))
+    
+    with span("enrich_songs", songs=len(enrichment_tasks), include_history=fetch_history):
+        enriched_songs = await asyncio.gather(*enrichment_tasks)
+    
+    # Apply label filter on enriched songs only for spotify_streams path
+    # (the label_type path already pre-filtered before enrichment)
+    if label_type and sort_by == "spotify_streams":
+        logger.debug("🏷️  Applying label filter: %s (post-enrichment for Spotify sorting)", label_type)
+        original_count = len(enriched_songs)
+        enriched_songs = [
+            song for song in enriched_songs
+            if _matches_label_filter(str(song.get("record_label") or song.get("label") or "").lower(), label_type)
+        ]
+        logger.debug("   ✅ Filtered from %s to %s songs matching '%s' label", original_count, len(enriched_songs), label_type)
+    
+    # Sort by Spotify streams if requested
+    if sort_by == "spotify_streams" and spotify_sort_metric:
+        logger.debug("🎵 Sorting by Spotify metric: %s", spotify_sort_metric)
+        
+        # Filter out songs without Spotify data
+        songs_with_spotify = [
+            song for song in enriched_songs 
+            if song.get('history') and song['history'].get('spotify') and 
+            (song['history']['spotify'].get('streams') or song['history']['spotify'].get('total_streams', 0) > 0)
+        ]
         
-        # Don't cache - always fetch fresh
-        # _response_cache[cache_key] = (response_data, datetime.now().timestamp())
+        logger.debug("📊 Filtered to %s songs with Spotify data (from %s total)", len(songs_with_spotify), len(enriched_songs))
         
-        # Set cache control headers to prevent browser caching
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        def get_spotify_sort_value(song):
+            if not song.get('history') or not song['history'].get('spotify'):
+                return 0
+            streams = song['history']['spotify'].get('streams', [])
+            total_streams = song['history']['spotify'].get('total_streams', 0)
+            
+            if spotify_sort_metric == 'daily_streams':
+                # Most recent day's streams
+                return streams[-1].get('value', 0) if streams else 0
+            elif spotify_sort_metric == 'weekly_streams':
+                # Last 7 days total
+                last_7 = streams[-7:] if len(streams) >= 7 else streams
+                return sum(day.get('value', 0) for day in last_7)
+            elif spotify_sort_metric == 'total_streams':
+                # All-time total
+                return total_streams
+            return 0
         
-        return response_data
+        songs_with_spotify.sort(key=get_spotify_sort_value, reverse=True)
+        enriched_songs = songs_with_spotify  # Replace with filtered & sorted list
+        logger.debug("✅ Sorted %s songs by %s", len(enriched_songs), spotify_sort_metric)
     
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error fetching trending songs: {str(e)}"
-        )
+    # For label-filtered queries OR Spotify-sorted queries, apply offset and limit locally
+    # For non-filtered queries, we already fetched the right page from Chartex
+    if label_type or sort_by == "spotify_streams":
+        # Apply offset and limit to support pagination
+        final_songs = enriched_songs[offset:offset + limit]
+        total_available = len(enriched_songs)
+        # Check if there are more songs beyond what we're showing
+        has_more = (offset + limit) < len(enriched_songs)
+    else:
+        # Already fetched the correct page from Chartex, no need to slice
+        has_more = has_more_available
+        final_songs = enriched_songs
+        total_available = len(enriched_songs)  # This is approximate for non-filtered
+    
+    # Note: has_more is already computed above based on the filtering logic
+    
+    logger.debug("🔍 Final pagination state: has_more=%s", has_more)
+    logger.debug("   - filtered/sorted locally: %s", label_type or sort_by == 'spotify_streams')
+    logger.debug("   - offset: %s, limit: %s, total_available: %s", offset, limit, total_available)
+    logger.debug("   - returning %s songs", len(final_songs))
+
+    
+    response_data = {
+        "total": len(final_songs),
+        "total_available": total_available,
+        "offset": offset,
+        "limit": limit,
+        "has_more": has_more,
+        "filters": {
+            "sort_by": sort_by,
+            "country_codes": country_codes,
+            "min_video_count": min_video_count,
+            "label_type": label_type,
+            "history_days": history_days if include_history else None
+        },
+        "songs": final_songs
+    }
+    
+    return response_data
 
 
 @router.get("/songs/{song_id}/history")
@@ -428,12 +559,12 @@ async def get_song_history(
         chartex_client = get_chartex_client()
         
         # Get song details first
-        song = await chartex_client.get_song_detail(song_id)
+        song = parse_song_detail(await chartex_client.get_song_detail(song_id))
         if not song:
             raise HTTPException(status_code=404, detail="Song not found")
         
-        tiktok_sound_id = song.get("tiktok_sound_id")
-        spotify_id = song.get("spotify_id")
+        tiktok_sound_id = song.tiktok_sound_id
+        spotify_id = song.spotify_id
         
         history = await _fetch_historical_data(
             chartex_client=chartex_client,
@@ -446,8 +577,8 @@ async def get_song_history(
         return {
             "song": {
                 "id": song_id,
-                "title": song.get("title"),
-                "artist": song.get("artist"),
+                "title": song.title,
+                "artist": song.artist,
                 "tiktok_sound_id": tiktok_sound_id,
                 "spotify_id": spotify_id
             },
@@ -467,55 +598,42 @@ async def get_song_history(
         )
 
 
-async def _enrich_song(song: Dict, spotify_client, chartex_client, include_history: bool, history_days: int) -> Dict:
+@traced("enrich_song")
+async def _enrich_song(song: Song, spotify_client, chartex_client, include_history: bool, history_days: int) -> Dict:
     """Helper function to enrich a single song with Spotify and historical data"""
-    # Extract song ID - try multiple possible fields from Chartex API
-    song_id = (
-        song.get("id") or 
-        song.get("song_id") or 
-        song.get("chartex_id") or 
-        song.get("spotify_id") or
-        str(song.get("tiktok_sound_id", ""))
-    )
-    
-    # Get TikTok sound ID - either from song data or fetch via Spotify ID
-    tiktok_sound_id = song.get("tiktok_sound_id")
-    spotify_id = song.get("spotify_id")
+    annotate(song_id=song.id or "")
+    tiktok_sound_id = song.tiktok_sound_id
+    spotify_id = song.spotify_id
     
     # If we have Spotify ID but no TikTok sound ID, fetch it
     if spotify_id and not tiktok_sound_id and chartex_client:
         try:
-            logger.info(f"🔍 Fetching TikTok sound ID for Spotify track: {spotify_id}")
-            tiktok_sounds = await chartex_client.get_tiktok_sounds_for_song(spotify_id, limit=1)
-            if tiktok_sounds and "data" in tiktok_sounds:
-                items = tiktok_sounds["data"].get("items", [])
-                if items and len(items) > 0:
-                    tiktok_sound_id = items[0].get("tiktok_sound_id")
-                    logger.info(f"✅ Found TikTok sound ID: {tiktok_sound_id}")
-                    # Also update the song metrics with fresh data
-                    song["tiktok_sound_id"] = tiktok_sound_id
-                    song["tiktok_total_video_count"] = items[0].get("tiktok_total_video_count")
-                    song["tiktok_last_7_days_video_count"] = items[0].get("tiktok_last_7_days_video_count")
-                    song["tiktok_last_24_hours_video_count"] = items[0].get("tiktok_last_24_hours_video_count")
+            logger.debug("🔍 Fetching TikTok sound ID for Spotify track: %s", spotify_id)
+            sounds = parse_song_list(await chartex_client.get_tiktok_sounds_for_song(spotify_id, limit=1))
+            if sounds:
+                # Also update the song metrics with fresh data
+                song.update_tiktok_metrics(sounds[0])
+                tiktok_sound_id = song.tiktok_sound_id
+                logger.debug("✅ Found TikTok sound ID: %s", tiktok_sound_id)
         except Exception as e:
-            logger.info(f"⚠️  Error fetching TikTok sound ID: {e}")
+            logger.warning("⚠️  Error fetching TikTok sound ID: %s", e)
     
     enriched_song = {
-        "id": song_id,
-        "title": song.get("title", song.get("song_name")),
-        "artist": song.get("artist", song.get("artists")),
-        "album_image": song.get("song_image_url"),
+        "id": song.id or "",
+        "title": song.title,
+        "artist": song.artist,
+        "album_image": song.image_url,
         "spotify_id": spotify_id,  # Store at top level for easy access
         "tiktok_sound_id": tiktok_sound_id,  # Store at top level for easy access
-        "label": song.get("label_name") or song.get("label"),  # Record label from Chartex
-        "distributor": song.get("distributor"),  # Distributor information
-        "record_label": song.get("label_name") or song.get("label") or song.get("distributor") or None,  # Combined label field
+        "label": song.label_name,  # Record label from Chartex
+        "distributor": song.distributor,  # Distributor information
+        "record_label": song.record_label,  # Combined label field
         "tiktok_metrics": {
-            "total_videos": song.get("tiktok_total_video_count"),
-            "last_7_days_videos": song.get("tiktok_last_7_days_video_count"),
-            "last_24h_videos": song.get("tiktok_last_24_hours_video_count"),
-            "last_24h_percentage": song.get("tiktok_last_24_hours_video_percentage"),
-            "total_sounds": song.get("tiktok_total_sound_count"),
+            "total_videos": song.tiktok_total_video_count,
+            "last_7_days_videos": song.tiktok_last_7_days_video_count,
+            "last_24h_videos": song.tiktok_last_24_hours_video_count,
+            "last_24h_percentage": song.tiktok_last_24_hours_video_percentage,
+            "total_sounds": song.tiktok_total_sound_count,
             "sound_id": tiktok_sound_id
         },
         "spotify": None,
@@ -523,7 +641,6 @@ async def _enrich_song(song: Dict, spotify_client, chartex_client, include_histo
     }
     
     # Get Spotify data if available
-    spotify_id = song.get("spotify_id")
     if spotify_id and spotify_client:
         try:
             spotify_data = await spotify_client.get_track(spotify_id)
@@ -538,13 +655,13 @@ async def _enrich_song(song: Dict, spotify_client, chartex_client, include_histo
                     "preview_url": spotify_data.get("preview_url")
                 }
         except Exception as e:
-            logger.info(f"⚠️ Error fetching Spotify data for {spotify_id}: {e}")
+            logger.warning("⚠️ Error fetching Spotify data for %s: %s", spotify_id, e)
     
     # Get historical data if requested
     if include_history:
-        history = await _fetch_historical_data(
+        history = await _fetch_historical_data_cached(
             chartex_client=chartex_client,
-            tiktok_sound_id=song.get("tiktok_sound_id"),
+            tiktok_sound_id=tiktok_sound_id,
             spotify_id=spotify_id,
             days=history_days
         )
@@ -553,6 +670,7 @@ async def _enrich_song(song: Dict, spotify_client, chartex_client, include_histo
     return enriched_song
 
 
+@traced("fetch_historical_data")
 async def _fetch_historical_data(
     chartex_client,
     tiktok_sound_id: Optional[str],
@@ -581,148 +699,258 @@ async def _fetch_historical_data(
     if fetch_tiktok and tiktok_sound_id:
         try:
             # TikTok Video Counts (daily new videos using this sound)
-            video_counts = await chartex_client.get_song_stats(
+            video_counts = parse_stats(await chartex_client.get_song_stats(
                 platform_id=tiktok_sound_id,
                 platform="tiktok",
                 metric="tiktok-video-counts",
                 mode="daily",
                 limit_by_latest_days=days
-            )
-            
-            if video_counts and "results" in video_counts:
-                history["tiktok"]["video_counts"] = _format_time_series(
-                    video_counts["results"],
-                    value_key="value"
-                )
+            ))
+            if video_counts.points:
+                history["tiktok"]["video_counts"] = video_counts.as_dicts()
             
             # TikTok Video Views (cumulative views)
-            video_views = await chartex_client.get_song_stats(
+            video_views = parse_stats(await chartex_client.get_song_stats(
                 platform_id=tiktok_sound_id,
                 platform="tiktok",
                 metric="tiktok-video-views",
                 mode="total",
                 limit_by_latest_days=days
-            )
-            
-            if video_views and "results" in video_views:
-                history["tiktok"]["video_views"] = _format_time_series(
-                    video_views["results"],
-                    value_key="value"
-                )
+            ))
+            if video_views.points:
+                history["tiktok"]["video_views"] = video_views.as_dicts()
         
         except Exception as e:
-            logger.info(f"⚠️ Error fetching TikTok history for {tiktok_sound_id}: {e}")
+            logger.warning("⚠️ Error fetching TikTok history for %s: %s", tiktok_sound_id, e)
     
     # Fetch Spotify historical streaming data via Chartex
     if spotify_id:
         try:
-            logger.info(f"🎵 Fetching Spotify streaming data for {spotify_id}")
-            spotify_streams = await chartex_client.get_song_stats(
+            logger.debug("🎵 Fetching Spotify streaming data for %s", spotify_id)
+            spotify_streams = parse_stats(await chartex_client.get_song_stats(
                 platform_id=spotify_id,
                 platform="spotify",
                 metric="spotify-streams",
                 mode="daily",
                 limit_by_latest_days=days
-            )
-            
-            logger.info(f"📊 Spotify streams response: {spotify_streams}")
+            ))
             
-            if spotify_streams and "data" in spotify_streams:
-                data_obj = spotify_streams["data"]
-                
-                # Capture total all-time streams
-                total_streams = data_obj.get("spotify_total_streams", 0)
-                
-                # The Chartex API returns: {"data": {"stream_counts": [...], "spotify_total_streams": X}}
-                if "stream_counts" in data_obj and data_obj["stream_counts"]:
-                    logger.info(f"✅ Found {len(data_obj['stream_counts'])} Spotify stream data points")
-                    logger.info(f"✅ Total all-time streams: {total_streams}")
-                    
-                    # Convert stream_counts to our format
-                    formatted_streams = []
-                    for item in data_obj["stream_counts"]:
-                        formatted_streams.append({
-                            "date": item.get("date"),
-                            "value": item.get("spotify_stream_count", 0)
-                        })
-                    
-                    history["spotify"]["streams"] = formatted_streams
-                    history["spotify"]["total_streams"] = total_streams  # Add total all-time streams
-                    logger.info(f"✅ Formatted {len(formatted_streams)} Spotify streams with total: {total_streams}")
-                else:
-                    logger.info(f"⚠️ No stream_counts in Spotify response")
-                    # Even if no daily data, capture total if available
-                    if total_streams > 0:
-                        history["spotify"]["total_streams"] = total_streams
-
+            # Total all-time streams is reported even when there is no daily data
+            history["spotify"]["total_streams"] = spotify_streams.total
+            if spotify_streams.points:
+                history["spotify"]["streams"] = spotify_streams.as_dicts()
+                logger.debug("✅ %s Spotify stream data points, total: %s", len(spotify_streams.points), spotify_streams.total)
             else:
-                logger.info(f"❌ No data in Spotify response")
+                logger.debug("⚠️ No Spotify stream data for %s", spotify_id)
         
         except Exception as e:
-            logger.info(f"⚠️ Error fetching Spotify history for {spotify_id}: {e}")
+            logger.warning("⚠️ Error fetching Spotify history for %s: %s", spotify_id, e)
     
     return history
 
 
-def _format_time_series(data: List[Dict], value_key: str = "value") -> List[Dict]:
+async def _fetch_historical_data_cached(
+    chartex_client,
+    tiktok_sound_id: Optional[str],
+    spotify_id: Optional[str],
+    days: int = 30,
+    fetch_tiktok: bool = True
+) -> Dict[str, Any]:
     """
-    Format time series data for frontend consumption
-    
-    Input format from Chartex:
-    [{"date": "2026-01-15", "value": 1234}, ...]
-    
-    Output format:
-    [{"date": "2026-01-15", "value": 1234}, ...]
+    _fetch_historical_data behind the history cache
+    The same song shows up under many filter combinations, so its series is fetched once per TTL.
     """
-    if not data:
-        return []
-    
-    formatted = []
-    for point in data:
-        formatted.append({
-            "date": point.get("date"),
-            "value": point.get(value_key, 0)
-        })
-    
-    # Sort by date ascending (oldest first)
-    formatted.sort(key=lambda x: x["date"])
-    
-    return formatted
+    cache_key = _history_cache.make_key({
+        "tiktok_sound_id": str(tiktok_sound_id) if tiktok_sound_id else None,
+        "spotify_id": spotify_id,
+        "days": days,
+        "fetch_tiktok": fetch_tiktok
+    })
+    async def fetch() -> Dict[str, Any]:
+        history = await _fetch_historical_data(
+            chartex_client=chartex_client,
+            tiktok_sound_id=tiktok_sound_id,
+            spotify_id=spotify_id,
+            days=days,
+            fetch_tiktok=fetch_tiktok
+        )
+        if history["tiktok"]["video_counts"] or history["spotify"]["streams"] or history["spotify"]["total_streams"]:
+            _history_cache.set(cache_key, history)
+        return history
+
+    refreshed = _refresh_history.get()
+    if refreshed is not None:
+        annotate(history_cache="refresh")
+        if cache_key not in refreshed:
+            refreshed[cache_key] = asyncio.ensure_future(fetch())
+        return await refreshed[cache_key]
+
+    history = _history_cache.get(cache_key)
+    annotate(history_cache="hit" if history is not None else "miss")
+    if history is not None:
+        return history
+    return await fetch()
 
 
-def _format_time_series_flexible(data: List[Dict]) -> List[Dict]:
+def _song_identity(spotify_id: Optional[str], title: Optional[str], artist: Optional[str]) -> Any:
+    """What makes a chart entry and a pin the same song"""
+    if spotify_id:
+        return spotify_id
+    return (str(title or "").strip().lower(), str(artist or "").strip().lower())
+
+
+async def _pinned_entry(
+    pin: Dict[str, Any],
+    generation: Optional[int],
+    spotify_client,
+    include_history: bool,
+    history_days: int
+) -> Dict[str, Any]:
+    """A pin enriched like any other trending song (sharing the history cache), plus pin fields"""
+    cache_key = _pinned_cache.make_key({
+        "pin_id": pin["id"],
+        "generation": generation,
+        "include_history": include_history,
+        "history_days": history_days,
+        "spotify": spotify_client is not None
+    })
+    entry = _pinned_cache.get(cache_key)
+    if entry is None:
+        song = Song(
+            id=pin["spotify_id"] or f"pinned-{pin['id']}",
+            title=pin["song_name"],
+            artist=pin["artist_name"],
+            image_url=pin["song_image_url"],
+            spotify_id=pin["spotify_id"],
+            label_name=pin["label_name"]
+        )
+        entry = await _enrich_song(song, spotify_client, get_chartex_client(), include_history, history_days)
+        _pinned_cache.set(cache_key, entry)
+    return {
+        **entry,
+        "pinned": True,
+        "pin_id": pin["id"],
+        "pin_position": pin["pin_position"],
+        "pin_notes": pin["notes"]
+    }
+
+
+def _active_pins(label_type: Optional[str]) -> List[Dict[str, Any]]:
+    """Active pins (ascending pin_position) that pass the label filter"""
+    return [
+        pin for pin in get_pinned_snapshot().pins()
+        if not label_type or _matches_label_filter(str(pin["label_name"] or "").lower(), label_type)
+    ]
+
+
+async def _splice_pinned_songs(pins: List[Dict[str, Any]], params: Dict[str, Any]):
     """
-    Flexible formatter that tries multiple possible field names
+    Page offset/limit of the chart with pins at their pin_position (1-based, chart-wide)
+    Pages keep their length: positions not taken by a pin are filled from the organic
+    chart with the pinned songs removed, shifted back by the pins before this page.
+    Only the organic pages covering that window are built; pinned songs charting above
+    it are counted from the pages already cached (clients page forward, so normally all
+    of them) - a page that isn't cached is assumed to chart none, rather than built.
+    
+    Returns (response, version, entry): entry is the cache entry holding the response
+    (the organic page itself, or the spliced page) whose encoded body can be reused;
+    version is None when the ETag has to come from the body.
     """
-    if not data:
-        return []
-    
-    formatted = []
-    for point in data:
-        # Try different date field names
-        date = point.get("date") or point.get("timestamp") or point.get("day")
-        
-        # Try different value field names
-        value = (
-            point.get("value") or 
-            point.get("count") or 
-            point.get("video_count") or
-            point.get("tiktok_video_count") or  # Chartex uses this field name
-            point.get("spotify_stream_count") or
-            point.get("streams") or
-            0
-        )
-        
-        if date:
-            formatted.append({
-                "date": date,
-                "value": value
-            })
+    offset, limit = params["offset"], params["limit"]
+    snapshot = get_pinned_snapshot()
+    page_pins = [pin for pin in pins if offset < pin["pin_position"] <= offset + limit]
+    pins_before = sum(1 for pin in pins if pin["pin_position"] <= offset)
+    pinned_ids = {_song_identity(pin["spotify_id"], pin["song_name"], pin["artist_name"]) for pin in pins}
+
+    def is_pinned(song: Dict[str, Any]) -> bool:
+        return _song_identity(song.get("spotify_id"), song.get("title"), song.get("artist")) in pinned_ids
+    
+    # Index range in the organic chart without the pinned songs
+    organic_start = offset - pins_before
+    needed = limit - len(page_pins)
+    
+    # Skip the pages above the window: `index` = organic songs before page_offset
+    pages = []
+    page_offset = 0
+    index = 0
+    while index + limit <= organic_start:
+        entry = _response_cache.get_entry(_response_cache.make_key({**params, "offset": page_offset}))
+        if entry is None:
+            skipped = (organic_start - index) // limit * limit
+            page_offset += skipped
+            index += skipped
+            break
+        on_page = sum(1 for song in entry.value.get("songs", []) if not is_pinned(song))
+        if index + on_page > organic_start or not entry.value.get("has_more"):
+            break
+        pages.append((entry.value, entry))
+        index += on_page
+        page_offset += limit
+    
+    organic: List[Dict[str, Any]] = []
+    dropped = 0
+    has_more = True
+    window_pages = 0
+    unshifted = index == page_offset == offset  # The window is exactly page `offset`, unless it drops songs
+    while not window_pages or (has_more and len(organic) < needed):
+        data, entry = await _trending_page({**params, "offset": page_offset})
+        pages.append((data, entry))
+        window_pages += 1
+        for song in data.get("songs", []):
+            if is_pinned(song):
+                dropped += 1
+                continue
+            if index >= organic_start:
+                organic.append(song)
+            index += 1
+        has_more = bool(data.get("has_more")) and bool(data.get("songs"))
+        page_offset += limit
+    
+    last_data, last_entry = pages[-1]
+    more_pins = any(pin["pin_position"] > offset + limit for pin in pins)
+    version = None
+    if all(entry is not None for _, entry in pages):
+        # Pin edits change every page (positions shift, songs drop out) - part of the version
+        version = ":".join(entry.version for _, entry in pages) + f":pins:{snapshot.generation}"
     
-    # Sort by date ascending (oldest first)
-    formatted.sort(key=lambda x: x["date"])
+    if (
+        unshifted and not page_pins and not dropped and window_pages == 1
+        and (has_more or not more_pins)
+    ):
+        return last_data, version, last_entry  # Exactly the cached organic page
     
-    return formatted
+    spliced_key = None
+    if version is not None:
+        spliced_key = _spliced_cache.make_key({**params, "version": version})
+        spliced = _spliced_cache.get_entry(spliced_key)
+        if spliced is not None:
+            return spliced.value, None if page_pins else version, spliced
+    
+    songs = organic[:needed]
+    if page_pins:
+        spotify_client = None
+        if params["include_spotify_metadata"] and settings.SPOTIFY_CLIENT_ID and settings.SPOTIFY_CLIENT_SECRET:
+            spotify_client = SpotifyClient()
+        pinned_entries = await asyncio.gather(*(
+            _pinned_entry(pin, snapshot.generation, spotify_client, params["include_history"], params["history_days"])
+            for pin in page_pins
+        ))
+        # Ascending positions, so earlier inserts don't shift later ones
+        for pinned_entry in pinned_entries:
+            songs.insert(min(pinned_entry["pin_position"] - 1 - offset, len(songs)), pinned_entry)
+    
+    response_data = {
+        **last_data,
+        "songs": songs,
+        "total": len(songs),
+        "offset": offset,
+        "limit": limit,
+        "has_more": len(organic) > needed or has_more or more_pins,
+        "pinned": len(page_pins)
+    }
+    spliced = _spliced_cache.set(spliced_key, response_data) if spliced_key else None
+    # Pin entries are enriched separately - their pages take the ETag from the body
+    return response_data, None if page_pins else version, spliced
 
 
 @router.get("/{song_id}/analytics")
@@ -749,26 +977,22 @@ async def get_song_analytics(
         chartex_client = get_chartex_client()
         
         # Try to get song metadata from Chartex for totals
-        song_metadata = None
+        song_metadata: Optional[Song] = None
         if not tiktok_sound_id and not spotify_id:
-            song_detail = await chartex_client.get_song_detail(song_id)
-            if song_detail:
-                song_data = song_detail.get("data", {})
-                song_metadata = song_data
-                tiktok_sound_id = song_data.get("tiktok_sound_id")
-                spotify_id = song_data.get("spotify_id")
+            song_metadata = parse_song_detail(await chartex_client.get_song_detail(song_id))
+            if song_metadata:
+                tiktok_sound_id = song_metadata.tiktok_sound_id
+                spotify_id = song_metadata.spotify_id
                 if not title:
-                    title = song_data.get("title", "Unknown")
+                    title = song_metadata.title or "Unknown"
                 if not artist:
-                    artist = song_data.get("artist_name", "Unknown Artist")
+                    artist = song_metadata.artist or "Unknown Artist"
         
         # If we have a TikTok sound ID, fetch its metadata for totals
-        if tiktok_sound_id and not song_metadata:
-            tiktok_sounds = await chartex_client.get_tiktok_sounds_for_song(spotify_id, limit=1) if spotify_id else None
-            if tiktok_sounds and "data" in tiktok_sounds:
-                items = tiktok_sounds["data"].get("items", [])
-                if items and len(items) > 0:
-                    song_metadata = items[0]
+        if tiktok_sound_id and not song_metadata and spotify_id:
+            sounds = parse_song_list(await chartex_client.get_tiktok_sounds_for_song(spotify_id, limit=1))
+            if sounds:
+                song_metadata = sounds[0]
         
         # If still no IDs, return error
         if not tiktok_sound_id and not spotify_id:
@@ -784,71 +1008,30 @@ async def get_song_analytics(
         # Fetch TikTok creates timeline
         tiktok_timeline = []
         if tiktok_sound_id:
-            logger.info(f"📊 Fetching TikTok video counts for TikTok sound ID: {tiktok_sound_id}")
-            tiktok_stats = await chartex_client.get_song_stats(
+            logger.debug("📊 Fetching TikTok video counts for TikTok sound ID: %s", tiktok_sound_id)
+            tiktok_stats = parse_stats(await chartex_client.get_song_stats(
                 platform_id=str(tiktok_sound_id),
                 platform="tiktok",
                 metric="tiktok-video-counts",
                 mode="daily",
                 limit_by_latest_days=days
-            )
-            logger.info(f"📊 TikTok stats raw response: {tiktok_stats}")
-            
-            if tiktok_stats:
-                # Try different possible response structures
-                data_obj = tiktok_stats.get("data", tiktok_stats)
-                
-                # Look for video_counts, stream_counts, results, or items
-                counts = (
-                    data_obj.get("video_counts") or 
-                    data_obj.get("stream_counts") or 
-                    data_obj.get("results") or
-                    data_obj.get("items") or
-                    []
-                )
-                
-                logger.info(f"📊 TikTok counts extracted: {len(counts)} items")
-                if counts and len(counts) > 0:
-                    logger.info(f"📊 First TikTok data point: {counts[0]}")
-                    # Try different value keys
-                    tiktok_timeline = _format_time_series_flexible(counts)
-                    logger.info(f"📊 Formatted TikTok timeline: {len(tiktok_timeline)} points")
-            else:
-                logger.info(f"⚠️ No TikTok stats data returned")
+            ))
+            tiktok_timeline = tiktok_stats.as_dicts()
+            logger.debug("📊 TikTok timeline: %s points", len(tiktok_timeline))
         
         # Fetch Spotify streams timeline
         spotify_timeline = []
         if spotify_id:
-            logger.info(f"🎵 Fetching Spotify stats for track_id: {spotify_id}")
-            spotify_stats = await chartex_client.get_song_stats(
+            logger.debug("🎵 Fetching Spotify stats for track_id: %s", spotify_id)
+            spotify_stats = parse_stats(await chartex_client.get_song_stats(
                 platform_id=spotify_id,
                 platform="spotify",
                 metric="spotify-streams",
                 mode="daily",
                 limit_by_latest_days=days
-            )
-            logger.info(f"🎵 Spotify stats raw response: {spotify_stats}")
-            
-            if spotify_stats:
-                data_obj = spotify_stats.get("data", spotify_stats)
-                
-                # Look for stream_counts, results, or items
-                counts = (
-                    data_obj.get("stream_counts") or 
-                    data_obj.get("results") or
-                    data_obj.get("items") or
-                    []
-                )
-                
-                logger.info(f"🎵 Spotify counts extracted: {len(counts)} items")
-                if counts and len(counts) > 0:
-                    logger.info(f"🎵 First Spotify data point: {counts[0]}")
-                    spotify_timeline = _format_time_series_flexible(counts)
-                    logger.info(f"🎵 Formatted Spotify timeline: {len(spotify_timeline)} points")
-                    if spotify_timeline and len(spotify_timeline) > 0:
-                        logger.info(f"🎵 First formatted point: {spotify_timeline[0]}")
-            else:
-                logger.info(f"⚠️ No Spotify stats data returned")
+            ))
+            spotify_timeline = spotify_stats.as_dicts()
+            logger.debug("🎵 Spotify timeline: %s points", len(spotify_timeline))
         
         # Get market breakdowns (if available from song data)
         # Note: Market breakdowns might not be available for all songs
@@ -864,9 +1047,9 @@ async def get_song_analytics(
         
         # Calculate totals - use metadata if available, otherwise calculate from timeline
         if song_metadata:
-            tiktok_total = song_metadata.get("tiktok_total_video_count", 0)
-            tiktok_last_7d = song_metadata.get("tiktok_last_7_days_video_count", 0)
-            tiktok_last_24h = song_metadata.get("tiktok_last_24_hours_video_count", 0)
+            tiktok_total = song_metadata.tiktok_total_video_count or 0
+            tiktok_last_7d = song_metadata.tiktok_last_7_days_video_count or 0
+            tiktok_last_24h = song_metadata.tiktok_last_24_hours_video_count or 0
         else:
             tiktok_total = sum(point["value"] for point in tiktok_timeline) if tiktok_timeline else 0
             tiktok_last_7d = sum(point["value"] for point in tiktok_timeline[-7:]) if len(tiktok_timeline) >= 7 else tiktok_total
@@ -912,12 +1095,9 @@ async def manual_refresh_cache(user: dict = Depends(get_current_user)):
     Clears cached data to force fresh fetch from Chartex on next request.
     """
     try:
-        global _response_cache
-        _response_cache.clear()
+        clear_caches()
         
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"🔄 Manual cache refresh triggered at {datetime.now()}")
+        logger.info("🔄 Manual cache refresh triggered")
         
         return {
             "success": True,
@@ -937,7 +1117,7 @@ async def force_refresh_chartex_data():
     """
     try:
         logger.info("🚀🚀🚀 FORCE REFRESH TRIGGERED 🚀🚀🚀")
-        _response_cache.clear()
+        clear_caches()
         logger.info("✅ All caches cleared successfully")
         logger.info("✅ Next request will fetch completely fresh data from Chartex API")
         
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-import httpx
-from typing import Optional, Dict, List
+import asyncio
+import logging
+from typing import Optional, Dict
+from urllib.parse import quote
 
 from app.db.session import SessionLocal
-from app.models.user import User
-from app.core.security import get_current_user
+from app.core.security import AuthenticatedUser, get_authenticated_user, invalidate_user
+from app.core.graph_client import GraphError, get_graph_client
+from app.core.config import settings
+from app.core.mail_sync import list_messages, list_messages_before_window, mailbox_folders, sync_folders
+from app.core.mail_index import artist_correspondence, search_messages
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/mail",
     tags=["mail"]
 )
 
+# Attachment metadata only - content is fetched per attachment when it is shown
+ATTACHMENT_FIELDS = "id,name,contentType,size,isInline"
+
 def get_db():
     db = SessionLocal()
     try:
@@ -20,296 +30,263 @@ def get_db():
         db.close()
 
 async def get_user_with_token(
-    current_user: Dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get user with Microsoft token from database"""
-    user = db.query(User).filter(User.email == current_user["sub"]).first()
-    
-    if not user or not user.microsoft_token:
+    user: AuthenticatedUser = Depends(get_authenticated_user)
+) -> AuthenticatedUser:
+    """Get user with Microsoft token (cached - see get_authenticated_user)"""
+    if not user.microsoft_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No Microsoft token found. Please login with Microsoft."
         )
-    
+
     return user
 
+def _graph_error(e: GraphError, action: str, user: AuthenticatedUser) -> HTTPException:
+    """Map a Graph failure to the API error the dashboard expects"""
+    if e.status_code == 401:
+        # The cached token may predate a re-login on another worker - reload it next time
+        invalidate_user(user.email)
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Microsoft token expired. Please login again."
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Failed to {action}: {e.text}"
+    )
+
+async def _synced_messages(
+    db: Session,
+    user: AuthenticatedUser,
+    folder: Optional[str],
+    path: str,
+    top: int,
+    skip: int,
+    since: Optional[float],
+    refresh: bool,
+    action: str
+) -> Dict:
+    """
+    Delta-sync a folder (None = every folder, like /me/messages), then answer from
+    the local header cache; pages reaching past MAIL_SYNC_WINDOW_DAYS continue from Graph
+    """
+    try:
+        folders = await mailbox_folders(user, force=refresh) if folder is None else [folder]
+        cursor = await sync_folders(db, user, folders, force=refresh)
+        messages, has_more = list_messages(db, user, folders, top=top, skip=skip, since=since)
+        if since is None and not has_more and settings.MAIL_SYNC_WINDOW_DAYS > 0:
+            graph_path = "/me/messages" if folder is None else f"/me/mailFolders/{folder}/messages"
+            older, has_more = await list_messages_before_window(db, user, folders, graph_path, top, skip)
+            messages = messages + older
+    except GraphError as e:
+        raise _graph_error(e, action, user)
+
+    data = {"value": messages, "cursor": cursor}
+    if has_more:
+        data["@odata.nextLink"] = f"{router.prefix}{path}?top={top}&skip={skip + top}"
+    return data
+
 @router.get("/inbox")
 async def get_inbox(
-    top: int = 50,
+    top: int = Query(50, ge=1, le=500),
     select: str = "full",
-    user: User = Depends(get_user_with_token)
+    skip: int = Query(0, ge=0),
+    since: Optional[float] = Query(None, description="Cursor from a previous response - return only what changed"),
+    refresh: bool = Query(False, description="Ask Graph for changes even if the folder synced moments ago"),
+    user: AuthenticatedUser = Depends(get_user_with_token),
+    db: Session = Depends(get_db)
 ):
-    """Get user's inbox messages from Microsoft Graph API
-    
+    """Get user's message headers from all folders, like /me/messages (delta-synced from Microsoft Graph)
+
     Args:
-        top: Number of messages to fetch (default 50)
-        select: 'minimal' for list view (id, subject, from, date) or 'full' for all fields
+        top: Number of messages to return (default 50)
+        select: kept for compatibility - headers always include bodyPreview;
+                bodies and attachments come from /message/{id}
+        since: cursor from a previous response; returns changed messages plus
+               {"id", "@removed"} entries for removed ones (synced window only)
     """
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    # Optimize query based on select parameter
-    if select == "minimal":
-        # Fast list view - only essential fields
-        query_params = (
-            f"$select=id,conversationId,subject,from,receivedDateTime,isRead,hasAttachments"
-            f"&$orderby=receivedDateTime desc"
-            f"&$top={top}"
-        )
-    else:
-        # Full view with body preview and attachments
-        query_params = f"$top={top}&$orderby=receivedDateTime desc&$expand=attachments"
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.get(
-            f"https://graph.microsoft.com/v1.0/me/messages?{query_params}",
-            headers=headers
-        )
-        
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Microsoft token expired. Please login again."
-            )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch emails: {response.text}"
-            )
-        
-        data = response.json()
-        return data
+    return await _synced_messages(db, user, None, "/inbox", top, skip, since, refresh, "fetch emails")
 
 @router.get("/sent")
 async def get_sent(
-    top: int = 50,
+    top: int = Query(50, ge=1, le=500),
     select: str = "full",
-    user: User = Depends(get_user_with_token)
+    skip: int = Query(0, ge=0),
+    since: Optional[float] = Query(None, description="Cursor from a previous response - return only what changed"),
+    refresh: bool = Query(False, description="Ask Graph for changes even if the folder synced moments ago"),
+    user: AuthenticatedUser = Depends(get_user_with_token),
+    db: Session = Depends(get_db)
 ):
-    """Get user's sent messages from Microsoft Graph API
-    
+    """Get user's sent message headers (delta-synced from Microsoft Graph)
+
     Args:
-        top: Number of messages to fetch (default 50)
-        select: 'minimal' for list view or 'full' for all fields
+        top: Number of messages to return (default 50)
+        select: kept for compatibility - see /inbox
+        since: cursor from a previous response - only changes are returned
     """
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    # Optimize query based on select parameter
-    if select == "minimal":
-        query_params = (
-            f"$select=id,conversationId,subject,toRecipients,sentDateTime,hasAttachments"
-            f"&$orderby=sentDateTime desc"
-            f"&$top={top}"
-        )
-    else:
-        query_params = f"$top={top}&$orderby=sentDateTime desc"
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.get(
-            f"https://graph.microsoft.com/v1.0/me/mailFolders/SentItems/messages?{query_params}",
-            headers=headers
-        )
-        
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Microsoft token expired. Please login again."
-            )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch sent emails: {response.text}"
-            )
-        
-        data = response.json()
-        return data
+    return await _synced_messages(db, user, "sentitems", "/sent", top, skip, since, refresh, "fetch sent emails")
+
+@router.get("/search")
+async def search_mail(
+    q: str = Query(..., min_length=1, description="Words to find in subject, sender/recipients or body"),
+    limit: int = Query(50, ge=1, le=200),
+    folder: Optional[str] = Query(None, description="Folder id or inbox/sentitems; default all synced folders"),
+    user: AuthenticatedUser = Depends(get_user_with_token),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over synced mail (local index - no Graph call)"""
+    messages = search_messages(db, user.id, q, limit=limit, folder=folder)
+    return {"query": q, "total": len(messages), "value": messages}
+
+@router.get("/correspondence")
+async def get_artist_correspondence(
+    artist: str = Query(..., min_length=1, description="Artist name"),
+    limit: int = Query(200, ge=1, le=500),
+    user: AuthenticatedUser = Depends(get_user_with_token),
+    db: Session = Depends(get_db)
+):
+    """All synced conversations mentioning an artist, newest first (local index - no Graph call)"""
+    conversations = artist_correspondence(db, user.id, artist, limit=limit)
+    return {"artist": artist, "total": len(conversations), "conversations": conversations}
 
 @router.get("/message/{message_id}")
 async def get_message(
     message_id: str,
-    user: User = Depends(get_user_with_token)
+    user: AuthenticatedUser = Depends(get_user_with_token)
+):
+    """Get a specific message with attachment metadata
+
+    Inline attachments (images referenced from the body) include contentBytes so
+    the body renders as before; other attachments are listed without content -
+    download them from /message/{message_id}/attachments/{attachment_id}.
+    """
+    client = get_graph_client()
+    try:
+        message = await client.get_json(
+            f"/me/messages/{message_id}",
+            user.microsoft_token,
+            params={"$expand": f"attachments($select={ATTACHMENT_FIELDS})"}
+        )
+        inline = [att for att in message.get("attachments", []) if att.get("isInline")]
+        if inline:
+            full = await asyncio.gather(*(
+                client.get_json(f"/me/messages/{message_id}/attachments/{att['id']}", user.microsoft_token)
+                for att in inline
+            ))
+            by_id = {att["id"]: att for att in full}
+            message["attachments"] = [by_id.get(att["id"], att) for att in message["attachments"]]
+    except GraphError as e:
+        raise _graph_error(e, "fetch message", user)
+
+    for att in message.get("attachments", []):
+        if not att.get("contentBytes"):
+            att["downloadUrl"] = f"{router.prefix}/message/{message_id}/attachments/{att['id']}"
+    return message
+
+@router.get("/message/{message_id}/attachments/{attachment_id}")
+async def get_attachment(
+    message_id: str,
+    attachment_id: str,
+    user: AuthenticatedUser = Depends(get_user_with_token)
 ):
-    """Get a specific message with attachments"""
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
-            f"https://graph.microsoft.com/v1.0/me/messages/{message_id}?$expand=attachments",
-            headers=headers
+    """Raw content of one attachment"""
+
+    client = get_graph_client()
+    try:
+        meta = await client.get_json(
+            f"/me/messages/{message_id}/attachments/{attachment_id}",
+            user.microsoft_token,
+            params={"$select": ATTACHMENT_FIELDS}
+        )
+        response = await client.request(
+            "GET", f"/me/messages/{message_id}/attachments/{attachment_id}/$value", user.microsoft_token
         )
-        
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Microsoft token expired. Please login again."
-            )
-        
         if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch message: {response.text}"
-            )
-        
-        return response.json()
+            raise GraphError(response.status_code, response.text)
+    except GraphError as e:
+        raise _graph_error(e, "fetch attachment", user)
+
+    filename = quote(meta.get("name") or "attachment")
+    return Response(
+        content=response.content,
+        media_type=meta.get("contentType") or "application/octet-stream",
+        headers={
+            "Content-Disposition": f"inline; filename*=UTF-8''{filename}",
+            "Cache-Control": "private, max-age=86400"
+        }
+    )
 
 @router.get("/conversation/{conversation_id}")
 async def get_conversation(
     conversation_id: str,
-    user: User = Depends(get_user_with_token)
+    user: AuthenticatedUser = Depends(get_user_with_token)
 ):
     """Get all messages in a conversation thread"""
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    print(f"Fetching conversation: {conversation_id}")
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://graph.microsoft.com/v1.0/me/messages?$filter=conversationId eq '{conversation_id}'&$orderby=receivedDateTime asc",
-            headers=headers
+
+    logger.debug("Fetching conversation: %s", conversation_id)
+
+    try:
+        return await get_graph_client().get_json(
+            "/me/messages",
+            user.microsoft_token,
+            params={
+                "$filter": f"conversationId eq '{conversation_id}'",
+                "$orderby": "receivedDateTime asc"
+            }
         )
-        
-        print(f"Graph API response status: {response.status_code}")
-        print(f"Graph API response: {response.text[:500]}")
-        
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Microsoft token expired. Please login again."
-            )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch conversation: {response.text}"
-            )
-        
-        data = response.json()
-        return data
+    except GraphError as e:
+        logger.debug("Graph API response status: %s", e.status_code)
+        raise _graph_error(e, "fetch conversation", user)
 
 @router.get("/folders")
-async def get_folders(user: User = Depends(get_user_with_token)):
+async def get_folders(user: AuthenticatedUser = Depends(get_user_with_token)):
     """Get user's mail folders"""
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://graph.microsoft.com/v1.0/me/mailFolders?$top=100",
-            headers=headers
+
+    try:
+        return await get_graph_client().get_json(
+            "/me/mailFolders", user.microsoft_token, params={"$top": 100}
+        )
+    except GraphError as e:
+        if e.status_code == 401:
+            raise _graph_error(e, "fetch folders", user)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch folders"
         )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to fetch folders"
-            )
-        
-        return response.json()
 
 @router.get("/folder/{folder_id}/messages")
 async def get_folder_messages(
     folder_id: str,
-    top: int = 50,
+    top: int = Query(50, ge=1, le=500),
     select: str = "minimal",
-    user: User = Depends(get_user_with_token)
+    skip: int = Query(0, ge=0),
+    since: Optional[float] = Query(None, description="Cursor from a previous response - return only what changed"),
+    refresh: bool = Query(False, description="Ask Graph for changes even if the folder synced moments ago"),
+    user: AuthenticatedUser = Depends(get_user_with_token),
+    db: Session = Depends(get_db)
 ):
-    """Get messages from a specific folder by ID"""
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    # Optimize query based on select parameter
-    if select == "minimal":
-        query_params = (
-            f"$select=id,conversationId,subject,from,receivedDateTime,isRead,hasAttachments"
-            f"&$orderby=receivedDateTime desc"
-            f"&$top={top}"
-        )
-    else:
-        query_params = f"$top={top}&$orderby=receivedDateTime desc&$expand=attachments"
-    
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.get(
-            f"https://graph.microsoft.com/v1.0/me/mailFolders/{folder_id}/messages?{query_params}",
-            headers=headers
-        )
-        
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Microsoft token expired. Please login again."
-            )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch folder messages: {response.text}"
-            )
-        
-        return response.json()
+    """Get message headers from a specific folder by ID (delta-synced, see /inbox)"""
+    return await _synced_messages(
+        db, user, folder_id, f"/folder/{folder_id}/messages", top, skip, since, refresh, "fetch folder messages"
+    )
 
 @router.post("/send")
 async def send_mail(
     message: Dict,
-    user: User = Depends(get_user_with_token)
+    user: AuthenticatedUser = Depends(get_user_with_token)
 ):
     """Send an email via Microsoft Graph API"""
-    
-    headers = {
-        "Authorization": f"Bearer {user.microsoft_token}",
-        "Content-Type": "application/json"
-    }
-    
+
     payload = {
         "message": message,
         "saveToSentItems": "true"
     }
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://graph.microsoft.com/v1.0/me/sendMail",
-            headers=headers,
-            json=payload
-        )
-        
-        if response.status_code == 401:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Microsoft token expired. Please login again."
-            )
-        
-        if response.status_code not in [200, 202]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to send email: {response.text}"
-            )
-        
-        return {"status": "sent", "message": "Email sent successfully"}
 
-@router.get("/message/{message_id}")
-async def get_message(
-    message_id: str,
-    user: User = Depends(get_user_with_token)
-):
-    """Get a specific message by ID"""
-    
-    headers = {"Authorization": f"Bearer {user.microsoft_token}"}
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://graph.microsoft.com/v1.0/me/messages/{message_id}",
-            headers=headers
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Message not found"
-            )
-        
-        return response.json()
+    response = await get_graph_client().request(
+        "POST", "/me/sendMail", user.microsoft_token, json=payload
+    )
+
+    if response.status_code not in [200, 202]:
+        raise _graph_error(GraphError(response.status_code, response.text), "send email", user)
+
+    return {"status": "sent", "message": "Email sent successfully"}
@@ -0,0 +1,179 @@
+"""
+Contract artifact store
+Every temporary file the contract pipeline writes (rendered DOCX, converted PDFs,
+rasterized pages, downloads in flight) lives in its own scratch dir under one
+root, instead of loose files in the shared system temp dir.
+
+    with get_artifact_store().scratch("convert") as job_dir:
+        ...  # removed on exit
+
+    path = store.new_file(".docx", prefix="download")
+    FileResponse(path, background=BackgroundTask(store.remove, path))  # removed after sending
+
+A janitor thread removes scratch dirs older than CONTRACT_ARTIFACT_MAX_AGE_SECONDS
+and, oldest first, anything over CONTRACT_ARTIFACT_MAX_MB - which covers crashed
+requests and clients that went away before their cleanup ran.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Size-based sweeping never touches dirs this young - they are most likely still in use
+_IN_USE_GRACE_SECONDS = 300
+
+
+def _tree_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+def _delete(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+class ArtifactStore:
+    """Scratch dirs under `root`, removed by their owner or by the janitor"""
+
+    def __init__(self, root: Path, max_age: float, max_bytes: int):
+        self.root = Path(root)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._janitor: Optional[threading.Thread] = None
+
+    def new_dir(self, prefix: str = "job") -> Path:
+        """Fresh scratch dir - the caller removes it with remove()"""
+        return Path(tempfile.mkdtemp(prefix=f"{prefix}-", dir=self.root))
+
+    def new_file(self, suffix: str, prefix: str = "file") -> Path:
+        """Path for a new file in its own scratch dir; remove(path) deletes both"""
+        return self.new_dir(prefix) / f"{prefix}{suffix}"
+
+    def _scratch_dir(self, path) -> Optional[Path]:
+        """Top-level scratch dir containing `path` (None for anything outside the store)"""
+        path = Path(path).resolve()
+        root = self.root.resolve()
+        if path == root or root not in path.parents:
+            return None
+        while path.parent != root:
+            path = path.parent
+        return path
+
+    def remove(self, path):
+        """Delete a scratch dir, or the scratch dir a file lives in"""
+        scratch = self._scratch_dir(path)
+        if scratch is None:
+            logger.warning(f"⚠️  Refusing to remove {path} - not in the artifact store")
+            return
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    @contextmanager
+    def scratch(self, prefix: str = "job") -> Iterator[Path]:
+        path = self.new_dir(prefix)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ------------------------
+    # Janitor
+    # ------------------------
+    def _entries(self) -> List[Tuple[float, Path]]:
+        entries = []
+        for path in self.root.iterdir():
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                pass  # Removed by its owner meanwhile
+        return sorted(entries)
+
+    def sweep(self) -> Tuple[int, int]:
+        """Remove expired scratch dirs, then the oldest ones while over the size limit; returns (removed, bytes freed)"""
+        now = time.time()
+        removed = freed = 0
+        kept = []
+        for mtime, path in self._entries():
+            size = _tree_size(path)
+            if now - mtime > self.max_age:
+                _delete(path)
+                removed += 1
+                freed += size
+            else:
+                kept.append((mtime, path, size))
+
+        total = sum(size for _, _, size in kept)
+        for mtime, path, size in kept:
+            if total <= self.max_bytes:
+                break
+            if now - mtime < _IN_USE_GRACE_SECONDS:
+                continue
+            _delete(path)
+            total -= size
+            removed += 1
+            freed += size
+
+        if removed:
+            logger.info(f"🧹 Removed {removed} contract artifacts ({freed / 1024 / 1024:.1f} MB)")
+        return removed, freed
+
+    def start_janitor(self, interval: float):
+        """Sweep now and then every `interval` seconds in a daemon thread"""
+        if self._janitor is not None or interval <= 0:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.warning(f"⚠️  Artifact sweep failed: {e}")
+                time.sleep(interval)
+
+        self._janitor = threading.Thread(target=run, name="artifact-janitor", daemon=True)
+        self._janitor.start()
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(_tree_size(path) for _, path in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Get or create the artifact store singleton (starts the janitor on first use)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            root = settings.CONTRACT_ARTIFACT_DIR or os.path.join(tempfile.gettempdir(), "ar_portal_contract_artifacts")
+            _store = ArtifactStore(
+                Path(root),
+                max_age=settings.CONTRACT_ARTIFACT_MAX_AGE_SECONDS,
+                max_bytes=settings.CONTRACT_ARTIFACT_MAX_MB * 1024 * 1024,
+            )
+            _store.start_janitor(settings.CONTRACT_ARTIFACT_SWEEP_SECONDS)
+        return _store
@@ -9,6 +9,33 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "CHANGE_ME_SUPER_SECRET"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480  # 8 hours
+    USER_CACHE_TTL_SECONDS: int = 60  # Resolved users (incl. Microsoft token) cached per process; 0 disables
+    
+    # Shared state across API workers (OAuth states, cache invalidation)
+    STATE_STORE_BACKEND: str = "db"  # "memory" = per process, single worker only (tests, local dev)
+    STATE_GENERATION_POLL_SECONDS: float = 2.0  # How quickly other workers notice a cache invalidation
+    OAUTH_STATE_TTL_SECONDS: int = 600  # Time allowed between /microsoft/login and its callback
+    
+    # Logging (see app.core.log_config)
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # Per-module overrides, e.g. "app.core.discovery.chartex_client=DEBUG,httpx=WARNING"
+    LOG_FORMAT: str = "text"  # "json" = one JSON object per line
+    LOG_DEBUG_SAMPLE_RATE: int = 0  # N > 0: one in N requests logs at DEBUG
+    
+    # Prometheus-style /metrics endpoint
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""  # Scrapers send "Authorization: Bearer <token>"; empty = loopback clients only
+    METRICS_PUBLISH_SECONDS: float = 15.0  # How often each worker shares its metrics for /metrics
+    
+    # Response compression (see app.core.compression)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bodies smaller than this (bytes) are sent as-is
+    
+    # Request tracing (see app.core.tracing); ?debug_timing=1 always traces that request
+    TRACE_SAMPLE_RATE: float = 0.0  # Share of requests traced (0.0-1.0)
+    TRACE_EXPORT: str = ""  # "file" = OTLP/JSON lines in TRACE_EXPORT_PATH, "otlp" = POST to TRACE_OTLP_ENDPOINT
+    TRACE_EXPORT_PATH: str = "traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "ar_portal"
     
     # Microsoft Azure AD / Graph API
     AZURE_CLIENT_ID: str
@@ -18,6 +45,13 @@ class Settings(BaseSettings):
     AZURE_AUTHORITY: Optional[str] = None
     AZURE_SCOPE: str = "User.Read Mail.Read Mail.Send Mail.ReadWrite"
     
+    # Outreach mailbox (shared Graph client + delta-synced header cache)
+    GRAPH_TIMEOUT_SECONDS: float = 30.0
+    GRAPH_MAX_CONNECTIONS: int = 20
+    MAIL_SYNC_WINDOW_DAYS: int = 90  # First sync of a folder only pulls this much history (0 = all); older pages come from Graph
+    MAIL_SYNC_MIN_INTERVAL_SECONDS: int = 15  # Refreshes within this window reuse the last sync
+    MAIL_INDEX_BODIES: bool = True  # Sync plain-text bodies into the local search index
+
     # Chartmetric API Configuration
     CHARTMETRIC_API_KEY: str = ""
     CHARTMETRIC_REFRESH_TOKEN: str = ""
@@ -31,7 +65,51 @@ class Settings(BaseSettings):
     CHARTEX_APP_ID: str = ""
     CHARTEX_APP_TOKEN: str = ""
     CHARTEX_BASE_URL: str = "https://api.chartex.com"
-    
+
+    # Upstream rate limits (shared by ingestion and background jobs)
+    CHARTMETRIC_REQUESTS_PER_SECOND: float = 2.0
+    CHARTMETRIC_MAX_CONCURRENCY: int = 2
+    CHARTEX_REQUESTS_PER_SECOND: float = 5.0
+    CHARTEX_MAX_CONCURRENCY: int = 8
+    SPOTIFY_REQUESTS_PER_SECOND: float = 10.0
+    SPOTIFY_MAX_CONCURRENCY: int = 8
+
+    # TikTok trending cache + background pre-warm
+    TIKTOK_TRENDING_CACHE_TTL_SECONDS: int = 10800  # 0 disables caching
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000  # In-memory entries per cache namespace and process (LRU beyond)
+    PREWARM_INTERVAL_MINUTES: int = 120  # Must stay below the cache TTL so dashboards never go cold
+    PREWARM_COUNTRIES: str = "US,GB"  # Worldwide is always included
+    PREWARM_LABEL_TYPES: str = "major,indie,unsigned"  # "All labels" is always included
+    PREWARM_CONCURRENCY: int = 2
+
+    # Contracts: highlight populated field values in yellow in generated documents
+    CONTRACT_HIGHLIGHT_FIELDS: bool = True
+
+    # Contract preview: pool of persistent LibreOffice converters (unoserver)
+    CONTRACT_CONVERTER_POOL_SIZE: int = 2  # 0 = one-shot libreoffice process per preview
+    CONTRACT_CONVERTER_COMMAND: str = "unoserver"
+    CONTRACT_CONVERTER_BASE_PORT: int = 0  # 0 = free ports per worker; N = instance i on N + 2i / N + 2i + 1 (one worker only)
+    CONTRACT_CONVERTER_TIMEOUT_SECONDS: float = 60.0
+    CONTRACT_CONVERTER_QUEUE_TIMEOUT_SECONDS: float = 30.0
+
+    # Contract scratch files (renders, conversions, downloads) and their janitor
+    CONTRACT_ARTIFACT_DIR: str = ""  # Empty = <system temp>/ar_portal_contract_artifacts
+    CONTRACT_ARTIFACT_MAX_AGE_SECONDS: int = 3600
+    CONTRACT_ARTIFACT_MAX_MB: int = 512
+    CONTRACT_ARTIFACT_SWEEP_SECONDS: int = 600  # 0 disables the janitor
+    CONTRACT_INLINE_MAX_KB: int = 2048  # Downloads up to this size are sent from memory, no temp file
+
+    # Contract preview cache (rendered DOCX + page images on disk, LRU)
+    CONTRACT_PREVIEW_CACHE_DIR: str = ""  # Empty = <system temp>/ar_portal_preview_cache
+    CONTRACT_PREVIEW_CACHE_MAX_MB: int = 256
+
+    # Contract rendering off the event loop
+    CONTRACT_RENDER_PROCESSES: int = 2  # docxtpl render worker processes
+    CONTRACT_RENDER_MAX_PENDING: int = 8  # In-flight renders before the API answers 429
+    CONTRACT_MAX_ACTIVE_BATCH_JOBS: int = 2
+    CONTRACT_BATCH_MAX_ITEMS: int = 200
+    CONTRACT_JOB_TTL_SECONDS: int = 3600  # Finished batch jobs are forgotten after this
+
     class Config:
         env_file = ".env"
         case_sensitive = True
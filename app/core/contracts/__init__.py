@@ -4,12 +4,13 @@ Contract generation and management module
 # Import functions directly for convenience
 from .loader import load_template
 from .builder.builder import build_context
-from .exporter import render_contract
+from .exporter import render_contract, render_contract_bytes
 from .validation import validate_contract_data
 
 __all__ = [
     "load_template",
     "build_context",
     "render_contract",
+    "render_contract_bytes",
     "validate_contract_data",
 ]
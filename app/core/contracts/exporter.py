@@ -1,29 +1,50 @@
-from tempfile import NamedTemporaryFile
+import io
+import logging
+import re
+from bisect import bisect_right
+from typing import Optional
+
 from docx import Document
 from docx.enum.text import WD_COLOR_INDEX
-from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
 
-def render_contract(template, context: dict):
+from app.core.artifacts import get_artifact_store
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def render_contract(template, context: dict, highlight: Optional[bool] = None):
     """
     Render the Word (.docx) template with Jinja context
     and return the file path of the generated document.
     
+    The file is written to its own scratch dir in the artifact store; delete it
+    with get_artifact_store().remove(path) (the janitor catches anything missed).
+    
     Note: Images, headers, and footers in the template are automatically preserved.
     The docxtpl library maintains all formatting and embedded media.
+    
+    highlight: mark populated field values in yellow (default: CONTRACT_HIGHLIGHT_FIELDS)
     """
+    path = get_artifact_store().new_file(".docx", prefix="contract")
+    path.write_bytes(render_contract_bytes(template, context, highlight))
+    return str(path)
+
+
+def render_contract_bytes(template, context: dict, highlight: Optional[bool] = None) -> bytes:
+    """Render the template like render_contract, but in memory - no file is written"""
     # Render the template with the provided context
     # This replaces all {{placeholder}} tags while preserving images and formatting
     template.render(context, autoescape=True)
 
-    # Save to temporary file
-    tmp = NamedTemporaryFile(delete=False, suffix=".docx")
-    template.save(tmp.name)
-
-    # Yellow highlighting disabled
-    # _add_highlighting_to_fields(tmp.name, context)
+    if highlight is None:
+        highlight = settings.CONTRACT_HIGHLIGHT_FIELDS
+    if highlight:
+        # Highlight on the rendered document before saving - no second load/save round trip
+        _add_highlighting_to_document(template.docx, context)
 
-    return tmp.name
+    buffer = io.BytesIO()
+    template.save(buffer)
+    return buffer.getvalue()
 
 
 def _add_highlighting_to_fields(docx_path: str, context: dict):
@@ -32,74 +53,105 @@ def _add_highlighting_to_fields(docx_path: str, context: dict):
     """
     try:
         doc = Document(docx_path)
-        
-        # Collect all populated values to highlight
-        values_to_highlight = _extract_highlight_values(context)
-        
-        # Iterate through all paragraphs and runs
-        for paragraph in doc.paragraphs:
-            _highlight_values_in_paragraph(paragraph, values_to_highlight)
-        
-        # Also check in tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        _highlight_values_in_paragraph(paragraph, values_to_highlight)
-        
-        # Save the document back
+        _add_highlighting_to_document(doc, context)
         doc.save(docx_path)
     except Exception as e:
-        print(f"Warning: Could not add highlighting to DOCX: {e}")
+        logger.warning("Could not add highlighting to DOCX: %s", e)
         # Don't fail contract generation if highlighting fails
 
 
-def _highlight_values_in_paragraph(paragraph, values_to_highlight):
+def _add_highlighting_to_document(doc, context: dict):
     """
-    Highlight values within a paragraph by splitting and rebuilding runs
+    Highlight every populated field value in one pass over the document
+    All values go into a single matcher, so each paragraph is scanned once
+    regardless of how many artists/recordings the contract has.
     """
-    for value in values_to_highlight:
-        if not value or len(value) < 2:
-            continue
-        
-        # Convert paragraph text to lowercase for matching
-        para_text_lower = paragraph.text.lower()
-        value_lower = value.lower()
-        
-        # Check if value exists in paragraph
-        if value_lower not in para_text_lower:
-            continue
-        
-        # Find all occurrences and highlight them
-        text = paragraph.text
-        text_lower = text.lower()
-        start_idx = 0
-        
-        while True:
-            # Find next occurrence
-            match_idx = text_lower.find(value_lower, start_idx)
-            if match_idx == -1:
-                break
-            
-            # Try to highlight this occurrence
-            _highlight_run_in_range(paragraph, match_idx, len(value))
-            start_idx = match_idx + len(value)
-
-
-def _highlight_run_in_range(paragraph, start_char, length):
+    try:
+        matcher = _build_matcher(_extract_highlight_values(context))
+        if matcher is None:
+            return
+        for paragraph in _iter_paragraphs(doc):
+            _highlight_paragraph(paragraph, matcher)
+    except Exception as e:
+        logger.warning("Could not add highlighting to DOCX: %s", e)
+        # Don't fail contract generation if highlighting fails
+
+
+def _iter_paragraphs(container):
+    """Body paragraphs plus paragraphs in (nested) tables"""
+    yield from container.paragraphs
+    for table in container.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                yield from _iter_paragraphs(cell)
+
+
+def _build_matcher(values: list):
     """
-    Find and highlight a run (or spans across runs) at a specific character position
+    One case-insensitive regex for all values, built from a trie so shared
+    prefixes are matched once and the longest value wins at each position
+    Matches are whole words: "50" does not match inside "Clause 150".
     """
-    current_pos = 0
-    for run in paragraph.runs:
-        run_len = len(run.text)
-        run_end = current_pos + run_len
-        
-        # Check if this run contains part of the range
-        if run_end > start_char and current_pos < start_char + length:
-            _add_yellow_highlight(run)
-        
-        current_pos = run_end
+    trie: dict = {}
+    for value in values:
+        node = trie
+        for char in value.lower():
+            node = node.setdefault(char, {})
+        node[""] = True  # End of a value
+    if not trie:
+        return None
+    return re.compile(r"(?<!\w)(?:" + _trie_pattern(trie) + r")(?!\w)", re.IGNORECASE)
+
+
+def _trie_pattern(node: dict) -> str:
+    terminal = "" in node
+    branches = []
+    for char, child in sorted(node.items()):
+        if char == "":
+            continue
+        # Collapse single-child chains iteratively - recursion depth stays at the number of branch points
+        prefix = char
+        while len(child) == 1 and "" not in child:
+            (next_char, child), = child.items()
+            prefix += next_char
+        branches.append(re.escape(prefix) + _trie_pattern(child))
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if terminal:
+        # A shorter value ends here - the longer continuation is optional (and tried first)
+        return "(?:" + body + ")?"
+    return body
+
+
+def _highlight_paragraph(paragraph, matcher):
+    """Highlight every run that overlaps a match (each run at most once)"""
+    runs = paragraph.runs
+    if not runs:
+        return
+    texts = [run.text for run in runs]
+    text = "".join(texts)
+    if not text.strip():
+        return
+    
+    # Start offset of each run, for mapping match positions back to runs
+    starts = []
+    position = 0
+    for run_text in texts:
+        starts.append(position)
+        position += len(run_text)
+    
+    to_highlight = set()
+    for match in matcher.finditer(text):
+        if match.end() == match.start():
+            continue
+        first = bisect_right(starts, match.start()) - 1
+        last = bisect_right(starts, match.end() - 1) - 1
+        to_highlight.update(range(first, last + 1))
+    
+    for index in to_highlight:
+        if texts[index]:
+            _add_yellow_highlight(runs[index])
 
 
 def _extract_highlight_values(context: dict) -> list:
@@ -128,12 +180,12 @@ def _extract_highlight_values(context: dict) -> list:
         elif isinstance(obj, (list, tuple)):
             for item in obj:
                 extract_values(item, visited)
+        elif isinstance(obj, bool):
+            # Skip boolean values as they're not content to highlight (checked before int - bool is an int)
+            pass
         elif isinstance(obj, (str, int, float)):
             if obj and str(obj).strip():
                 values.append(str(obj))
-        elif isinstance(obj, bool):
-            # Skip boolean values as they're not content to highlight
-            pass
     
     extract_values(context)
     
@@ -147,11 +199,10 @@ def _extract_highlight_values(context: dict) -> list:
 
 def _add_yellow_highlight(run):
     """
-    Add yellow highlighting to a run using XML
+    Add yellow highlighting to a run
+    python-docx places <w:highlight> where the schema expects it and replaces an existing one
     """
     try:
-        # Create highlight element (yellow = 7 in Word XML)
-        shd = parse_xml(r'<w:highlight {} w:val="yellow"/>'.format(nsdecls('w')))
-        run._element.get_or_add_rPr().append(shd)
+        run.font.highlight_color = WD_COLOR_INDEX.YELLOW
     except Exception as e:
-        print(f"Could not add highlight to run: {e}")
+        logger.warning("Could not add highlight to run: %s", e)
@@ -1,9 +1,99 @@
-import os
+"""
+Contract template registry
+Each .docx in static/contract_templates is parsed once and kept in memory;
+renders get a copy, and a changed file (mtime/size) is re-parsed on next use.
+"""
+import copy
+import io
+import threading
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
 from docxtpl import DocxTemplate
 
-def load_template(filename="50_50 template med placeholders.docx"):
-    # Get absolute path from this file's location
-    base_dir = Path(__file__).parent.parent.parent.parent
-    template_path = base_dir / "static" / "contract_templates" / filename
-    return DocxTemplate(str(template_path))
+TEMPLATES_DIR = Path(__file__).parent.parent.parent.parent / "static" / "contract_templates"
+DEFAULT_TEMPLATE = "50_50 template med placeholders.docx"
+
+
+class _Entry:
+    __slots__ = ("stamp", "data", "prototype")
+
+    def __init__(self, stamp: Tuple[int, int], data: bytes, prototype: DocxTemplate):
+        self.stamp = stamp
+        self.data = data
+        self.prototype = prototype
+
+
+def _parse(data: bytes) -> DocxTemplate:
+    template = DocxTemplate(io.BytesIO(data))
+    if hasattr(template, "init_docx"):
+        template.init_docx()  # Newer docxtpl parses lazily - do it now so copies are cheap
+    return template
+
+
+class TemplateRegistry:
+    """Parsed-template cache for one directory"""
+
+    def __init__(self, directory: Path = TEMPLATES_DIR):
+        self.directory = Path(directory)
+        self._entries: Dict[str, _Entry] = {}
+        self._names: Optional[List[str]] = None
+        self._dir_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, filename: str) -> Path:
+        path = (self.directory / filename).resolve()
+        if path.parent != self.directory.resolve():
+            raise ValueError(f"Invalid template name: {filename}")
+        return path
+
+    def names(self) -> List[str]:
+        """Available templates (test fixtures excluded); rescanned only when the directory changes"""
+        if not self.directory.exists():
+            return []
+        dir_mtime = self.directory.stat().st_mtime_ns
+        if self._names is None or dir_mtime != self._dir_mtime:
+            self._names = sorted(
+                path.name for path in self.directory.glob("*.docx")
+                if not path.name.startswith(("TEST_", "~$"))
+            )
+            self._dir_mtime = dir_mtime
+        return list(self._names)
+
+    def _entry(self, filename: str) -> _Entry:
+        path = self._path(filename)
+        stat = path.stat()  # FileNotFoundError for unknown templates, as before
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None or entry.stamp != stamp:
+                data = path.read_bytes()
+                entry = _Entry(stamp, data, _parse(data))
+                self._entries[filename] = entry
+            return entry
+
+    def get(self, filename: str = DEFAULT_TEMPLATE) -> DocxTemplate:
+        """A fresh, renderable copy of the template"""
+        entry = self._entry(filename)
+        try:
+            return copy.deepcopy(entry.prototype)
+        except Exception:
+            # Fall back to re-parsing the in-memory bytes (still no disk read)
+            return _parse(entry.data)
+
+    def version(self, filename: str = DEFAULT_TEMPLATE) -> str:
+        """Identifies the current contents of a template - changes whenever the file does"""
+        mtime_ns, size = self._entry(filename).stamp
+        return f"{filename}:{mtime_ns}:{size}"
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._names = None
+
+
+template_registry = TemplateRegistry()
+
+
+def load_template(filename=DEFAULT_TEMPLATE):
+    return template_registry.get(filename or DEFAULT_TEMPLATE)
@@ -0,0 +1,189 @@
+"""
+Content-addressed contract preview cache
+Rendered DOCX files and preview page images stored on disk, keyed by
+(template version, hash of the build_context output[, dpi]).
+
+An unchanged payload (repeat preview, or generate right after preview) is
+served from disk instead of re-rendering, converting and rasterizing.
+Total size is bounded across all processes sharing the directory; least
+recently used entries are evicted first.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows - the bound then only holds within one process
+    fcntl = None
+
+
+def context_hash(context: Dict[str, Any]) -> str:
+    """Canonical hash of a contract context (key order independent)"""
+    canonical = json.dumps(context, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class PreviewCache:
+    """
+    Size-bounded LRU of entry directories under `root`
+    The bound holds for every process sharing the directory (API and render
+    workers): usage is measured on disk under a file lock whenever an entry is
+    added, and entry mtimes carry the LRU order.
+
+    Entries (<id> = preview_id(template version, context hash)):
+        docx-<id>/contract.docx                 rendered contract
+        pdf-<id>/contract.pdf                   converted contract
+        pages-<id>-<dpi>/page-0001.png          all preview pages, in order
+        page-<id>-<n>-<width>-<fmt>/page.<fmt>  one page for the streaming preview
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        for path in self.root.glob(".tmp-*"):
+            shutil.rmtree(path, ignore_errors=True)  # Interrupted write
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive across threads and processes using the same directory"""
+        with self._lock, open(self.root / ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # Released when the file closes
+            yield
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(mtime, name, bytes) of every entry, least recently used first"""
+        entries = []
+        for path in self.root.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                entries.append((path.stat().st_mtime, path.name, _dir_size(path)))
+            except (FileNotFoundError, NotADirectoryError):
+                continue  # Evicted while scanning
+        return sorted(entries)
+
+    @staticmethod
+    def preview_id(template_version: str, ctx_hash: str) -> str:
+        """Content address of one rendered contract"""
+        return hashlib.sha256(f"{template_version}|{ctx_hash}".encode("utf-8")).hexdigest()[:40]
+
+    def _get(self, name: str) -> Optional[Path]:
+        path = self.root / name
+        if not path.is_dir():
+            return None
+        now = time.time()
+        try:
+            os.utime(path, (now, now))  # LRU order, shared with the other processes
+        except FileNotFoundError:
+            return None  # Evicted by another process
+        return path
+
+    def _put(self, name: str, files: Dict[str, bytes]) -> Path:
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.root))
+        for filename, data in files.items():
+            (tmp / filename).write_bytes(data)
+        path = self.root / name
+        with self._locked():
+            if path.is_dir():
+                shutil.rmtree(tmp, ignore_errors=True)  # Someone else cached it first
+                now = time.time()
+                os.utime(path, (now, now))
+                return path
+            os.replace(tmp, path)
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: str):
+        """Drop least recently used entries until the directory fits max_bytes (caller holds the lock)"""
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self.root / name, ignore_errors=True)
+            total -= size
+
+    # ------------------------
+    # Rendered DOCX
+    # ------------------------
+    def get_docx(self, template_version: str, ctx_hash: str) -> Optional[Path]:
+        path = self._get(f"docx-{self.preview_id(template_version, ctx_hash)}")
+        return path / "contract.docx" if path else None
+
+    def put_docx(self, template_version: str, ctx_hash: str, data: bytes) -> Path:
+        return self._put(f"docx-{self.preview_id(template_version, ctx_hash)}", {"contract.docx": data}) / "contract.docx"
+
+    # ------------------------
+    # Preview pages
+    # ------------------------
+    def get_pages(self, template_version: str, ctx_hash: str, dpi: int) -> Optional[List[Path]]:
+        path = self._get(f"pages-{self.preview_id(template_version, ctx_hash)}-{dpi}")
+        if path is None:
+            return None
+        return sorted(path.glob("page-*.png"))
+
+    def put_pages(self, template_version: str, ctx_hash: str, dpi: int, pages: List[bytes]) -> List[Path]:
+        files = {f"page-{number:04d}.png": data for number, data in enumerate(pages, start=1)}
+        path = self._put(f"pages-{self.preview_id(template_version, ctx_hash)}-{dpi}", files)
+        return sorted(path.glob("page-*.png"))
+
+    # ------------------------
+    # Converted PDF + single pages (streaming preview)
+    # ------------------------
+    def get_pdf(self, preview_id: str) -> Optional[Path]:
+        path = self._get(f"pdf-{preview_id}")
+        return path / "contract.pdf" if path else None
+
+    def put_pdf(self, preview_id: str, pdf_path: str) -> Path:
+        data = Path(pdf_path).read_bytes()
+        return self._put(f"pdf-{preview_id}", {"contract.pdf": data}) / "contract.pdf"
+
+    def get_page(self, preview_id: str, page: int, width: int, fmt: str) -> Optional[bytes]:
+        path = self._get(f"page-{preview_id}-{page}-{width}-{fmt}")
+        if path is None:
+            return None
+        try:
+            return (path / f"page.{fmt}").read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put_page(self, preview_id: str, page: int, width: int, fmt: str, data: bytes):
+        self._put(f"page-{preview_id}-{page}-{width}-{fmt}", {f"page.{fmt}": data})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._locked():
+            entries = self._scan()
+        return {"entries": len(entries), "bytes": sum(size for _, _, size in entries), "max_bytes": self.max_bytes}
+
+
+_preview_cache: Optional[PreviewCache] = None
+_preview_cache_lock = threading.Lock()
+
+
+def get_preview_cache() -> PreviewCache:
+    """Get or create the preview cache singleton"""
+    global _preview_cache
+    with _preview_cache_lock:
+        if _preview_cache is None:
+            root = settings.CONTRACT_PREVIEW_CACHE_DIR or os.path.join(tempfile.gettempdir(), "ar_portal_preview_cache")
+            _preview_cache = PreviewCache(Path(root), settings.CONTRACT_PREVIEW_CACHE_MAX_MB * 1024 * 1024)
+        return _preview_cache
@@ -0,0 +1,314 @@
+"""
+Contract render pool
+Keeps docxtpl rendering, LibreOffice conversion and rasterization off the event loop.
+
+- DOCX rendering (CPU bound, holds the GIL) runs in a small process pool.
+- Conversion/rasterization (waits on LibreOffice/poppler subprocesses) runs in a
+  thread pool, so it can share the process-wide LibreOffice converter pool.
+- At most CONTRACT_RENDER_MAX_PENDING renders are in flight - interactive and
+  batch items alike; beyond that interactive requests get RenderQueueFull (the
+  API answers 429) and batch items wait for a free slot.
+
+Batch jobs (many payloads, one job id) are tracked in memory per API process:
+
+    job = start_batch_job(payloads)
+    get_batch_job(job["id"])  # status + per-item progress
+
+stream_batch_zip renders many payloads the same way and streams them as one ZIP.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.contracts import rendering
+
+logger = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    """Too many contract renders in flight - retry later"""
+
+
+class RenderPool:
+    def __init__(self, processes: int, threads: int, max_pending: int):
+        self.processes = max(1, processes)
+        self.threads = max(1, threads)
+        self.max_pending = max_pending
+        self.pending = 0
+        self._slot_freed = asyncio.Condition()
+        self._process_executor: Optional[ProcessPoolExecutor] = None
+        self._thread_executor: Optional[ThreadPoolExecutor] = None
+
+    def _processes(self) -> ProcessPoolExecutor:
+        if self._process_executor is None:
+            # spawn, not fork - the API process has threads (converter pool, uvicorn)
+            self._process_executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_executor
+
+    def _threads(self) -> ThreadPoolExecutor:
+        if self._thread_executor is None:
+            self._thread_executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="contract-convert")
+        return self._thread_executor
+
+    @asynccontextmanager
+    async def slot(self, wait: bool = False):
+        """Reserve a place in the queue; when full raise RenderQueueFull, or wait for one (wait=True, batch work)"""
+        if self.pending >= self.max_pending:
+            if not wait:
+                raise RenderQueueFull(f"{self.pending} contract renders already queued")
+            async with self._slot_freed:
+                await self._slot_freed.wait_for(lambda: self.pending < self.max_pending)
+        self.pending += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+            async with self._slot_freed:
+                self._slot_freed.notify()
+
+    def _discard_processes(self, broken: ProcessPoolExecutor):
+        """Drop a broken executor (once - concurrent callers may see the same one break)"""
+        if self._process_executor is broken:
+            self._process_executor = None
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def in_process(self, fn: Callable, *args) -> Any:
+        """Run fn in a render process; a crashed pool (OOM, segfault) is replaced and the call retried once"""
+        executor = self._processes()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            logger.warning("⚠️  Render process pool broke - restarting it")
+            self._discard_processes(executor)
+            return await asyncio.get_running_loop().run_in_executor(self._processes(), fn, *args)
+
+    async def in_thread(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._threads(), fn, *args)
+
+    # ------------------------
+    # Render steps (call inside slot())
+    # ------------------------
+    async def render_docx(self, payload: dict) -> Tuple[Path, bool]:
+        return await self.in_process(rendering.render_docx_cached, payload)
+
+    async def render_preview(self, payload: dict, dpi: int) -> Tuple[List[Path], bool]:
+        # DOCX in a render process; conversion finds it in the shared disk cache
+        await self.render_docx(payload)
+        return await self.in_thread(rendering.render_preview_cached, payload, dpi)
+
+    async def render_pdf(self, payload: dict) -> Tuple[str, Path]:
+        await self.render_docx(payload)
+        return await self.in_thread(rendering.render_pdf_cached, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pending": self.pending, "max_pending": self.max_pending, "processes": self.processes}
+
+    def shutdown(self):
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=False, cancel_futures=True)
+        if self._thread_executor is not None:
+            self._thread_executor.shutdown(wait=False, cancel_futures=True)
+
+
+_render_pool: Optional[RenderPool] = None
+
+
+def get_render_pool() -> RenderPool:
+    """Get or create the render pool singleton (executors start on first use)"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = RenderPool(
+            processes=settings.CONTRACT_RENDER_PROCESSES,
+            threads=max(1, settings.CONTRACT_CONVERTER_POOL_SIZE),
+            max_pending=settings.CONTRACT_RENDER_MAX_PENDING
+        )
+    return _render_pool
+
+
+def shutdown_render_pool():
+    if _render_pool is not None:
+        _render_pool.shutdown()
+
+
+# ------------------------
+# Batch jobs
+# ------------------------
+_jobs: Dict[str, Dict[str, Any]] = {}
+
+
+def _prune_jobs():
+    cutoff = time.time() - settings.CONTRACT_JOB_TTL_SECONDS
+    for job_id in [job_id for job_id, job in _jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+        del _jobs[job_id]
+
+
+async def _run_batch_job(job: Dict[str, Any], payloads: List[dict]):
+    pool = get_render_pool()
+    # Batch items share the render processes but never hold more than that many at once
+    semaphore = asyncio.Semaphore(pool.processes)
+
+    async def render(item: Dict[str, Any], payload: dict):
+        # Each item holds a render slot, so batches and interactive renders share one limit
+        async with semaphore, pool.slot(wait=True):
+            item["status"] = "running"
+            try:
+                docx_path, _ = await pool.render_docx(payload)
+                item["docx_path"] = str(docx_path)
+                item["status"] = "completed"
+                job["completed"] += 1
+            except Exception as e:
+                item["status"] = "failed"
+                item["error"] = str(e)
+                job["failed"] += 1
+                logger.warning(f"⚠️  Batch {job['id']} item {item['index']} failed: {e}")
+
+    job["status"] = "running"
+    try:
+        await asyncio.gather(*(render(item, payload) for item, payload in zip(job["items"], payloads)))
+        job["status"] = "completed" if not job["failed"] else "completed_with_errors"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = time.time()
+        logger.info(f"📦 Batch {job['id']}: {job['completed']}/{job['total']} rendered, {job['failed']} failed")
+
+
+def start_batch_job(payloads: List[dict]) -> Dict[str, Any]:
+    """Queue a batch render (must be called from the event loop) - raises RenderQueueFull when busy"""
+    _prune_jobs()
+    active = sum(1 for job in _jobs.values() if not job["finished_at"])
+    if active >= settings.CONTRACT_MAX_ACTIVE_BATCH_JOBS:
+        raise RenderQueueFull(f"{active} batch jobs already running")
+
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "total": len(payloads),
+        "completed": 0,
+        "failed": 0,
+        "created_at": time.time(),
+        "finished_at": None,
+        "items": [{"index": index, "status": "queued"} for index in range(len(payloads))],
+    }
+    _jobs[job_id] = job
+    job["task"] = asyncio.get_running_loop().create_task(_run_batch_job(job, payloads))
+    return job
+
+
+def get_batch_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return _jobs.get(job_id)
+
+
+def batch_job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe view of a batch job"""
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "completed": job["completed"],
+        "failed": job["failed"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "items": [
+            {key: value for key, value in item.items() if key != "docx_path"}
+            for item in job["items"]
+        ],
+    }
+
+
+def batch_item_path(job: Dict[str, Any], index: int) -> Optional[Path]:
+    """Cached DOCX of a finished item; None if it isn't done (copy it before serving - it may be evicted)"""
+    if not 0 <= index < len(job["items"]):
+        return None
+    docx_path = job["items"][index].get("docx_path")
+    return Path(docx_path) if docx_path else None
+
+
+# ------------------------
+# Streamed ZIP of many contracts
+# ------------------------
+class _ZipStream:
+    """Write-only sink for ZipFile; the bytes written so far are taken out chunk by chunk"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        return chunk
+
+
+def _batch_filename(payload: dict, index: int) -> str:
+    stem = f"contract_{index + 1:03d}"
+    project = str(payload.get("project_number") or "").strip()
+    return f"{stem}_{project}" if project.isalnum() else stem
+
+
+async def stream_batch_zip(payloads: List[dict], include_pdf: bool = False) -> AsyncIterator[bytes]:
+    """
+    Render every payload (in parallel, through the render pool) and yield a ZIP as
+    each contract finishes. Only finished-but-unsent files are held in memory.
+    Failed contracts are listed in errors.txt at the end of the archive.
+    """
+    pool = get_render_pool()
+    semaphore = asyncio.Semaphore(pool.processes)
+
+    async def render(index: int, payload: dict):
+        # Each item holds a render slot, so the ZIP and interactive renders share one limit
+        async with semaphore, pool.slot(wait=True):
+            docx_path, _ = await pool.render_docx(payload)
+            files = [(".docx", await pool.in_thread(Path(docx_path).read_bytes))]
+            if include_pdf:
+                _, pdf_path = await pool.in_thread(rendering.render_pdf_cached, payload)
+                files.append((".pdf", await pool.in_thread(Path(pdf_path).read_bytes)))
+            return index, files
+
+    async def safe_render(index: int, payload: dict):
+        try:
+            return await render(index, payload)
+        except Exception as e:
+            logger.warning(f"⚠️  Batch ZIP item {index} failed: {e}")
+            return index, e
+
+    stream = _ZipStream()
+    errors = []
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        tasks = [asyncio.ensure_future(safe_render(index, payload)) for index, payload in enumerate(payloads)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                if isinstance(result, Exception):
+                    errors.append(f"{_batch_filename(payloads[index], index)}: {result}")
+                    continue
+                for suffix, data in result:
+                    # DOCX/PDF are already compressed - store as-is
+                    archive.writestr(_batch_filename(payloads[index], index) + suffix, data)
+                yield stream.take()
+        finally:
+            for task in tasks:
+                task.cancel()
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield stream.take()
@@ -0,0 +1,96 @@
+"""
+Cached contract rendering
+Payload -> DOCX and payload -> preview pages, going through the preview cache
+so identical payloads are rendered, converted and rasterized only once.
+"""
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.contracts.builder.builder import build_context
+from app.core.contracts.exporter import render_contract_bytes
+from app.core.contracts.loader import DEFAULT_TEMPLATE, template_registry
+from app.core.contracts.preview_cache import context_hash, get_preview_cache
+
+
+def _cache_key(payload: dict) -> Tuple[str, str, dict]:
+    template_name = payload.get("template_name") or DEFAULT_TEMPLATE
+    context = build_context(payload)
+    # Highlighting changes the output, so it is part of the content address
+    return template_name, context_hash({"context": context, "highlight": settings.CONTRACT_HIGHLIGHT_FIELDS}), context
+
+
+def render_docx_cached(payload: dict) -> Tuple[Path, bool]:
+    """Rendered contract for a payload as (path inside the cache, cache hit) - copy it before handing it out"""
+    template_name, ctx_hash, context = _cache_key(payload)
+    version = template_registry.version(template_name)
+    cache = get_preview_cache()
+
+    cached = cache.get_docx(version, ctx_hash)
+    if cached is not None:
+        return cached, True
+
+    # Rendered in memory and written once, straight into the cache
+    data = render_contract_bytes(template_registry.get(template_name), context)
+    return cache.put_docx(version, ctx_hash, data), False
+
+
+def render_preview_cached(payload: dict, dpi: int = 150) -> Tuple[List[Path], bool]:
+    """Preview PNG pages for a payload as (page paths inside the cache, cache hit)"""
+    from app.core.pdf_converter import docx_to_preview_pngs
+
+    template_name, ctx_hash, _ = _cache_key(payload)
+    version = template_registry.version(template_name)
+    cache = get_preview_cache()
+
+    pages = cache.get_pages(version, ctx_hash, dpi)
+    if pages:
+        return pages, True
+
+    docx_path, _ = render_docx_cached(payload)
+    return cache.put_pages(version, ctx_hash, dpi, docx_to_preview_pngs(str(docx_path), dpi=dpi)), False
+
+
+def render_pdf_cached(payload: dict) -> Tuple[str, Path]:
+    """Converted PDF for a payload as (preview_id, path inside the cache)"""
+    from app.core.pdf_converter import cleanup_pdf, docx_to_pdf
+
+    template_name, ctx_hash, _ = _cache_key(payload)
+    cache = get_preview_cache()
+    preview_id = cache.preview_id(template_registry.version(template_name), ctx_hash)
+
+    cached = cache.get_pdf(preview_id)
+    if cached is not None:
+        return preview_id, cached
+
+    docx_path, _ = render_docx_cached(payload)
+    pdf_path = docx_to_pdf(str(docx_path))
+    try:
+        return preview_id, cache.put_pdf(preview_id, pdf_path)
+    finally:
+        cleanup_pdf(pdf_path)
+
+
+def preview_page_count(preview_id: str) -> Optional[int]:
+    """Page count of a cached preview PDF, None if it was never rendered or got evicted"""
+    from app.core.pdf_converter import pdf_page_count
+
+    pdf_path = get_preview_cache().get_pdf(preview_id)
+    return pdf_page_count(str(pdf_path)) if pdf_path else None
+
+
+def render_page_cached(preview_id: str, page: int, width: int, fmt: str) -> Optional[bytes]:
+    """One rasterized page of a cached preview PDF, None if the PDF is no longer cached"""
+    from app.core.pdf_converter import rasterize_page
+
+    cache = get_preview_cache()
+    data = cache.get_page(preview_id, page, width, fmt)
+    if data is not None:
+        return data
+
+    pdf_path = cache.get_pdf(preview_id)
+    if pdf_path is None:
+        return None
+    data = rasterize_page(str(pdf_path), page, fmt=fmt, width=width)
+    cache.put_page(preview_id, page, width, fmt, data)
+    return data
@@ -0,0 +1,211 @@
+"""
+Persistent LibreOffice converter pool
+Keeps N headless LibreOffice instances running (via unoserver) so a contract
+preview pays for the conversion only, not for starting LibreOffice.
+
+Each instance is driven over unoserver's XML-RPC API and owns its own user
+profile; each job writes into its own temp dir, so concurrent previews never
+collide. Jobs wait in a queue for a free instance.
+
+Every uvicorn worker has its own pool: profiles are per process (PID in the
+dir name) and ports are picked free at startup unless
+CONTRACT_CONVERTER_BASE_PORT pins them (single-worker deployments only).
+
+Requires `unoserver` next to LibreOffice (pip install unoserver with the
+LibreOffice python). Without it docx_to_pdf falls back to one-shot
+`libreoffice --headless --convert-to pdf`.
+"""
+import logging
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from pathlib import Path
+from typing import List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConverterUnavailable(Exception):
+    """No pooled converter could be used - caller should fall back to a one-shot conversion"""
+
+
+class ConverterBusy(Exception):
+    """Every converter stayed busy for the whole queue timeout"""
+
+
+def new_job_dir() -> str:
+    """Isolated working dir for one conversion job in the artifact store (caller removes it)"""
+    from app.core.artifacts import get_artifact_store
+    return str(get_artifact_store().new_dir("convert"))
+
+
+def _free_port() -> int:
+    """A port the OS reports free right now (bind to port 0)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _Instance:
+    """One long-running unoserver + LibreOffice process pair"""
+
+    def __init__(self, index: int, port: Optional[int] = None, uno_port: Optional[int] = None):
+        self.index = index
+        self.fixed_ports = port is not None
+        self.port = port
+        self.uno_port = uno_port
+        self.profile_dir = Path(tempfile.gettempdir()) / f"ar_portal_lo_profile_{os.getpid()}_{index}"
+        self.process: Optional[subprocess.Popen] = None
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, startup_timeout: float):
+        if not self.fixed_ports:
+            # Fresh ports on every (re)start - another worker may have taken the old ones
+            self.port, self.uno_port = _free_port(), _free_port()
+        self.process = subprocess.Popen(
+            [
+                settings.CONTRACT_CONVERTER_COMMAND,
+                "--interface", "127.0.0.1",
+                "--port", str(self.port),
+                "--uno-port", str(self.uno_port),
+                "--user-installation", self.profile_dir.as_uri(),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise ConverterUnavailable(f"converter {self.index} exited during startup")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.5):
+                    logger.info(f"✅ LibreOffice converter {self.index} ready on port {self.port}")
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise ConverterUnavailable(f"converter {self.index} did not start within {startup_timeout}s")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def convert(self, docx_path: str, pdf_path: str, timeout: float):
+        transport = _TimeoutTransport(timeout)
+        proxy = xmlrpc.client.ServerProxy(f"http://127.0.0.1:{self.port}", allow_none=True, transport=transport)
+        proxy.convert(docx_path, None, pdf_path, "pdf")
+
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    def __init__(self, timeout: float):
+        super().__init__()
+        self._timeout = timeout
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self._timeout
+        return connection
+
+
+class ConverterPool:
+    """
+    Fixed-size pool of LibreOffice instances with a wait queue
+
+    Usage:
+        pdf_path = get_converter_pool().convert(docx_path)
+    """
+
+    def __init__(self, size: int, base_port: int, timeout: float, queue_timeout: float):
+        self.size = size
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._instances: List[_Instance] = [
+            _Instance(i, base_port + 2 * i, base_port + 2 * i + 1) if base_port else _Instance(i)
+            for i in range(size)
+        ]
+        self._idle: "queue.Queue[_Instance]" = queue.Queue()
+        for instance in self._instances:
+            self._idle.put(instance)
+        self._disabled_reason: Optional[str] = None
+        if shutil.which(settings.CONTRACT_CONVERTER_COMMAND) is None:
+            self._disabled_reason = f"{settings.CONTRACT_CONVERTER_COMMAND} not found on PATH"
+
+    @property
+    def available(self) -> bool:
+        return self.size > 0 and self._disabled_reason is None
+
+    def convert(self, docx_path: str) -> str:
+        """Convert a .docx to PDF in a fresh job dir and return the PDF path"""
+        if not self.available:
+            raise ConverterUnavailable(self._disabled_reason or "converter pool disabled")
+
+        try:
+            instance = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            raise ConverterBusy(f"no converter free after {self.queue_timeout}s")
+
+        job_dir = new_job_dir()
+        try:
+            if not instance.alive():
+                instance.start(startup_timeout=self.timeout)
+            pdf_path = str(Path(job_dir) / (Path(docx_path).stem + ".pdf"))
+            start = time.perf_counter()
+            try:
+                instance.convert(docx_path, pdf_path, self.timeout)
+            except (OSError, xmlrpc.client.Error) as e:
+                # Wedged or crashed instance - restart it on next use
+                instance.stop()
+                raise ConverterUnavailable(f"converter {instance.index} failed: {e}")
+            if not Path(pdf_path).exists():
+                raise ConverterUnavailable(f"converter {instance.index} produced no PDF")
+            logger.info(f"📄 Converted {Path(docx_path).name} on converter {instance.index} in {time.perf_counter() - start:.2f}s")
+            return pdf_path
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        finally:
+            self._idle.put(instance)
+
+    def shutdown(self):
+        for instance in self._instances:
+            instance.stop()
+            shutil.rmtree(instance.profile_dir, ignore_errors=True)  # Per-PID, never reused
+
+
+_pool: Optional[ConverterPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_converter_pool() -> ConverterPool:
+    """Get or create the process-wide converter pool (instances start on first use)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConverterPool(
+                size=settings.CONTRACT_CONVERTER_POOL_SIZE,
+                base_port=settings.CONTRACT_CONVERTER_BASE_PORT,
+                timeout=settings.CONTRACT_CONVERTER_TIMEOUT_SECONDS,
+                queue_timeout=settings.CONTRACT_CONVERTER_QUEUE_TIMEOUT_SECONDS,
+            )
+        return _pool
+
+
+def shutdown_converter_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
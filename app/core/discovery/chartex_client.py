@@ -4,9 +4,13 @@ Access to TikTok song/sound data and trending charts
 API Docs: https://chartex.com/apidocs
 """
 import httpx
+import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.core.metrics import upstream_transport
+
+logger = logging.getLogger(__name__)
 
 
 class ChartexClient:
@@ -81,11 +85,8 @@ class ChartexClient:
         if country_codes:
             params["country_codes"] = country_codes
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            print(f"\n📡 CHARTEX API REQUEST:")
-            print(f"   URL: {self.base_url}/external/v1/songs/")
-            print(f"   Params: {params}")
-            print(f"   Time: {datetime.now()}")
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_songs")) as client:
+            logger.debug("📡 CHARTEX: GET /external/v1/songs/ %s", params)
             
             response = await client.get(
                 f"{self.base_url}/external/v1/songs/",
@@ -93,30 +94,17 @@ class ChartexClient:
                 params=params
             )
             
-            print(f"   Response Status: {response.status_code}")
-            
             if response.status_code == 200:
                 data = response.json()
                 # Chartex API structure: { "data": { "items": [...] } }
                 if "data" in data and "items" in data["data"]:
                     songs = data["data"]["items"]
-                    print(f"   ✅ Got {len(songs)} songs from Chartex")
-                    if songs:
-                        print(f"   📊 First song: {songs[0].get('title', 'N/A')} by {songs[0].get('artist', 'N/A')}")
-                        print(f"   📊 TikTok videos (24h): {songs[0].get('tiktok_last_24_hours_video_count', 0)}")
-                        print(f"   📊 TikTok videos (7d): {songs[0].get('tiktok_last_7_days_video_count', 0)}")
-                        print(f"   📊 TikTok videos (total): {songs[0].get('tiktok_total_video_count', 0)}")
-                        
-                        # Log first 3 songs to verify sort order
-                        print(f"\n   🔍 Verifying sort order for '{sort_by}':")
-                        for i, song in enumerate(songs[:3]):
-                            sort_value = song.get(sort_by, 0)
-                            print(f"      {i+1}. {song.get('title', 'N/A')}: {sort_value:,}")
+                    logger.debug("   ✅ Got %d songs from Chartex (page %s, sort_by=%s)", len(songs), page, sort_by)
                     return songs
                 # Fallback for other structures
                 return data.get("data", data.get("results", []))
             else:
-                print(f"⚠️  Songs API error: {response.status_code} - {response.text}")
+                logger.warning("⚠️  Songs API error: %s - %.200s", response.status_code, response.text)
                 return []
     
     async def get_song_detail(
@@ -126,7 +114,7 @@ class ChartexClient:
         """
         Get detailed information for a specific song
         """
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_song_detail")) as client:
             response = await client.get(
                 f"{self.base_url}/external/v1/songs/{song_id}/",
                 headers=self._get_headers()
@@ -135,7 +123,7 @@ class ChartexClient:
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"⚠️  Song detail error: {response.status_code}")
+                logger.warning("⚠️  Song detail error: %s", response.status_code)
                 return None
     
     async def get_tiktok_sounds(
@@ -157,7 +145,7 @@ class ChartexClient:
         if search:
             params["search"] = search
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_tiktok_sounds")) as client:
             response = await client.get(
                 f"{self.base_url}/external/v1/tiktok-sounds/",
                 headers=self._get_headers(),
@@ -168,7 +156,7 @@ class ChartexClient:
                 data = response.json()
                 return data.get("results", [])
             else:
-                print(f"⚠️  TikTok sounds error: {response.status_code}")
+                logger.warning("⚠️  TikTok sounds error: %s", response.status_code)
                 return []
     
     async def get_song_stats(
@@ -207,23 +195,26 @@ class ChartexClient:
         if limit_by_latest_days:
             params["limit_by_latest_days"] = limit_by_latest_days
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_song_stats")) as client:
             response = await client.get(
                 f"{self.base_url}/external/v1/songs/{platform_id}/{platform}/stats/{metric}/",
                 headers=self._get_headers(),
                 params=params
             )
             
-            print(f"🌐 Chartex API request: {self.base_url}/external/v1/songs/{platform_id}/{platform}/stats/{metric}/ with params: {params}")
-            print(f"🌐 Status code: {response.status_code}")
+            logger.debug(
+                "📡 CHARTEX: GET /external/v1/songs/%s/%s/stats/%s/ %s → %s",
+                platform_id, platform, metric, params, response.status_code
+            )
             
             if response.status_code == 200:
                 result = response.json()
-                print(f"🌐 Response structure: {list(result.keys()) if isinstance(result, dict) else type(result)}")
                 return result
             else:
-                print(f"⚠️  Song stats error: {response.status_code} for {platform_id}/{platform}/{metric}")
-                print(f"⚠️  Response text: {response.text}")
+                logger.warning(
+                    "⚠️  Song stats error: %s for %s/%s/%s - %.200s",
+                    response.status_code, platform_id, platform, metric, response.text
+                )
                 return None
     
     async def get_tiktok_sounds_for_song(
@@ -248,7 +239,7 @@ class ChartexClient:
             "limit": limit
         }
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_tiktok_sounds_for_song")) as client:
             response = await client.get(
                 f"{self.base_url}/external/v1/songs/{spotify_id}/spotify/tiktok-sounds/",
                 headers=self._get_headers(),
@@ -258,7 +249,7 @@ class ChartexClient:
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"⚠️  TikTok sounds error: {response.status_code} for Spotify ID {spotify_id}")
+                logger.warning("⚠️  TikTok sounds error: %s for Spotify ID %s", response.status_code, spotify_id)
                 return None
     
     async def get_creators(
@@ -287,8 +278,8 @@ class ChartexClient:
         if search:
             params["search"] = search
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            print(f"📡 CHARTEX: GET /external/v1/accounts/ (page={page})")
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_creators")) as client:
+            logger.debug("📡 CHARTEX: GET /external/v1/accounts/ (page=%s)", page)
             
             response = await client.get(
                 f"{self.base_url}/external/v1/accounts/",
@@ -299,10 +290,10 @@ class ChartexClient:
             if response.status_code == 200:
                 data = response.json()
                 items = data.get("data", {}).get("items", [])
-                print(f"✅ Got {len(items)} creators")
+                logger.debug("✅ Got %s creators", len(items))
                 return items
             else:
-                print(f"❌ Creators API error: {response.status_code}")
+                logger.warning("❌ Creators API error: %s", response.status_code)
                 return []
     
     async def get_creator_metadata(self, username: str) -> Optional[Dict[str, Any]]:
@@ -311,8 +302,8 @@ class ChartexClient:
         
         Endpoint: /external/v1/accounts/{username}/metadata/
         """
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            print(f"📡 CHARTEX: GET /external/v1/accounts/{username}/metadata/")
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_creator_metadata")) as client:
+            logger.debug("📡 CHARTEX: GET /external/v1/accounts/%s/metadata/", username)
             
             response = await client.get(
                 f"{self.base_url}/external/v1/accounts/{username}/metadata/",
@@ -323,7 +314,7 @@ class ChartexClient:
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"❌ Creator metadata error: {response.status_code}")
+                logger.warning("❌ Creator metadata error: %s", response.status_code)
                 return None
     
     async def get_creator_follower_stats(
@@ -343,8 +334,8 @@ class ChartexClient:
             "_t": int(datetime.now().timestamp())
         }
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            print(f"📡 CHARTEX: GET /external/v1/accounts/{username}/stats/tiktok-follower-counts/")
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_creator_follower_stats")) as client:
+            logger.debug("📡 CHARTEX: GET /external/v1/accounts/%s/stats/tiktok-follower-counts/", username)
             
             response = await client.get(
                 f"{self.base_url}/external/v1/accounts/{username}/stats/tiktok-follower-counts/",
@@ -355,7 +346,7 @@ class ChartexClient:
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"❌ Creator follower stats error: {response.status_code}")
+                logger.warning("❌ Creator follower stats error: %s", response.status_code)
                 return None
     
     async def get_creator_videos(
@@ -381,8 +372,8 @@ class ChartexClient:
         if min_views:
             params["tiktok_video_views"] = min_views
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            print(f"📡 CHARTEX: GET /external/v1/accounts/{username}/video-statistics/")
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_creator_videos")) as client:
+            logger.debug("📡 CHARTEX: GET /external/v1/accounts/%s/video-statistics/", username)
             
             response = await client.get(
                 f"{self.base_url}/external/v1/accounts/{username}/video-statistics/",
@@ -393,10 +384,10 @@ class ChartexClient:
             if response.status_code == 200:
                 data = response.json()
                 items = data.get("data", {}).get("items", [])
-                print(f"✅ Got {len(items)} videos from @{username}")
+                logger.debug("✅ Got %s videos from @%s", len(items), username)
                 return items
             else:
-                print(f"❌ Creator videos error: {response.status_code}")
+                logger.warning("❌ Creator videos error: %s", response.status_code)
                 return []
     
     async def get_song_stats(
@@ -419,9 +410,9 @@ class ChartexClient:
             "_t": int(datetime.now().timestamp())
         }
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_song_stats")) as client:
             url = f"{self.base_url}/external/v1/songs/{platform_id}/{platform}/stats/{metric}/"
-            print(f"📡 CHARTEX: GET {url}")
+            logger.debug("📡 CHARTEX: GET %s", url)
             
             response = await client.get(
                 url,
@@ -432,7 +423,7 @@ class ChartexClient:
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"❌ Song stats error: {response.status_code}")
+                logger.warning("❌ Song stats error: %s", response.status_code)
                 return None
     
     async def get_tiktok_sound_stats(
@@ -454,9 +445,9 @@ class ChartexClient:
             "_t": int(datetime.now().timestamp())
         }
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_tiktok_sound_stats")) as client:
             url = f"{self.base_url}/external/v1/tiktok-sounds/{tiktok_sound_id}/stats/{metric}/"
-            print(f"📡 CHARTEX: GET {url}")
+            logger.debug("📡 CHARTEX: GET %s", url)
             
             response = await client.get(
                 url,
@@ -467,7 +458,7 @@ class ChartexClient:
             if response.status_code == 200:
                 return response.json()
             else:
-                print(f"❌ TikTok sound stats error: {response.status_code}")
+                logger.warning("❌ TikTok sound stats error: %s", response.status_code)
                 return None
     
     async def get_song_videos(
@@ -499,9 +490,9 @@ class ChartexClient:
         if min_views:
             params["tiktok_video_views"] = min_views
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_song_videos")) as client:
             url = f"{self.base_url}/external/v1/songs/{platform_id}/{platform}/video-statistics/"
-            print(f"📡 CHARTEX: GET {url}")
+            logger.debug("📡 CHARTEX: GET %s", url)
             
             response = await client.get(
                 url,
@@ -514,7 +505,7 @@ class ChartexClient:
                 items = data.get("data", {}).get("items", [])
                 return items
             else:
-                print(f"❌ Song videos error: {response.status_code}")
+                logger.warning("❌ Song videos error: %s", response.status_code)
                 return []
     
     async def get_song_influencers(
@@ -541,9 +532,9 @@ class ChartexClient:
         if country_code:
             params["country_code"] = country_code
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_song_influencers")) as client:
             url = f"{self.base_url}/external/v1/songs/{platform_id}/{platform}/influencer-statistics/"
-            print(f"📡 CHARTEX: GET {url}")
+            logger.debug("📡 CHARTEX: GET %s", url)
             
             response = await client.get(
                 url,
@@ -556,7 +547,7 @@ class ChartexClient:
                 items = data.get("data", {}).get("items", [])
                 return items
             else:
-                print(f"❌ Song influencers error: {response.status_code}")
+                logger.warning("❌ Song influencers error: %s", response.status_code)
                 return []
     
     async def get_song_countries(
@@ -575,9 +566,9 @@ class ChartexClient:
             "_t": int(datetime.now().timestamp())
         }
         
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True, transport=upstream_transport("chartex", "get_song_countries")) as client:
             url = f"{self.base_url}/external/v1/songs/{platform_id}/{platform}/country-statistics/"
-            print(f"📡 CHARTEX: GET {url}")
+            logger.debug("📡 CHARTEX: GET %s", url)
             
             response = await client.get(
                 url,
@@ -590,7 +581,7 @@ class ChartexClient:
                 items = data.get("data", {}).get("items", [])
                 return items
             else:
-                print(f"❌ Song countries error: {response.status_code}")
+                logger.warning("❌ Song countries error: %s", response.status_code)
                 return []
 
 
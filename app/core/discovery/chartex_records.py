@@ -0,0 +1,164 @@
+"""
+Chartex response normalization
+Turns the raw Chartex JSON (data.items, results, video_counts, stream_counts, ...)
+into compact slotted records, so routes and jobs stop re-probing response shapes.
+
+    songs = parse_songs(await client.get_songs(...))
+    stats = parse_stats(await client.get_song_stats(...))
+    stats.as_dicts()  # [{"date": ..., "value": ...}, ...] for JSON responses
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Where the series list lives, in the order Chartex endpoints use them
+_SERIES_KEYS = ("video_counts", "stream_counts", "results", "items")
+_DATE_KEYS = ("date", "timestamp", "day")
+_VALUE_KEYS = ("value", "count", "video_count", "tiktok_video_count", "spotify_stream_count", "streams")
+_TOTAL_KEYS = ("spotify_total_streams", "tiktok_total_video_count")
+
+
+def _first(raw: Dict[str, Any], keys) -> Any:
+    for key in keys:
+        value = raw.get(key)
+        if value is not None and value != "":
+            return value
+    return None
+
+
+@dataclass(slots=True)
+class SeriesPoint:
+    """One day of a time series"""
+    date: str
+    value: int
+
+
+@dataclass(slots=True)
+class SoundStats:
+    """A parsed stats response: daily points (oldest first) plus the all-time total if Chartex sent one"""
+    points: List[SeriesPoint] = field(default_factory=list)
+    total: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.points) or self.total > 0
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [{"date": point.date, "value": point.value} for point in self.points]
+
+    def values(self) -> List[int]:
+        return [point.value for point in self.points]
+
+
+@dataclass(slots=True)
+class Song:
+    """A song/sound row from the Chartex songs or tiktok-sounds endpoints"""
+    id: Optional[str] = None
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    image_url: Optional[str] = None
+    spotify_id: Optional[str] = None
+    tiktok_sound_id: Optional[str] = None
+    label_name: Optional[str] = None
+    distributor: Optional[str] = None
+    tiktok_total_video_count: Optional[int] = None
+    tiktok_last_7_days_video_count: Optional[int] = None
+    tiktok_last_24_hours_video_count: Optional[int] = None
+    tiktok_last_24_hours_video_percentage: Optional[float] = None
+    tiktok_total_sound_count: Optional[int] = None
+
+    @property
+    def record_label(self) -> Optional[str]:
+        """Label, falling back to distributor (what label filtering matches on)"""
+        return self.label_name or self.distributor or None
+
+    def metric(self, name: str) -> Any:
+        """Sort/metric value by Chartex field name, e.g. tiktok_last_7_days_video_count"""
+        return getattr(self, name, None)
+
+    def update_tiktok_metrics(self, sound: "Song"):
+        """Copy TikTok sound id + video counts from a linked sound"""
+        self.tiktok_sound_id = sound.tiktok_sound_id
+        self.tiktok_total_video_count = sound.tiktok_total_video_count
+        self.tiktok_last_7_days_video_count = sound.tiktok_last_7_days_video_count
+        self.tiktok_last_24_hours_video_count = sound.tiktok_last_24_hours_video_count
+
+
+def parse_song(raw: Dict[str, Any]) -> Song:
+    tiktok_sound_id = raw.get("tiktok_sound_id")
+    spotify_id = raw.get("spotify_id")
+    song_id = _first(raw, ("id", "song_id", "chartex_id")) or spotify_id or tiktok_sound_id
+    return Song(
+        id=str(song_id) if song_id is not None else None,
+        title=_first(raw, ("title", "song_name")),
+        artist=_first(raw, ("artist", "artists", "artist_name")),
+        image_url=raw.get("song_image_url"),
+        spotify_id=spotify_id,
+        tiktok_sound_id=str(tiktok_sound_id) if tiktok_sound_id is not None else None,
+        label_name=_first(raw, ("label_name", "label")),
+        distributor=raw.get("distributor"),
+        tiktok_total_video_count=raw.get("tiktok_total_video_count"),
+        tiktok_last_7_days_video_count=raw.get("tiktok_last_7_days_video_count"),
+        tiktok_last_24_hours_video_count=raw.get("tiktok_last_24_hours_video_count"),
+        tiktok_last_24_hours_video_percentage=raw.get("tiktok_last_24_hours_video_percentage"),
+        tiktok_total_sound_count=raw.get("tiktok_total_sound_count"),
+    )
+
+
+def parse_songs(items: Optional[List[Dict[str, Any]]]) -> List[Song]:
+    return [parse_song(raw) for raw in items or [] if isinstance(raw, dict)]
+
+
+def _items(response: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Item list from a {"data": {"items": [...]}} / {"results": [...]} response"""
+    if not isinstance(response, dict):
+        return []
+    data = response.get("data")
+    for container in (data, response):
+        if isinstance(container, dict):
+            items = _first(container, ("items", "results"))
+            if isinstance(items, list):
+                return items
+    return data if isinstance(data, list) else []
+
+
+def parse_song_list(response: Optional[Dict[str, Any]]) -> List[Song]:
+    """Songs from a paged response (e.g. get_tiktok_sounds_for_song)"""
+    return parse_songs(_items(response))
+
+
+def parse_song_detail(response: Optional[Dict[str, Any]]) -> Optional[Song]:
+    """Song from a song detail response ({"data": {...}} or the bare object); None when it identifies no song"""
+    if not isinstance(response, dict):
+        return None
+    data = response.get("data")
+    song = parse_song(data if isinstance(data, dict) else response)
+    if not (song.id or song.spotify_id or song.tiktok_sound_id):
+        return None
+    return song
+
+
+def parse_stats(response: Optional[Dict[str, Any]]) -> SoundStats:
+    """Stats from any of the Chartex stats endpoints (songs/.../stats, tiktok-sounds/.../stats)"""
+    if not isinstance(response, dict):
+        return SoundStats()
+    data = response.get("data")
+    containers = [data, response] if isinstance(data, dict) else [response]
+
+    raw_points: List[Dict[str, Any]] = []
+    total = 0
+    for container in containers:
+        if not raw_points:
+            series = _first(container, _SERIES_KEYS)
+            if isinstance(series, list):
+                raw_points = series
+        if not total:
+            total = _first(container, _TOTAL_KEYS) or 0
+
+    points = []
+    for raw in raw_points:
+        if not isinstance(raw, dict):
+            continue
+        date = _first(raw, _DATE_KEYS)
+        if date:
+            points.append(SeriesPoint(date=date, value=_first(raw, _VALUE_KEYS) or 0))
+    points.sort(key=lambda point: point.date)
+    return SoundStats(points=points, total=total)
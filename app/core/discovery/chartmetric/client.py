@@ -3,10 +3,13 @@ Chartmetric API base client
 Handles authentication and base requests
 """
 import httpx
+import logging
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class ChartmetricClient:
     """
@@ -57,7 +60,7 @@ class ChartmetricClient:
                     raise Exception(f"Unexpected token response format: {data}")
                 # Chartmetric tokens typically last 14 days
                 self._token_expires_at = datetime.utcnow() + timedelta(days=13)
-                print(f"✅ Chartmetric access token refreshed")
+                logger.debug("✅ Chartmetric access token refreshed")
             else:
                 raise Exception(f"Failed to refresh Chartmetric token: {response.status_code} - {response.text}")
     
@@ -3,7 +3,6 @@ Spotify feature extraction
 Deterministic heuristics only - no ML
 """
 from typing import List, Optional
-import numpy as np
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models.discovery import Track, TrackMetric
@@ -42,6 +41,7 @@ class SpotifyFeatures:
             return 0.0
         
         # Calculate coefficient of variation (CV)
+        import numpy as np  # Lazy - keeps numpy out of API cold start
         mean_streams = np.mean(streams)
         std_streams = np.std(streams)
         
@@ -0,0 +1,89 @@
+"""
+In-process snapshot of the active pinned songs
+The trending endpoint splices pins into every response, so they are read from
+memory instead of the pinned_songs table. Pin edits call invalidate(), which
+bumps a shared generation - every worker reloads on its next read.
+
+    pins = get_pinned_snapshot().pins()   # ordered by pin_position
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.state_store import Generation
+from app.db.session import SessionLocal
+from app.models.discovery import PinnedSong
+
+logger = logging.getLogger(__name__)
+
+
+class PinnedSnapshot:
+    """Active pins as plain dicts, reloaded whenever the pinned_songs generation moves"""
+
+    def __init__(self):
+        self._generation = Generation("pinned_songs")
+        self._pins: Tuple[Dict[str, Any], ...] = ()
+        self._loaded_generation: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load() -> Tuple[Dict[str, Any], ...]:
+        db = SessionLocal()
+        try:
+            rows = db.query(PinnedSong).filter(
+                PinnedSong.is_active == True
+            ).order_by(PinnedSong.pin_position).all()
+            return tuple(
+                {
+                    "id": p.id,
+                    "song_name": p.song_name,
+                    "artist_name": p.artist_name,
+                    "spotify_id": p.spotify_id,
+                    "song_image_url": p.song_image_url,
+                    "label_name": p.label_name,
+                    "pin_position": p.pin_position,
+                    "pinned_at": p.pinned_at,
+                    "notes": p.notes
+                }
+                for p in rows
+            )
+        finally:
+            db.close()
+
+    @property
+    def generation(self) -> Optional[int]:
+        """Generation the current snapshot was loaded at (part of enrichment cache keys)"""
+        return self._loaded_generation
+
+    def pins(self) -> List[Dict[str, Any]]:
+        generation = self._generation.current()
+        with self._lock:
+            if generation != self._loaded_generation:
+                try:
+                    self._pins = self._load()
+                    self._loaded_generation = generation
+                    logger.info(f"📌 Loaded {len(self._pins)} pinned songs (generation {generation})")
+                except Exception as e:
+                    # Keep serving the previous snapshot; retried on the next read
+                    logger.warning(f"⚠️  Pinned songs reload failed: {e}")
+            return list(self._pins)
+
+    def invalidate(self):
+        """Call after any pin add/update/delete has been committed"""
+        with self._lock:
+            self._loaded_generation = None
+        try:
+            self._generation.bump()
+        except Exception as e:
+            logger.warning(f"⚠️  Pinned songs invalidation not shared with other workers: {e}")
+
+
+_pinned_snapshot: Optional[PinnedSnapshot] = None
+
+
+def get_pinned_snapshot() -> PinnedSnapshot:
+    """Get or create the pinned songs snapshot singleton"""
+    global _pinned_snapshot
+    if _pinned_snapshot is None:
+        _pinned_snapshot = PinnedSnapshot()
+    return _pinned_snapshot
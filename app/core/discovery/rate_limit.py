@@ -0,0 +1,75 @@
+"""
+Shared upstream rate limits
+One limiter per upstream API, shared by every caller in the process
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+
+class AsyncRateLimiter:
+    """
+    Concurrency cap + minimum spacing between request starts
+
+    Usage:
+        async with get_rate_limiter("chartex"):
+            await client.get_song_stats(...)
+    """
+
+    def __init__(self, requests_per_second: float, max_concurrency: int):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self.loop = asyncio.get_running_loop()
+
+    async def acquire(self):
+        await self._semaphore.acquire()
+        if not self.min_interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release(self):
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+# Keyed by upstream; rebuilt when a new event loop is running (e.g. each asyncio.run in a job)
+_limiters: Dict[str, AsyncRateLimiter] = {}
+
+
+def _limits_for(upstream: str) -> tuple:
+    if upstream == "chartmetric":
+        return settings.CHARTMETRIC_REQUESTS_PER_SECOND, settings.CHARTMETRIC_MAX_CONCURRENCY
+    if upstream == "chartex":
+        return settings.CHARTEX_REQUESTS_PER_SECOND, settings.CHARTEX_MAX_CONCURRENCY
+    if upstream == "spotify":
+        return settings.SPOTIFY_REQUESTS_PER_SECOND, settings.SPOTIFY_MAX_CONCURRENCY
+    raise ValueError(f"Unknown upstream: {upstream}")
+
+
+def get_rate_limiter(upstream: str) -> AsyncRateLimiter:
+    """
+    Get or create the rate limiter for an upstream (chartmetric, chartex, spotify)
+    Must be called from inside a running event loop
+    """
+    limiter: Optional[AsyncRateLimiter] = _limiters.get(upstream)
+    if limiter is None or limiter.loop is not asyncio.get_running_loop():
+        rate, concurrency = _limits_for(upstream)
+        limiter = AsyncRateLimiter(rate, concurrency)
+        _limiters[upstream] = limiter
+    return limiter
@@ -0,0 +1,197 @@
+"""
+Two-level response cache for discovery payloads
+In-process dict in front of the discovery_cache table, so results computed by
+background jobs (or another worker) are served without a cold upstream fan-out.
+clear() bumps a shared generation, so every worker drops its in-process copies
+within STATE_GENERATION_POLL_SECONDS instead of serving them until they expire;
+reload() does the same after rows were rewritten elsewhere (the pre-warm job).
+The in-process dict holds at most RESPONSE_CACHE_MAX_ENTRIES, least recently used
+first out, and expired entries are swept as new ones are written.
+Every entry has a version (key + computed_at) that is the same on every worker
+serving it - endpoints derive their ETag from it - and keeps its JSON encoding
+once rendered, so repeat hits are written out without re-encoding.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.http_cache import render_json
+from app.core.metrics import record_cache_lookup
+from app.core.state_store import Generation
+from app.db.session import SessionLocal
+from app.models.discovery import DiscoveryCache
+
+logger = logging.getLogger(__name__)
+
+_SWEEP_INTERVAL_SECONDS = 60
+
+
+class CacheEntry:
+    """A cached payload with its version and (rendered on first use) JSON body"""
+    __slots__ = ("value", "version", "expires_at", "generation", "_body")
+
+    def __init__(self, value: Any, version: str, expires_at: float, generation: int):
+        self.value = value
+        self.version = version
+        self.expires_at = expires_at
+        self.generation = generation
+        self._body: Optional[bytes] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = render_json(self.value)
+        return self._body
+
+
+class ResponseCache:
+    """
+    Namespaced TTL cache, memory first then DB
+
+    ttl_seconds=0 disables caching entirely (get() always misses, set() is a no-op).
+    max_entries bounds the in-process dict (default RESPONSE_CACHE_MAX_ENTRIES).
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: int, persist: bool = True, max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self.max_entries = settings.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()  # Least recently used first
+        self._swept_at = time.monotonic()
+        self._generation = Generation(f"response_cache:{namespace}")
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        """Stable hash of the request parameters"""
+        raw = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _db_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    @staticmethod
+    def _version(key: str, computed_at: datetime) -> str:
+        return f"{key}:{computed_at.isoformat()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        if not self.ttl_seconds:
+            return None
+
+        generation = self._generation.current()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if time.time() < entry.expires_at and entry.generation == generation:
+                self._memory.move_to_end(key)
+                record_cache_lookup(self.namespace, "hit")
+                return entry
+            self._memory.pop(key, None)
+
+        if not self.persist:
+            record_cache_lookup(self.namespace, "miss")
+            return None
+
+        try:
+            db = SessionLocal()
+            try:
+                row = db.query(DiscoveryCache).filter(
+                    DiscoveryCache.cache_key == self._db_key(key),
+                    DiscoveryCache.expires_at > datetime.utcnow()
+                ).first()
+                if row is None:
+                    record_cache_lookup(self.namespace, "miss")
+                    return None
+                remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+                entry = CacheEntry(row.payload, self._version(key, row.computed_at), time.time() + remaining, generation)
+                self._remember(key, entry)
+                record_cache_lookup(self.namespace, "hit_db")
+                return entry
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"⚠️  Cache read failed for {self.namespace}: {e}")
+            record_cache_lookup(self.namespace, "miss")
+            return None
+
+    def _remember(self, key: str, entry: CacheEntry):
+        """Keep entry in memory: sweep expired entries now and then, evict beyond max_entries"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if time.monotonic() - self._swept_at >= _SWEEP_INTERVAL_SECONDS:
+            now = time.time()
+            for expired in [k for k, cached in self._memory.items() if cached.expires_at <= now]:
+                del self._memory[expired]
+            self._swept_at = time.monotonic()
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def set(self, key: str, value: Any) -> Optional[CacheEntry]:
+        """Store value; returns its entry (None when caching is disabled)"""
+        if not self.ttl_seconds:
+            return None
+
+        now = datetime.utcnow()
+        entry = CacheEntry(value, self._version(key, now), time.time() + self.ttl_seconds, self._generation.current())
+        self._remember(key, entry)
+
+        if not self.persist:
+            return entry
+
+        try:
+            db = SessionLocal()
+            try:
+                db.merge(DiscoveryCache(
+                    cache_key=self._db_key(key),
+                    namespace=self.namespace,
+                    payload=value,
+                    computed_at=now,
+                    expires_at=now + timedelta(seconds=self.ttl_seconds)
+                ))
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.warning(f"⚠️  Cache write failed for {self.namespace}: {e}")
+        return entry
+
+    def clear(self):
+        """Drop every entry in this namespace (memory and DB, on every worker)"""
+        self._memory.clear()
+
+        try:
+            if self.persist:
+                db = SessionLocal()
+                try:
+                    db.query(DiscoveryCache).filter(
+                        DiscoveryCache.namespace == self.namespace
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                finally:
+                    db.close()
+            # After the rows are gone, so other workers can't refill from stale ones
+            self._generation.bump()
+        except Exception as e:
+            logger.warning(f"⚠️  Cache clear failed for {self.namespace}: {e}")
+
+    def reload(self):
+        """
+        Rows were rewritten by another process - every worker drops its in-memory
+        copies and reads the current rows on the next lookup
+        """
+        self._memory.clear()
+        try:
+            self._generation.bump()
+        except Exception as e:
+            logger.warning(f"⚠️  Cache reload failed for {self.namespace}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._memory)
@@ -7,7 +7,6 @@ from sqlalchemy.orm import Session
 from app.models.discovery import Track
 from app.core.discovery.features import SpotifyFeatures, TemporalFeatures
 from .weights import EVERGREEN_WEIGHTS, MIN_THRESHOLDS
-import numpy as np
 
 
 class EvergreenScorer:
@@ -108,6 +107,7 @@ class EvergreenScorer:
         ).all()
         
         if metrics:
+            import numpy as np  # Lazy - keeps numpy out of API cold start
             avg_streams = np.mean([m.spotify_streams for m in metrics if m.spotify_streams])
             if avg_streams < MIN_THRESHOLDS["evergreen_min_avg_streams"]:
                 return False
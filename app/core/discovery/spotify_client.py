@@ -3,10 +3,14 @@ Spotify Web API Client
 Free tier provides track metadata, images, and popularity
 """
 import httpx
+import logging
 import base64
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.core.metrics import upstream_transport
+
+logger = logging.getLogger(__name__)
 
 
 class SpotifyClient:
@@ -39,7 +43,7 @@ class SpotifyClient:
         credentials = f"{self.client_id}:{self.client_secret}"
         encoded = base64.b64encode(credentials.encode()).decode()
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=upstream_transport("spotify", "access_token")) as client:
             response = await client.post(
                 "https://accounts.spotify.com/api/token",
                 headers={
@@ -56,7 +60,7 @@ class SpotifyClient:
                 self._access_token = data["access_token"]
                 expires_in = data.get("expires_in", 3600)  # Usually 1 hour
                 self._token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
-                print(f"✅ Spotify access token obtained")
+                logger.debug("✅ Spotify access token obtained")
             else:
                 raise Exception(f"Failed to get Spotify token: {response.status_code} - {response.text}")
     
@@ -71,7 +75,7 @@ class SpotifyClient:
             "Authorization": f"Bearer {self._access_token}"
         }
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=upstream_transport("spotify", "get_track")) as client:
             response = await client.get(
                 f"{self.base_url}/tracks/{spotify_id}",
                 headers=headers
@@ -95,7 +99,7 @@ class SpotifyClient:
             "Authorization": f"Bearer {self._access_token}"
         }
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=upstream_transport("spotify", "get_track_audio_features")) as client:
             response = await client.get(
                 f"{self.base_url}/audio-features/{spotify_id}",
                 headers=headers
@@ -122,7 +126,7 @@ class SpotifyClient:
             "Authorization": f"Bearer {self._access_token}"
         }
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=upstream_transport("spotify", "search_track")) as client:
             response = await client.get(
                 f"{self.base_url}/search",
                 headers=headers,
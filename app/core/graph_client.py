@@ -0,0 +1,120 @@
+"""
+Shared Microsoft Graph client
+One pooled httpx.AsyncClient for every Graph call, so mail endpoints reuse
+keep-alive connections instead of paying a TLS handshake per request.
+The user's token is passed per call.
+
+    data = await get_graph_client().get_json("/me/mailFolders", token, params={"$top": 100})
+"""
+import logging
+import re
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import UpstreamTransport
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+# Path segments kept verbatim in metric labels (collection names, well-known folders)
+_GRAPH_WORD = re.compile(r"^(\$value|[A-Za-z]{1,30})$")
+
+
+def _graph_operation(request: httpx.Request) -> str:
+    """Metric label for a Graph call, e.g. "GET /me/messages/{id}/attachments/{id}" """
+    segments = request.url.path.split("/")[2:]  # Drop "" and "v1.0"
+    path = "/".join(segment if _GRAPH_WORD.match(segment) else "{id}" for segment in segments)
+    return f"{request.method} /{path}"
+
+
+class GraphError(Exception):
+    """Non-success response from Graph"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Graph API returned {status_code}: {text[:500]}")
+        self.status_code = status_code
+        self.text = text
+
+
+class GraphClient:
+    def __init__(self, timeout: float, max_connections: int):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=GRAPH_BASE_URL,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                transport=UpstreamTransport(
+                    "graph",
+                    operation_for=_graph_operation,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections
+                    ),
+                ),
+            )
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        token: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """
+        Raw Graph request; `url` is a path under /v1.0 or an absolute
+        @odata.nextLink/@odata.deltaLink
+        """
+        return await self._http().request(
+            method,
+            url,
+            params=params,
+            json=json,
+            headers={"Authorization": f"Bearer {token}", **(headers or {})},
+        )
+
+    async def get_json(
+        self,
+        url: str,
+        token: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """GET and decode, raising GraphError on anything but 200"""
+        response = await self.request("GET", url, token, params=params, headers=headers)
+        if response.status_code != 200:
+            raise GraphError(response.status_code, response.text)
+        return response.json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_graph_client: Optional[GraphClient] = None
+
+
+def get_graph_client() -> GraphClient:
+    """Get or create the Graph client singleton"""
+    global _graph_client
+    if _graph_client is None:
+        _graph_client = GraphClient(
+            timeout=settings.GRAPH_TIMEOUT_SECONDS,
+            max_connections=settings.GRAPH_MAX_CONNECTIONS
+        )
+    return _graph_client
+
+
+async def close_graph_client():
+    if _graph_client is not None:
+        await _graph_client.aclose()
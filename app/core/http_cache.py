@@ -0,0 +1,98 @@
+"""
+Conditional GET for JSON endpoints
+Responses carry a strong ETag and "Cache-Control: private, no-cache": the
+browser keeps its copy but revalidates on every poll, and an unchanged payload
+is answered with an empty 304.
+
+    return json_response(request, payload, version=cache_version)  # ETag from the cached payload version
+    return json_response(request, payload)                          # ETag from the encoded body
+    return json_response(request, version=entry.version, body=entry.body)  # pre-encoded cache entry
+
+With a version the 304 check happens before the payload is encoded at all.
+Encoding is orjson (see render_json), the same as the app's default response class.
+CompressionMiddleware tags compressed bodies with "-gzip"/"-br" inside the
+ETag (one strong ETag per representation); etag_matches() ignores the tag.
+"""
+import hashlib
+from typing import Any, Optional, Union
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+REVALIDATE = "private, no-cache"
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def make_etag(version: Union[str, bytes]) -> str:
+    """Strong ETag for a payload version (or the encoded body itself)"""
+    if isinstance(version, str):
+        version = version.encode("utf-8")
+    return '"' + hashlib.sha256(version).hexdigest()[:32] + '"'
+
+
+def etag_for_encoding(etag: str, encoding: str) -> str:
+    """ETag of the compressed representation: "abc" -> "abc-gzip" (weak ETags are left alone)"""
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def _strip_encoding(etag: str) -> str:
+    if etag.startswith("W/"):
+        etag = etag[2:]  # If-None-Match uses weak comparison
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(suffix + '"'):
+            return etag[:-len(suffix) - 1] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_strip_encoding(candidate.strip()) == etag for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+def render_json(payload: Any) -> bytes:
+    """
+    Encode with orjson - dicts, lists, datetimes etc. natively in C; anything
+    else (pydantic models, Decimal, ...) goes through jsonable_encoder
+    """
+    return orjson.dumps(payload, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(
+    request: Request,
+    payload: Any = None,
+    version: Optional[str] = None,
+    body: Optional[bytes] = None,
+) -> Response:
+    """
+    JSON response with a strong ETag, or 304 when the client already has it
+    version must change whenever the payload does; None hashes the encoded body.
+    body is the already encoded payload (written as-is).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if version is not None:
+        etag = make_etag(version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        if body is None:
+            body = render_json(payload)
+    else:
+        if body is None:
+            body = render_json(payload)
+        etag = make_etag(body)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": REVALIDATE},
+    )
@@ -0,0 +1,148 @@
+"""
+Process-wide logging setup
+Records are formatted on the calling thread but written to stdout by a
+background listener, so a slow or line-buffered stdout never stalls the event
+loop. Levels are set per module prefix, and debug output can be sampled per
+request instead of being all-or-nothing.
+
+    configure_logging()                      # once, at process start
+    begin_request(request.headers.get("x-request-id"))
+
+Settings:
+    LOG_LEVEL=INFO
+    LOG_LEVELS=app.core.discovery.chartex_client=DEBUG,httpx=WARNING
+    LOG_FORMAT=json                          # one JSON object per line (default: text)
+    LOG_DEBUG_SAMPLE_RATE=100                # DEBUG output for one in 100 requests
+
+Use lazy %-style arguments in hot paths - logger.debug("got %s", value) costs
+almost nothing when DEBUG is off, an f-string is always formatted.
+"""
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes that are not "extra" fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_request_id", default=None)
+_debug_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("log_debug_sampled", default=False)
+_request_counter = itertools.count()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _parse_levels(value: str) -> Dict[str, int]:
+    """LOG_LEVELS string -> {logger prefix: level}, e.g. "httpx=WARNING" -> {"httpx": 30}"""
+    levels = {}
+    for part in value.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; extra={...} fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            data["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Tags records with the current request id; with sampling on, drops DEBUG
+    records of app loggers outside the sampled requests
+    """
+
+    def __init__(self, base_level: int, overrides: Dict[str, int], sample_debug: bool):
+        super().__init__()
+        self.base_level = base_level
+        self.overrides = overrides
+        self.sample_debug = sample_debug
+        self._levels: Dict[str, int] = {}
+
+    def _configured_level(self, name: str) -> int:
+        """Level the logger would have without sampling (longest matching prefix wins)"""
+        level = self._levels.get(name)
+        if level is None:
+            best, level = "", self.base_level
+            for prefix, prefix_level in self.overrides.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(prefix) > len(best):
+                    best, level = prefix, prefix_level
+            self._levels[name] = level
+        return level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        if (
+            self.sample_debug
+            and record.levelno < self._configured_level(record.name)
+            and not _debug_sampled.get()
+        ):
+            return False
+        return True
+
+
+def configure_logging():
+    """Install the queue handler on the root logger (replaces basicConfig)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    base_level = logging.getLevelName(settings.LOG_LEVEL.upper())
+    overrides = _parse_levels(settings.LOG_LEVELS)
+    sample_debug = settings.LOG_DEBUG_SAMPLE_RATE > 0
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter(base_level, overrides, sample_debug))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(base_level)
+    for name, level in overrides.items():
+        logging.getLogger(name).setLevel(level)
+    if sample_debug and logging.getLogger("app").level in (logging.NOTSET, base_level):
+        # Sampled requests need app debug records to exist; the filter drops the rest
+        logging.getLogger("app").setLevel(min(logging.DEBUG, base_level))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Flush what is still queued
+
+
+def begin_request(request_id: Optional[str] = None) -> str:
+    """Bind a request id (generated if missing) and decide whether this request logs DEBUG"""
+    request_id = request_id or uuid.uuid4().hex[:12]
+    _request_id.set(request_id)
+    rate = settings.LOG_DEBUG_SAMPLE_RATE
+    _debug_sampled.set(rate > 0 and next(_request_counter) % rate == 0)
+    return request_id
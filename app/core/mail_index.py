@@ -0,0 +1,136 @@
+"""
+Local full-text index of synced outreach mail
+Every header the mailbox sync stores (plus the plain-text body) goes into the
+SQLite FTS5 table mail_search (rowid = mail_messages.id), so searching mail
+and "all correspondence with this artist" never call Graph.
+
+    search_messages(db, user.id, "demo remix")
+    artist_correspondence(db, user.id, "Some Artist")
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import JSON, text
+from sqlalchemy.orm import Session
+
+from app.models.mail import MailMessage
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def _participants(header: Dict[str, Any]) -> str:
+    """Sender and recipient names + addresses as one searchable string"""
+    people = [header.get("from")] + list(header.get("toRecipients") or [])
+    parts = []
+    for person in people:
+        address = (person or {}).get("emailAddress") or {}
+        parts.extend(value for value in (address.get("name"), address.get("address")) if value)
+    return " ".join(parts)
+
+
+def index_message(db: Session, row: MailMessage, body: Optional[str] = None):
+    """
+    (Re)index one cached message; row.id must be assigned (flush first)
+    body=None keeps the previously indexed body (updates like isRead carry none).
+    """
+    if body is None:
+        body = db.execute(text("SELECT body FROM mail_search WHERE rowid = :id"), {"id": row.id}).scalar() or ""
+    header = row.header or {}
+    db.execute(text("DELETE FROM mail_search WHERE rowid = :id"), {"id": row.id})
+    db.execute(
+        text("INSERT INTO mail_search (rowid, subject, participants, body) VALUES (:id, :subject, :participants, :body)"),
+        {"id": row.id, "subject": header.get("subject") or "", "participants": _participants(header), "body": body},
+    )
+
+
+def unindex_messages(db: Session, row_ids: Iterable[int]):
+    for row_id in row_ids:
+        db.execute(text("DELETE FROM mail_search WHERE rowid = :id"), {"id": row_id})
+
+
+def unindex_folder(db: Session, user_id: int, folder: str):
+    db.execute(
+        text("DELETE FROM mail_search WHERE rowid IN (SELECT id FROM mail_messages WHERE user_id = :user_id AND folder = :folder)"),
+        {"user_id": user_id, "folder": folder},
+    )
+
+
+def _match_expression(query: str, prefix: bool = True) -> Optional[str]:
+    """
+    User input -> FTS5 query: every word must match (last one as a prefix while typing)
+    Words are quoted, so FTS operators and punctuation in the input are inert.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if prefix:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _rows_to_results(rows) -> List[Dict[str, Any]]:
+    """One result per Graph message (a message can be cached under several folders)"""
+    results: List[Dict[str, Any]] = []
+    seen = set()
+    for row in rows:
+        if row.message_id in seen:
+            continue
+        seen.add(row.message_id)
+        result = dict(row.header)
+        result["folder"] = row.folder
+        if row.snippet:
+            result["snippet"] = row.snippet
+        results.append(result)
+    return results
+
+
+def _search(db: Session, user_id: int, match: str, limit: int, folder: Optional[str], order: str) -> List[Dict[str, Any]]:
+    sql = f"""
+        SELECT m.message_id, m.folder, m.header,
+               snippet(mail_search, 2, '[', ']', '…', 12) AS snippet
+        FROM mail_search
+        JOIN mail_messages m ON m.id = mail_search.rowid
+        WHERE mail_search MATCH :match
+          AND m.user_id = :user_id
+          AND m.removed = 0
+          {"AND m.folder = :folder" if folder else ""}
+        ORDER BY {order}
+        LIMIT :limit
+    """
+    rows = db.execute(text(sql).columns(header=JSON), {
+        "match": match, "user_id": user_id, "folder": folder, "limit": limit * 2  # Room for per-folder duplicates
+    }).all()
+    return _rows_to_results(rows)[:limit]
+
+
+def search_messages(db: Session, user_id: int, query: str, limit: int = 50, folder: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Best matches first (bm25; subject and participants weigh more than the body)"""
+    match = _match_expression(query)
+    if match is None:
+        return []
+    return _search(db, user_id, match, limit, folder, order="bm25(mail_search, 5.0, 3.0, 1.0)")
+
+
+def artist_correspondence(db: Session, user_id: int, artist_name: str, limit: int = 200) -> List[Dict[str, Any]]:
+    """
+    Every synced message mentioning the artist (as sender/recipient name, in the
+    subject or in the body), newest first, grouped by conversation
+    """
+    terms = _TERM.findall(artist_name)
+    if not terms:
+        return []
+    match = '"' + " ".join(terms) + '"'  # Whole name as a phrase
+    messages = _search(db, user_id, match, limit, folder=None, order="m.sort_date DESC")
+
+    conversations: Dict[str, Dict[str, Any]] = {}
+    for message in messages:
+        key = message.get("conversationId") or message["id"]
+        conversation = conversations.setdefault(key, {
+            "conversationId": key,
+            "subject": message.get("subject"),
+            "latest": message.get("receivedDateTime") or message.get("sentDateTime"),
+            "messages": [],
+        })
+        conversation["messages"].append(message)
+    return list(conversations.values())
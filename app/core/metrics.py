@@ -0,0 +1,427 @@
+"""
+Prometheus-style metrics
+Small in-process registry rendered in the Prometheus text format at /metrics:
+request latency per route template, requests in flight, upstream calls
+(Chartex, Spotify, Graph) per method and status, cache hit ratios and DB
+queries per request.
+
+    UPSTREAM_REQUESTS.inc(upstream="chartex", operation="get_songs", status="200")
+    with HTTP_REQUEST_DURATION.time(method="GET", route="/health", status="200"): ...
+
+Metrics are kept per process. Every worker publishes its samples to the shared
+state store every METRICS_PUBLISH_SECONDS, labelled worker="<host>:<pid>", and
+/metrics on any worker renders all of them - sum by the other labels for totals.
+A worker that stops publishing drops out after three intervals.
+"""
+import contextvars
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.core import tracing
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self.values().items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down per label set"""
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels: str):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """Cumulative buckets + sum + count per label set"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            snapshot = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered together"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collect_hooks: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, hook: Callable[[], None]):
+        """Run hook right before rendering (for values derived from other metrics)"""
+        self._collect_hooks.append(hook)
+
+    def render(self) -> str:
+        for hook in self._collect_hooks:
+            hook()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, worker: str) -> Dict[str, List[str]]:
+        """Sample lines per metric name, each labelled worker=<worker>"""
+        for hook in self._collect_hooks:
+            hook()
+        return {metric.name: [_add_label(line, "worker", worker) for line in metric._samples()] for metric in self._metrics}
+
+    def render_snapshots(self, snapshots: List[Dict[str, List[str]]]) -> str:
+        """Text exposition of several workers' snapshots (HELP/TYPE once per metric)"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for snapshot in snapshots:
+                lines.extend(snapshot.get(metric.name, []))
+        return "\n".join(lines) + "\n"
+
+
+def _add_label(sample: str, name: str, value: str) -> str:
+    """'m{a="b"} 1' -> 'm{a="b",name="value"} 1'"""
+    series, _, number = sample.rpartition(" ")
+    label = f'{name}="{_escape(value)}"'
+    if series.endswith("}"):
+        return f"{series[:-1]},{label}}} {number}"
+    return f"{series}{{{label}}} {number}"
+
+
+REGISTRY = MetricsRegistry()
+
+# ------------------------
+# HTTP requests
+# ------------------------
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight",
+    "Requests currently being served",
+    ("method",),
+))
+HTTP_REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries",
+    "DB queries issued per request",
+    ("route",),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+))
+
+# ------------------------
+# Upstream APIs
+# ------------------------
+UPSTREAM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "upstream_request_duration_seconds",
+    "Upstream API latency (until response headers) by client method",
+    ("upstream", "operation"),
+))
+UPSTREAM_REQUESTS = REGISTRY.register(Counter(
+    "upstream_requests_total",
+    "Upstream API calls by client method and HTTP status (error = no response)",
+    ("upstream", "operation", "status"),
+))
+
+# ------------------------
+# Caches
+# ------------------------
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "cache_lookups_total",
+    "Cache lookups by result (hit, hit_db, miss)",
+    ("cache", "result"),
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "cache_hit_ratio",
+    "Share of lookups served from cache since process start",
+    ("cache",),
+))
+
+# ------------------------
+# Database
+# ------------------------
+DB_QUERIES = REGISTRY.register(Counter(
+    "db_queries_total",
+    "SQL statements executed",
+))
+DB_QUERY_SECONDS = REGISTRY.register(Counter(
+    "db_query_seconds_total",
+    "Time spent executing SQL statements",
+))
+
+
+def _update_cache_hit_ratio():
+    lookups: Dict[str, List[float]] = {}
+    for (cache, result), value in CACHE_LOOKUPS.values().items():
+        hits_total = lookups.setdefault(cache, [0.0, 0.0])
+        hits_total[1] += value
+        if result != "miss":
+            hits_total[0] += value
+    for cache, (hits, total) in lookups.items():
+        CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
+
+
+REGISTRY.on_collect(_update_cache_hit_ratio)
+
+
+def record_cache_lookup(cache: str, result: str):
+    CACHE_LOOKUPS.inc(cache=cache, result=result)
+
+
+# ------------------------
+# Per-request DB query counting
+# ------------------------
+class RequestStats:
+    """Mutable per-request counters; shared with threadpool endpoints through the context copy"""
+    __slots__ = ("db_queries",)
+
+    def __init__(self):
+        self.db_queries = 0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def start_request_stats() -> RequestStats:
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def instrument_engine(engine):
+    """Count statements (globally and for the current request) and their time"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        DB_QUERIES.inc()
+        DB_QUERY_SECONDS.inc(time.perf_counter() - started)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # A failed statement never reaches after_cursor_execute - drop its start time
+        conn = exception_context.connection
+        if conn is not None and exception_context.execution_context is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+
+# ------------------------
+# Upstream HTTP clients
+# ------------------------
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport and records every call (metrics + a client span
+    when the request is traced)
+    operation is either fixed (client method name) or derived from the request.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        operation: Optional[str] = None,
+        operation_for: Optional[Callable[[httpx.Request], str]] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        **transport_kwargs,
+    ):
+        self.upstream = upstream
+        self.operation = operation
+        self.operation_for = operation_for
+        self._transport = transport or httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        operation = self.operation or (self.operation_for(request) if self.operation_for else request.url.path)
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with tracing.span(
+                f"{self.upstream} {operation}",
+                kind=tracing.SPAN_KIND_CLIENT,
+                **{"http.method": request.method, "server.address": request.url.host}
+            ) as span:
+                response = await self._transport.handle_async_request(request)
+                status = str(response.status_code)
+                if span is not None:
+                    span.set(**{"http.status_code": response.status_code})
+            return response
+        finally:
+            UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, upstream=self.upstream, operation=operation)
+            UPSTREAM_REQUESTS.inc(upstream=self.upstream, operation=operation, status=status)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def upstream_transport(upstream: str, operation: str) -> UpstreamTransport:
+    """Transport for a one-off httpx.AsyncClient inside an upstream client method"""
+    return UpstreamTransport(upstream, operation=operation)
+
+
+# ------------------------
+# Cross-worker exposition
+# ------------------------
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+_SNAPSHOT_NAMESPACE = "metrics"
+
+
+def publish_snapshot():
+    """Share this worker's samples with the others (expires unless republished)"""
+    from app.core.state_store import get_state_store
+
+    get_state_store().put(
+        _SNAPSHOT_NAMESPACE, WORKER_ID, REGISTRY.snapshot(WORKER_ID),
+        ttl_seconds=settings.METRICS_PUBLISH_SECONDS * 3
+    )
+
+
+def render_all_workers() -> str:
+    """Every live worker's metrics; this worker's own are fresh, the others' up to METRICS_PUBLISH_SECONDS old"""
+    from app.core.state_store import get_state_store
+
+    own = REGISTRY.snapshot(WORKER_ID)
+    snapshots: Dict[str, Any] = {}
+    try:
+        snapshots = get_state_store().values(_SNAPSHOT_NAMESPACE)
+    except Exception as e:
+        logger.warning(f"⚠️  Reading worker metrics failed: {e}")
+    snapshots[WORKER_ID] = own
+    return REGISTRY.render_snapshots([snapshots[worker] for worker in sorted(snapshots)])
@@ -2,8 +2,10 @@
 PDF conversion utilities for contract preview
 Converts DOCX to PDF and then to images for live preview
 """
+import io
+import logging
 import os
-import tempfile
+import shutil
 import base64
 from pathlib import Path
 from typing import List
@@ -11,6 +13,12 @@ import subprocess
 import sys
 import platform
 
+from app.core.artifacts import get_artifact_store
+from app.core.config import settings
+from app.core.converter_pool import ConverterUnavailable, get_converter_pool, new_job_dir
+
+logger = logging.getLogger(__name__)
+
 try:
     from pdf2image import convert_from_path
     PDF2IMAGE_AVAILABLE = True
@@ -42,74 +50,80 @@ def docx_to_pdf(docx_path: str) -> str:
     """
     Convert DOCX file to PDF using LibreOffice
     
+    Uses the persistent converter pool when available, otherwise a one-shot
+    LibreOffice process. The PDF is written to its own job directory; remove
+    it with cleanup_pdf() when done.
+    
     Args:
         docx_path: Path to the .docx file
         
     Returns:
         Path to the generated PDF file
     """
-    # Create temp directory for output
-    temp_dir = tempfile.gettempdir()
+    pool = get_converter_pool()
+    if pool.available:
+        try:
+            return pool.convert(docx_path)
+        except ConverterUnavailable as e:
+            logger.warning("Converter pool unavailable, falling back to one-shot LibreOffice: %s", e)
+    
+    return _docx_to_pdf_oneshot(docx_path)
+
+
+def _docx_to_pdf_oneshot(docx_path: str) -> str:
+    """Start a LibreOffice process for a single conversion (isolated job dir + profile)"""
+    job_dir = new_job_dir()
+    # Own profile per job - concurrent soffice processes can't share one
+    profile_uri = Path(job_dir, "profile").as_uri()
     
-    # Try LibreOffice on Windows first
     if platform.system() == 'Windows':
         # Try common LibreOffice paths
-        libreoffice_paths = [
+        candidates = [
             r"C:\Program Files\LibreOffice\program\soffice.exe",
             r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
         ]
-        
-        for soffice in libreoffice_paths:
-            if os.path.exists(soffice):
-                try:
-                    subprocess.run([
-                        soffice,
-                        '--headless',
-                        '--convert-to', 'pdf',
-                        '--outdir', temp_dir,
-                        docx_path
-                    ], check=True, capture_output=True, timeout=30)
-                    
-                    pdf_filename = Path(docx_path).stem + '.pdf'
-                    pdf_path = os.path.join(temp_dir, pdf_filename)
-                    
-                    if os.path.exists(pdf_path):
-                        return pdf_path
-                except Exception as e:
-                    print(f"LibreOffice conversion failed with {soffice}: {e}")
-                    continue
+        candidates = [path for path in candidates if os.path.exists(path)]
     else:
         # Try libreoffice on Unix/Linux/Mac
+        candidates = ['libreoffice']
+    
+    for soffice in candidates:
         try:
             subprocess.run([
-                'libreoffice',
+                soffice,
+                f'-env:UserInstallation={profile_uri}',
                 '--headless',
                 '--convert-to', 'pdf',
-                '--outdir', temp_dir,
+                '--outdir', job_dir,
                 docx_path
-            ], check=True, capture_output=True, timeout=30)
-            
-            pdf_filename = Path(docx_path).stem + '.pdf'
-            pdf_path = os.path.join(temp_dir, pdf_filename)
+            ], check=True, capture_output=True, timeout=settings.CONTRACT_CONVERTER_TIMEOUT_SECONDS)
             
+            pdf_path = os.path.join(job_dir, Path(docx_path).stem + '.pdf')
             if os.path.exists(pdf_path):
                 return pdf_path
         except Exception as e:
-            print(f"LibreOffice conversion failed: {e}")
+            logger.warning("LibreOffice conversion failed with %s: %s", soffice, e)
+            continue
     
+    shutil.rmtree(job_dir, ignore_errors=True)
     raise Exception("LibreOffice not available for PDF conversion. Please install LibreOffice.")
 
 
-def pdf_to_images_base64(pdf_path: str, dpi: int = 200) -> List[str]:
+def cleanup_pdf(pdf_path: str):
+    """Remove a PDF from docx_to_pdf together with its job directory"""
+    get_artifact_store().remove(pdf_path)
+
+
+def pdf_to_png_pages(pdf_path: str, dpi: int = 200) -> List[bytes]:
     """
-    Convert PDF to images and return as base64 strings
+    Rasterize every PDF page to PNG bytes
     
     Args:
         pdf_path: Path to the PDF file
         dpi: DPI for image conversion (higher = better quality but larger)
         
     Returns:
-        List of base64-encoded image strings (one per page)
+        List of PNG images (one per page)
     """
     if not PDF2IMAGE_AVAILABLE:
         raise Exception("pdf2image not installed. Install with: pip install pdf2image")
@@ -124,26 +138,46 @@ def pdf_to_images_base64(pdf_path: str, dpi: int = 200) -> List[str]:
         # Convert PDF to images
         images = convert_from_path(pdf_path, dpi=dpi, **kwargs)
         
-        # Convert images to base64
-        base64_images = []
+        pages = []
         for image in images:
-            # Save to bytes
-            import io
             buffer = io.BytesIO()
             image.save(buffer, format='PNG')
-            buffer.seek(0)
-            
-            # Encode to base64
-            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            base64_images.append(f"data:image/png;base64,{img_base64}")
+            pages.append(buffer.getvalue())
         
-        return base64_images
+        return pages
         
     except Exception as e:
-        print(f"Error converting PDF to images: {e}")
+        logger.warning("Error converting PDF to images: %s", e)
         raise
 
 
+def png_data_url(data: bytes) -> str:
+    """PNG bytes as a data: URL the preview <img> tags can use directly"""
+    return f"data:image/png;base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def pdf_to_images_base64(pdf_path: str, dpi: int = 200) -> List[str]:
+    """
+    Convert PDF to images and return as base64 strings
+    
+    Returns:
+        List of base64-encoded image strings (one per page)
+    """
+    return [png_data_url(page) for page in pdf_to_png_pages(pdf_path, dpi=dpi)]
+
+
+def docx_to_preview_pngs(docx_path: str, dpi: int = 200) -> List[bytes]:
+    """
+    Convert DOCX directly to PNG page images (DOCX -> PDF -> Images)
+    """
+    pdf_path = docx_to_pdf(docx_path)
+    try:
+        return pdf_to_png_pages(pdf_path, dpi=dpi)
+    finally:
+        # Clean up temporary PDF
+        cleanup_pdf(pdf_path)
+
+
 def docx_to_preview_images(docx_path: str, dpi: int = 200) -> List[str]:
     """
     Convert DOCX directly to preview images (DOCX -> PDF -> Images)
@@ -156,20 +190,74 @@ def docx_to_preview_images(docx_path: str, dpi: int = 200) -> List[str]:
         List of base64-encoded image strings
     """
     try:
-        # Convert DOCX to PDF
-        pdf_path = docx_to_pdf(docx_path)
-        
-        # Convert PDF to images
-        images = pdf_to_images_base64(pdf_path, dpi=dpi)
-        
-        # Clean up temporary PDF
-        try:
-            os.remove(pdf_path)
-        except:
-            pass
-        
-        return images
-        
+        return [png_data_url(page) for page in docx_to_preview_pngs(docx_path, dpi=dpi)]
     except Exception as e:
-        print(f"Error in docx_to_preview_images: {e}")
+        logger.warning("Error in docx_to_preview_images: %s", e)
         raise
+
+
+# ------------------------
+# Page-by-page rasterization (streaming preview)
+# ------------------------
+PAGE_FORMATS = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+
+def _poppler_tool(name: str) -> str:
+    poppler_path = find_poppler_path()
+    return os.path.join(poppler_path, name) if poppler_path else name
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF (poppler pdfinfo)"""
+    result = subprocess.run(
+        [_poppler_tool("pdfinfo"), pdf_path],
+        check=True, capture_output=True, text=True, timeout=30
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("Pages:"):
+            return int(line.split(":", 1)[1])
+    raise Exception(f"Could not read page count of {pdf_path}")
+
+
+def rasterize_page(pdf_path: str, page: int, fmt: str = "webp", width: int = 1240, quality: int = 80) -> bytes:
+    """
+    Rasterize a single PDF page with pdftoppm, scaled to `width` pixels
+    
+    Only one page is ever decoded, so memory stays flat however long the contract is.
+    pdftoppm writes PNG/JPEG itself; WebP is re-encoded from PNG with Pillow.
+    """
+    if fmt not in PAGE_FORMATS:
+        raise ValueError(f"Unsupported page format: {fmt}")
+    
+    job_dir = new_job_dir()
+    try:
+        out_root = os.path.join(job_dir, "page")
+        args = [
+            _poppler_tool("pdftoppm"),
+            "-f", str(page), "-l", str(page),
+            "-singlefile",
+            "-scale-to-x", str(width), "-scale-to-y", "-1",
+        ]
+        if fmt == "jpeg":
+            args += ["-jpeg", "-jpegopt", f"quality={quality}"]
+        else:
+            args += ["-png"]
+        subprocess.run(args + [pdf_path, out_root], check=True, capture_output=True, timeout=60)
+        
+        out_path = out_root + (".jpg" if fmt == "jpeg" else ".png")
+        if fmt != "webp":
+            with open(out_path, "rb") as f:
+                return f.read()
+        
+        if Image is None:
+            raise Exception("Pillow not installed - WebP previews unavailable")
+        buffer = io.BytesIO()
+        with Image.open(out_path) as image:
+            image.save(buffer, format="WEBP", quality=quality, method=4)
+        return buffer.getvalue()
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
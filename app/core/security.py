@@ -1,13 +1,17 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import msal
 import httpx
-from typing import Optional, Dict
+import threading
+import time
+from typing import Optional, Dict, Tuple
 
 from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.state_store import Generation
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -49,19 +53,120 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     return payload
 
-# Microsoft Authentication
-    
-    if payload.get("sub") is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
+# ------------------------
+# Resolved user cache
+# ------------------------
+@dataclass(slots=True, frozen=True)
+class AuthenticatedUser:
+    """Snapshot of the users row for the request's JWT subject"""
+    id: int
+    email: str
+    name: Optional[str]
+    role: str
+    is_active: bool
+    microsoft_token: Optional[str]
+
+class _UserCache:
+    """
+    Subject -> AuthenticatedUser with a short TTL, per process
+    Entries are dropped on login, logout and whenever a user's tokens are
+    written. Invalidation also bumps that subject's shared generation, so the
+    other workers drop their copy within STATE_GENERATION_POLL_SECONDS - and
+    only that one.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[AuthenticatedUser, float, int]] = {}  # subject -> (user, expires at, generation)
+        self._generations: Dict[str, Generation] = {}
+        self._lock = threading.Lock()
+
+    def _generation(self, subject: str) -> Generation:
+        with self._lock:
+            generation = self._generations.get(subject)
+            if generation is None:
+                generation = self._generations[subject] = Generation(f"users:{subject}")
+            return generation
+
+    def get(self, subject: str) -> Optional[AuthenticatedUser]:
+        if self.ttl_seconds <= 0:
+            return None
+        generation = self._generation(subject).current()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            user, expires_at, entry_generation = entry
+            if time.monotonic() >= expires_at or entry_generation != generation:
+                del self._entries[subject]
+                return None
+            return user
+
+    def set(self, subject: str, user: AuthenticatedUser):
+        if self.ttl_seconds <= 0:
+            return
+        generation = self._generation(subject).current()
+        with self._lock:
+            self._entries[subject] = (user, time.monotonic() + self.ttl_seconds, generation)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            self._entries.pop(subject, None)
+        if self.ttl_seconds <= 0:
+            return
+        try:
+            self._generation(subject).bump()
+        except Exception:
+            # Other workers still expire their copy within the TTL
+            pass
+
+user_cache = _UserCache(settings.USER_CACHE_TTL_SECONDS)
+
+def invalidate_user(email: str):
+    """Drop a cached user - call after changing the users row (tokens, role, ...)"""
+    user_cache.invalidate(email)
+
+def _load_user(email: str) -> Optional[AuthenticatedUser]:
+    from app.db.session import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        if user is None:
+            return None
+        return AuthenticatedUser(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            role=user.role,
+            is_active=bool(user.is_active),
+            microsoft_token=user.microsoft_token,
         )
-    
-    return payload
+    finally:
+        db.close()
+
+async def get_authenticated_user(current_user: Dict = Depends(get_current_user)) -> AuthenticatedUser:
+    """
+    Dependency resolving the JWT subject to its user
+    Served from the TTL cache (and FastAPI's per-request dependency cache), so most
+    authenticated requests never query the users table.
+    """
+    subject = current_user["sub"]
+    user = user_cache.get(subject)
+    record_cache_lookup("users", "miss" if user is None else "hit")
+    if user is None:
+        user = _load_user(subject)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        user_cache.set(subject, user)
+    return user
 
 # Microsoft Authentication
 def get_msal_app():
     """Create MSAL confidential client application"""
+    import msal  # Lazy - only needed for the Microsoft login flow
+
     return msal.ConfidentialClientApplication(
         settings.AZURE_CLIENT_ID,
         authority=settings.authority,
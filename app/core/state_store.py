@@ -0,0 +1,289 @@
+"""
+Shared state store for multi-worker deployments
+Short-lived state that must be visible to every uvicorn worker - OAuth login
+states, cache generations - lives behind one small interface with TTL expiry.
+The "db" backend uses the shared_state table; "memory" keeps everything in the
+process and is only correct with a single worker (tests, local dev).
+
+    store = get_state_store()
+    store.put("oauth_state", state, True, ttl_seconds=600)
+    store.take("oauth_state", state)         # value once, then None - on any worker
+
+Generation turns the store into a cross-worker invalidation signal: bump() on
+one worker and every other worker sees the new number within
+STATE_GENERATION_POLL_SECONDS, so process-local caches know to drop entries.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.state import SharedState
+
+logger = logging.getLogger(__name__)
+
+GENERATION_NAMESPACE = "generation"
+
+
+class StateStore:
+    """
+    Namespaced key/value store with per-entry TTL
+    Values must be JSON-serializable. Counters (incr) never expire.
+    """
+
+    def put(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        raise NotImplementedError
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def values(self, namespace: str) -> Dict[str, Any]:
+        """Every live entry of a namespace, by key"""
+        raise NotImplementedError
+
+    def take(self, namespace: str, key: str) -> Optional[Any]:
+        """Get and delete in one step - when two workers race, only one gets the value"""
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def incr(self, namespace: str, key: str) -> int:
+        """Increment a counter (created at 0) and return its new value"""
+        raise NotImplementedError
+
+    def counter(self, namespace: str, key: str) -> int:
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        """Remove expired entries; returns how many"""
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    """In-process backend - every worker has its own, so only use it with one worker"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Any, Optional[float]]] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, entry_key: Tuple[str, str]) -> Optional[Tuple[Any, Optional[float]]]:
+        entry = self._entries.get(entry_key)
+        if entry is not None and entry[1] is not None and time.monotonic() >= entry[1]:
+            del self._entries[entry_key]
+            return None
+        return entry
+
+    def put(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._entries[(namespace, key)] = (value, expires_at)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live((namespace, key))
+            return entry[0] if entry is not None else None
+
+    def values(self, namespace: str) -> Dict[str, Any]:
+        with self._lock:
+            keys = [entry_key for entry_key in self._entries if entry_key[0] == namespace]
+            live = {entry_key[1]: self._live(entry_key) for entry_key in keys}
+            return {key: entry[0] for key, entry in live.items() if entry is not None}
+
+    def take(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live((namespace, key))
+            if entry is None:
+                return None
+            del self._entries[(namespace, key)]
+            return entry[0]
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def incr(self, namespace: str, key: str) -> int:
+        with self._lock:
+            value = self._counters.get((namespace, key), 0) + 1
+            self._counters[(namespace, key)] = value
+            return value
+
+    def counter(self, namespace: str, key: str) -> int:
+        with self._lock:
+            return self._counters.get((namespace, key), 0)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expires_at) in self._entries.items() if expires_at is not None and now >= expires_at]
+            for entry_key in expired:
+                del self._entries[entry_key]
+        return len(expired)
+
+
+class DbStateStore(StateStore):
+    """shared_state table backend - what every API worker and the job worker see"""
+
+    @staticmethod
+    def _query(db, namespace: str, key: str):
+        return db.query(SharedState).filter(SharedState.namespace == namespace, SharedState.key == key)
+
+    @staticmethod
+    def _not_expired():
+        return or_(SharedState.expires_at.is_(None), SharedState.expires_at > datetime.utcnow())
+
+    def put(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.merge(SharedState(
+                namespace=namespace,
+                key=key,
+                value=value,
+                expires_at=now + timedelta(seconds=ttl_seconds) if ttl_seconds else None,
+                updated_at=now
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        db = SessionLocal()
+        try:
+            row = self._query(db, namespace, key).filter(self._not_expired()).first()
+            return row.value if row is not None else None
+        finally:
+            db.close()
+
+    def values(self, namespace: str) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            rows = db.query(SharedState).filter(SharedState.namespace == namespace, self._not_expired()).all()
+            return {row.key: row.value for row in rows}
+        finally:
+            db.close()
+
+    def take(self, namespace: str, key: str) -> Optional[Any]:
+        db = SessionLocal()
+        try:
+            row = self._query(db, namespace, key).filter(self._not_expired()).first()
+            if row is None:
+                return None
+            value = row.value
+            # The conditional DELETE is atomic - a worker racing us deletes nothing
+            deleted = self._query(db, namespace, key).filter(
+                SharedState.version == row.version
+            ).delete(synchronize_session=False)
+            db.commit()
+            return value if deleted == 1 else None
+        finally:
+            db.close()
+
+    def delete(self, namespace: str, key: str):
+        db = SessionLocal()
+        try:
+            self._query(db, namespace, key).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def incr(self, namespace: str, key: str) -> int:
+        db = SessionLocal()
+        try:
+            if self._query(db, namespace, key).first() is None:
+                try:
+                    db.add(SharedState(namespace=namespace, key=key, version=0, updated_at=datetime.utcnow()))
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()  # Another worker created it first
+
+            self._query(db, namespace, key).update({
+                SharedState.version: SharedState.version + 1,
+                SharedState.updated_at: datetime.utcnow()
+            }, synchronize_session=False)
+            value = self._query(db, namespace, key).with_entities(SharedState.version).scalar()
+            db.commit()
+            return value
+        finally:
+            db.close()
+
+    def counter(self, namespace: str, key: str) -> int:
+        db = SessionLocal()
+        try:
+            return self._query(db, namespace, key).with_entities(SharedState.version).scalar() or 0
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        db = SessionLocal()
+        try:
+            deleted = db.query(SharedState).filter(
+                SharedState.expires_at.isnot(None),
+                SharedState.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+class Generation:
+    """
+    Cross-worker invalidation counter
+    current() reads the shared value at most every poll_seconds; bump() is seen
+    immediately by this worker and within poll_seconds by all others.
+    """
+
+    def __init__(self, name: str, poll_seconds: Optional[float] = None):
+        self.name = name
+        self.poll_seconds = settings.STATE_GENERATION_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self._value = 0
+        self._checked_at: Optional[float] = None
+
+    def current(self) -> int:
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.poll_seconds:
+            try:
+                self._value = get_state_store().counter(GENERATION_NAMESPACE, self.name)
+            except Exception as e:
+                logger.warning(f"⚠️  Generation read failed for {self.name}: {e}")
+            self._checked_at = now
+        return self._value
+
+    def bump(self) -> int:
+        self._value = get_state_store().incr(GENERATION_NAMESPACE, self.name)
+        self._checked_at = time.monotonic()
+        return self._value
+
+
+_state_store: Optional[StateStore] = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Get or create the configured store (STATE_STORE_BACKEND)"""
+    global _state_store
+    with _state_store_lock:
+        if _state_store is None:
+            backend = settings.STATE_STORE_BACKEND
+            if backend == "memory":
+                _state_store = MemoryStateStore()
+            elif backend == "db":
+                _state_store = DbStateStore()
+            else:
+                raise ValueError(f"Unknown STATE_STORE_BACKEND: {backend!r} (expected 'db' or 'memory')")
+        return _state_store
+
+
+def set_state_store(store: Optional[StateStore]):
+    """Swap the store (tests use MemoryStateStore); None re-reads the setting on next use"""
+    global _state_store
+    with _state_store_lock:
+        _state_store = store
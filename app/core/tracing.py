@@ -0,0 +1,282 @@
+"""
+Lightweight per-request span tracing
+A request is traced when it is sampled (TRACE_SAMPLE_RATE) or asks for
+?debug_timing=1. Spans nest through contextvars, so tasks started with
+asyncio.gather attach to the span that started them. Outside a traced request
+span() costs one contextvar lookup.
+
+    with span("enrich_song", song_id=song.id):
+        ...
+    timing_summary()   # critical path + slowest upstream calls of the current request
+
+Finished traces can be exported in OTLP/JSON: appended to a file (one
+ExportTraceServiceRequest per line - readable by the collector's otlpjsonfile
+receiver) or POSTed to an OTLP/HTTP endpoint. Export runs on a background thread.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_SPANS_PER_TRACE = 5000
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+
+
+class Trace:
+    """All spans of one request"""
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ("name", "trace", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace: Trace, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    def duration_ms(self, now_ns: Optional[int] = None) -> float:
+        return ((self.end_ns or now_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def start_trace(name: str, force: bool = False, **attributes: Any) -> Optional[Span]:
+    """Open the root span of a request if it is sampled (or force=True); None = not traced"""
+    if not force and not (settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE):
+        return None
+    trace = Trace()
+    root = Span(name, trace, None, SPAN_KIND_SERVER, attributes)
+    trace.spans.append(root)
+    _current_span.set(root)
+    return root
+
+
+def finish_trace(root: Optional[Span]):
+    """Close the root span and hand the trace to the exporter"""
+    if root is None:
+        return
+    root.end()
+    if settings.TRACE_EXPORT:
+        _get_exporter().submit(root.trace)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+    """Child span of the current one; yields None (and records nothing) outside a traced request"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    trace = parent.trace
+    if len(trace.spans) >= MAX_SPANS_PER_TRACE:
+        trace.dropped += 1
+        yield None
+        return
+    current = Span(name, trace, parent.span_id, kind, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Run a coroutine function inside span(name)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**attributes: Any):
+    """Add attributes to the current span (no-op outside a traced request)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+# ------------------------
+# Debug timing summary
+# ------------------------
+def _span_entry(current: Span, root_start_ns: int, now_ns: int) -> Dict[str, Any]:
+    entry = {
+        "name": current.name,
+        "start_ms": round((current.start_ns - root_start_ns) / 1e6, 1),
+        "duration_ms": round(current.duration_ms(now_ns), 1),
+    }
+    if current.attributes:
+        entry["attributes"] = current.attributes
+    if current.error:
+        entry["error"] = current.error
+    return entry
+
+
+def timing_summary(slowest: int = 10) -> Optional[Dict[str, Any]]:
+    """
+    Timing of the current request so far
+    critical_path follows, from the root down, the child that finished last -
+    the chain of spans that actually determined the response time.
+    """
+    current = _current_span.get()
+    if current is None:
+        return None
+    trace = current.trace
+    root = trace.spans[0]
+    now_ns = time.time_ns()
+
+    children: Dict[str, List[Span]] = {}
+    for item in trace.spans[1:]:
+        children.setdefault(item.parent_id, []).append(item)
+
+    path = [root]
+    while children.get(path[-1].span_id):
+        path.append(max(children[path[-1].span_id], key=lambda s: s.end_ns or now_ns))
+
+    upstream = [item for item in trace.spans if item.kind == SPAN_KIND_CLIENT]
+    by_operation: Dict[str, Dict[str, float]] = {}
+    for item in upstream:
+        stats = by_operation.setdefault(item.name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        duration = item.duration_ms(now_ns)
+        stats["calls"] += 1
+        stats["total_ms"] = round(stats["total_ms"] + duration, 1)
+        stats["max_ms"] = round(max(stats["max_ms"], duration), 1)
+
+    return {
+        "trace_id": trace.trace_id,
+        "total_ms": round(root.duration_ms(now_ns), 1),
+        "spans": len(trace.spans),
+        "dropped_spans": trace.dropped,
+        "critical_path": [_span_entry(item, root.start_ns, now_ns) for item in path],
+        "slowest_upstream": [
+            _span_entry(item, root.start_ns, now_ns)
+            for item in sorted(upstream, key=lambda s: s.duration_ms(now_ns), reverse=True)[:slowest]
+        ],
+        "upstream_by_operation": by_operation,
+    }
+
+
+# ------------------------
+# OTLP/JSON export
+# ------------------------
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(item: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": item.trace.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": item.kind,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns or item.start_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+        "status": {"code": 2, "message": item.error} if item.error else {"code": 0},
+    }
+    if item.parent_id:
+        data["parentSpanId"] = item.parent_id
+    return data
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """One trace as an OTLP ExportTraceServiceRequest (JSON encoding)"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": settings.TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [_otlp_span(item) for item in trace.spans],
+            }],
+        }]
+    }
+
+
+class TraceExporter:
+    """Background thread writing finished traces to a file or an OTLP/HTTP endpoint"""
+
+    def __init__(self, mode: str, path: str, endpoint: str):
+        self.mode = mode
+        self.path = path
+        self.endpoint = endpoint
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Trace):
+        self._queue.put(trace)
+
+    def _run(self):
+        client = None
+        if self.mode == "otlp":
+            import httpx
+            client = httpx.Client(timeout=5.0)
+        while True:
+            trace = self._queue.get()
+            try:
+                payload = to_otlp(trace)
+                if client is not None:
+                    client.post(self.endpoint, json=payload)
+                else:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(payload, default=str) + "\n")
+            except Exception as e:
+                logger.warning("⚠️  Trace export failed: %s", e)
+
+
+_exporter: Optional[TraceExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _get_exporter() -> TraceExporter:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            if settings.TRACE_EXPORT not in ("file", "otlp"):
+                raise ValueError(f"Unknown TRACE_EXPORT: {settings.TRACE_EXPORT!r} (expected 'file' or 'otlp')")
+            _exporter = TraceExporter(settings.TRACE_EXPORT, settings.TRACE_EXPORT_PATH, settings.TRACE_OTLP_ENDPOINT)
+        return _exporter
@@ -0,0 +1,53 @@
+"""
+Import-time profile of the API app
+Shows which modules make worker cold start slow.
+
+    python -m app.import_profile                 # profile "import app.main"
+    python -m app.import_profile app.worker --top 40
+
+Runs the import in a fresh interpreter with python -X importtime and prints the
+slowest modules by cumulative time.
+"""
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+def profile_imports(module: str = "app.main") -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every module imported by `import <module>`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|", 2))
+        if not self_us.isdigit():
+            continue  # Header line
+        rows.append((name, int(self_us), int(cumulative_us)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile module import time")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to show")
+    args = parser.parse_args()
+
+    rows = profile_imports(args.module)
+    total = max((cumulative for _, _, cumulative in rows), default=0)
+
+    print(f"import {args.module}: {total / 1e6:.2f}s total, {len(rows)} modules")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1e3:>10.1f}ms {self_us / 1e3:>8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Data ingestion module
+Run with: python -m app.ingest --help
+"""
+from .pipeline import IngestionPipeline, find_resumable_run, SOURCES
+
+__all__ = [
+    "IngestionPipeline",
+    "find_resumable_run",
+    "SOURCES",
+]
@@ -0,0 +1,88 @@
+"""
+Unified ingestion CLI
+
+    python -m app.ingest                      # all sources, yesterday's charts
+    python -m app.ingest --sources tiktok --history-days 90
+    python -m app.ingest --resume             # continue the last unfinished run
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.log_config import configure_logging
+from app.db.session import SessionLocal
+from app.ingest.pipeline import SOURCES, IngestionPipeline, find_resumable_run
+
+logger = logging.getLogger("app.ingest")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.ingest", description="Ingest chart data into the discovery DB")
+    parser.add_argument("--sources", default=",".join(SOURCES), help=f"Comma-separated sources ({', '.join(SOURCES)})")
+    parser.add_argument("--country", default="global", help="Country for Spotify viral charts (default: global)")
+    parser.add_argument("--date", dest="chart_date", default=None, help="Chart date YYYY-MM-DD (default: yesterday)")
+    parser.add_argument("--history-days", type=int, default=30, help="Days of Spotify stream history per track (0 to skip)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent workers per stage")
+    parser.add_argument("--queue-size", type=int, default=100, help="Bound of each inter-stage queue")
+    parser.add_argument("--checkpoint-every", type=int, default=25, help="Commit + checkpoint after N written tracks")
+    parser.add_argument("--include-majors", action="store_true", help="Keep major-label tracks")
+    parser.add_argument("--resume", action="store_true", help="Resume the latest unfinished ingestion run")
+    parser.add_argument("--no-score", action="store_true", help="Skip trending/evergreen scoring afterwards")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    db = SessionLocal()
+
+    try:
+        resume_run = None
+        if args.resume:
+            resume_run = find_resumable_run(db)
+            if resume_run is None:
+                logger.info("No unfinished ingestion run to resume - starting a new one")
+
+        pipeline = IngestionPipeline(
+            db,
+            sources=[s.strip() for s in args.sources.split(",") if s.strip()],
+            country=args.country,
+            chart_date=args.chart_date,
+            history_days=args.history_days,
+            workers=args.workers,
+            queue_size=args.queue_size,
+            checkpoint_every=args.checkpoint_every,
+            include_majors=args.include_majors,
+            resume_run=resume_run,
+        )
+        run = await pipeline.run()
+
+        print("\n" + "=" * 60)
+        print(f"INGESTION SUMMARY (run {run.id})")
+        print("=" * 60)
+        for key, value in pipeline.stats.items():
+            print(f"   {key}: {value}")
+
+        if not args.no_score and pipeline.written_ids:
+            # Imported lazily - scoring pulls in numpy/pandas
+            from app.core.discovery.selectors import TrendingSelector, EvergreenSelector
+
+            track_ids = sorted(pipeline.written_ids)
+            trending_run = TrendingSelector.run_discovery_batch(db, track_ids)
+            print(f"✅ Trending scored: {trending_run.tracks_updated} tracks")
+            evergreen_run = EvergreenSelector.run_discovery_batch(db, track_ids)
+            print(f"✅ Evergreen scored: {evergreen_run.tracks_updated} tracks")
+        return 0
+
+    except Exception as e:
+        logger.exception(f"❌ Ingestion failed: {e}")
+        print("Resume with: python -m app.ingest --resume")
+        return 1
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,441 @@
+"""
+Concurrent ingestion pipeline
+chart fetch -> label check -> history fetch -> DB write
+
+Stages run concurrently and are connected by bounded queues, so a slow
+stage applies backpressure upstream instead of buffering every track.
+All upstream calls go through the shared rate limiters in
+app.core.discovery.rate_limit instead of per-script asyncio.sleep pacing.
+Progress is checkpointed on the DiscoveryRun row so an interrupted run
+can be resumed without re-processing tracks that were already written.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.discovery.chartex_client import get_chartex_client
+from app.core.discovery.chartex_records import parse_stats
+from app.core.discovery.chartmetric import get_chartmetric_client
+from app.core.discovery.label_detection import LabelDetector
+from app.core.discovery.rate_limit import get_rate_limiter
+from app.models.discovery import DiscoveryRun, Track, TrackMetric
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("spotify_viral", "tiktok")
+
+# Queue sentinel marking the end of a stage's output
+_DONE = object()
+
+
+def _default_chart_date() -> str:
+    return (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _track_id(track_data: Dict[str, Any]) -> Optional[str]:
+    track_id = track_data.get("id") or track_data.get("cm_track")
+    return str(track_id) if track_id else None
+
+
+def _chart_label(track_data: Dict[str, Any]) -> Optional[str]:
+    """Label from chart row - album_label (list in TikTok charts), then label/record_label"""
+    album_labels = track_data.get("album_label")
+    if album_labels and isinstance(album_labels, list):
+        return album_labels[0]
+    return track_data.get("label") or track_data.get("record_label")
+
+
+def _extract_chart_rows(obj: Any) -> List[Dict[str, Any]]:
+    """Chartmetric chart 'obj' is either a list of rows or a dict wrapping one"""
+    if not obj:
+        return []
+    if isinstance(obj, list):
+        return obj
+    if isinstance(obj, dict):
+        for key in ("tracks", "data", "items"):
+            if isinstance(obj.get(key), list):
+                return obj[key]
+        return [obj]
+    return []
+
+
+class IngestionPipeline:
+    """
+    Pipelined ingestion run backed by a DiscoveryRun checkpoint
+
+    Usage:
+        pipeline = IngestionPipeline(db, sources=["tiktok"], history_days=30)
+        run = await pipeline.run()
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        sources: Iterable[str] = SOURCES,
+        country: str = "global",
+        chart_date: Optional[str] = None,
+        history_days: int = 30,
+        workers: int = 4,
+        queue_size: int = 100,
+        checkpoint_every: int = 25,
+        include_majors: bool = False,
+        resume_run: Optional[DiscoveryRun] = None,
+    ):
+        self.db = db
+        self.workers = workers
+        self.queue_size = queue_size
+        self.checkpoint_every = checkpoint_every
+        self.include_majors = include_majors
+
+        if resume_run is not None:
+            # Resume with the original run's parameters so the same charts are re-read
+            config = resume_run.config or {}
+            self.sources = list(config.get("sources", sources))
+            self.country = config.get("country", country)
+            self.chart_date = config.get("chart_date") or _default_chart_date()
+            self.history_days = config.get("history_days", history_days)
+            self.written_ids: Set[str] = set(config.get("checkpoint", {}).get("written_ids", []))
+            self.run_record = resume_run
+        else:
+            self.sources = list(sources)
+            self.country = country
+            self.chart_date = chart_date or _default_chart_date()
+            self.history_days = history_days
+            self.written_ids = set()
+            self.run_record = None
+
+        unknown = set(self.sources) - set(SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown sources: {sorted(unknown)}. Valid: {list(SOURCES)}")
+
+        self.cm_client = get_chartmetric_client()
+        self.chartex_client = get_chartex_client()
+
+        self.stats = {
+            "fetched": 0,
+            "skipped_checkpointed": 0,
+            "skipped_duplicate": 0,
+            "skipped_no_label": 0,
+            "skipped_major": 0,
+            "tracks_new": 0,
+            "tracks_updated": 0,
+        }
+        self._seen_ids: Set[str] = set()
+        # Written in the open transaction, not yet part of the checkpoint (nor of the stats)
+        self._pending_ids: List[str] = []
+        self._pending_new = 0
+        self._pending_updated = 0
+        # Every session call after _start_run goes through this one thread, in order
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    # ------------------------
+    # Run bookkeeping
+    # ------------------------
+    def _config(self) -> Dict[str, Any]:
+        return {
+            "sources": self.sources,
+            "country": self.country,
+            "chart_date": self.chart_date,
+            "history_days": self.history_days,
+            "checkpoint": {"written_ids": sorted(self.written_ids)},
+        }
+
+    def _start_run(self) -> DiscoveryRun:
+        if self.run_record is None:
+            self.run_record = DiscoveryRun(
+                run_type="ingestion",
+                started_at=datetime.utcnow(),
+                status="running",
+            )
+            self.db.add(self.run_record)
+        else:
+            self.run_record.status = "running"
+            self.run_record.error_message = None
+        self.run_record.config = self._config()
+        self.db.commit()
+        return self.run_record
+
+    def _checkpoint(self):
+        """Commit pending rows together with the run progress; they count once the commit succeeded"""
+        run = self.run_record
+        written_ids = self.written_ids | set(self._pending_ids)
+        # JSON columns are not mutation-tracked - assign a fresh dict
+        run.config = {**self._config(), "checkpoint": {"written_ids": sorted(written_ids)}}
+        run.tracks_processed = len(written_ids)
+        run.tracks_new = self.stats["tracks_new"] + self._pending_new
+        run.tracks_updated = self.stats["tracks_updated"] + self._pending_updated
+        self.db.commit()
+        self.written_ids = written_ids
+        self.stats["tracks_new"] += self._pending_new
+        self.stats["tracks_updated"] += self._pending_updated
+        self._discard_pending()
+
+    def _discard_pending(self):
+        self._pending_ids = []
+        self._pending_new = 0
+        self._pending_updated = 0
+
+    # ------------------------
+    # Stage helpers
+    # ------------------------
+    async def _run_workers(self, worker, in_q: asyncio.Queue, out_q: Optional[asyncio.Queue], count: int):
+        """
+        Run `count` copies of a worker over in_q and close out_q when all are done.
+        The single upstream sentinel is re-queued so every sibling sees it.
+        """
+        async def loop():
+            while True:
+                item = await in_q.get()
+                if item is _DONE:
+                    await in_q.put(_DONE)
+                    return
+                result = await worker(item)
+                if result is not None and out_q is not None:
+                    await out_q.put(result)
+
+        await asyncio.gather(*(loop() for _ in range(count)))
+        if out_q is not None:
+            await out_q.put(_DONE)
+
+    async def _in_writer(self, fn, *args):
+        """Run a blocking DB step on the writer thread, off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    async def _chartmetric_get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        async with get_rate_limiter("chartmetric"):
+            return await self.cm_client.get(endpoint, params=params)
+
+    # ------------------------
+    # Stage 1: chart fetch
+    # ------------------------
+    async def _fetch_source(self, source: str) -> List[Dict[str, Any]]:
+        try:
+            if source == "spotify_viral":
+                data = await self._chartmetric_get(f"/charts/spotify/viral/{self.country}/{self.chart_date}")
+            else:
+                data = await self._chartmetric_get("/charts/tiktok/tracks", params={"date": self.chart_date})
+        except Exception as e:
+            logger.warning(f"⚠️  Chart fetch failed for {source}: {e}")
+            return []
+
+        rows = _extract_chart_rows(data.get("obj"))
+        logger.info(f"📊 {source}: {len(rows)} chart rows")
+        return [{**row, "source": source} for row in rows]
+
+    async def _stage_fetch_charts(self, out_q: asyncio.Queue):
+        results = await asyncio.gather(*(self._fetch_source(source) for source in self.sources))
+        for rows in results:
+            for row in rows:
+                self.stats["fetched"] += 1
+                await out_q.put(row)
+        await out_q.put(_DONE)
+
+    # ------------------------
+    # Stage 2: label check
+    # ------------------------
+    async def _check_label(self, track_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        track_id = _track_id(track_data)
+        if not track_id:
+            return None
+        if track_id in self.written_ids:
+            self.stats["skipped_checkpointed"] += 1
+            return None
+        # Same track can appear on several charts - first one wins
+        if track_id in self._seen_ids:
+            self.stats["skipped_duplicate"] += 1
+            return None
+        self._seen_ids.add(track_id)
+
+        label = _chart_label(track_data)
+        details: Dict[str, Any] = {}
+        if not label:
+            try:
+                details = (await self._chartmetric_get(f"/track/{track_id}")).get("obj") or {}
+            except Exception as e:
+                logger.debug(f"Could not fetch details for track {track_id}: {e}")
+            label = details.get("label") or details.get("record_label")
+
+        if not label:
+            self.stats["skipped_no_label"] += 1
+            return None
+
+        if not self.include_majors and not LabelDetector.should_include_for_discovery(label):
+            self.stats["skipped_major"] += 1
+            return None
+
+        artist_name = track_data.get("artist_names", track_data.get("artist_name", "Unknown"))
+        if isinstance(artist_name, list):
+            artist_name = ", ".join(artist_name)
+
+        return {
+            "track_id": track_id,
+            "title": track_data.get("name") or track_data.get("track_name", "Unknown"),
+            "artist_name": artist_name,
+            "label": label,
+            "spotify_id": track_data.get("spotify_id") or details.get("spotify_id"),
+            "isrc": track_data.get("isrc") or details.get("isrc"),
+            "source": track_data.get("source"),
+            "chart": track_data,
+            "history": [],
+        }
+
+    # ------------------------
+    # Stage 3: history fetch
+    # ------------------------
+    async def _fetch_history(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        spotify_id = item.get("spotify_id")
+        if not spotify_id or not self.history_days:
+            return item
+
+        try:
+            async with get_rate_limiter("chartex"):
+                response = await self.chartex_client.get_song_stats(
+                    platform="spotify",
+                    platform_id=spotify_id,
+                    metric="spotify-streams",
+                    limit_by_latest_days=self.history_days,
+                    mode="daily",
+                )
+        except Exception as e:
+            logger.debug(f"History fetch failed for {spotify_id}: {e}")
+            return item
+
+        item["history"] = [(point.date, point.value) for point in parse_stats(response).points]
+        return item
+
+    # ------------------------
+    # Stage 4: DB write (single writer, on a worker thread - see _stage_write)
+    # ------------------------
+    def _write_item(self, item: Dict[str, Any]):
+        db = self.db
+        track_id = item["track_id"]
+        chart = item["chart"]
+
+        track = db.query(Track).filter(Track.id == track_id).first()
+        if track is None:
+            track = Track(
+                id=track_id,
+                title=item["title"],
+                artist_name=item["artist_name"],
+                spotify_id=item["spotify_id"],
+                isrc=item["isrc"],
+            )
+            db.add(track)
+            db.flush()
+            self._pending_new += 1
+        else:
+            if item["spotify_id"] and not track.spotify_id:
+                track.spotify_id = item["spotify_id"]
+            if item["isrc"] and not track.isrc:
+                track.isrc = item["isrc"]
+            self._pending_updated += 1
+
+        # Chart snapshot
+        position = chart.get("position") or chart.get("rank")
+        is_tiktok = item["source"] == "tiktok"
+        db.add(TrackMetric(
+            track_id=track_id,
+            timestamp=datetime.utcnow(),
+            spotify_streams=chart.get("streams"),
+            spotify_chart_position=None if is_tiktok else position,
+            spotify_chart_country=None if is_tiktok else self.country,
+            tiktok_posts=chart.get("posts"),
+            tiktok_views=chart.get("views"),
+            tiktok_chart_position=position if is_tiktok else None,
+        ))
+
+        # Daily history - skip days already stored for this track (metrics are append-only)
+        history = item["history"]
+        if history:
+            days = []
+            for date_str, value in history:
+                try:
+                    days.append((datetime.strptime(date_str[:10], "%Y-%m-%d"), value))
+                except (TypeError, ValueError):
+                    continue
+            if days:
+                earliest = min(day for day, _ in days)
+                existing = {
+                    row[0] for row in db.query(TrackMetric.timestamp).filter(
+                        TrackMetric.track_id == track_id,
+                        TrackMetric.timestamp >= earliest,
+                    )
+                }
+                for day, value in days:
+                    if day not in existing:
+                        db.add(TrackMetric(track_id=track_id, timestamp=day, spotify_streams=value))
+
+        self._pending_ids.append(track_id)
+
+    async def _stage_write(self, in_q: asyncio.Queue):
+        # Blocking SQLAlchemy calls run on the writer thread, so the fetch stages keep going
+        pending = 0
+        while True:
+            item = await in_q.get()
+            if item is _DONE:
+                break
+            await self._in_writer(self._write_item, item)
+            pending += 1
+            if pending >= self.checkpoint_every:
+                await self._in_writer(self._checkpoint)
+                pending = 0
+        await self._in_writer(self._checkpoint)
+
+    def _record_failure(self, error: BaseException):
+        # Keep everything written so far; the run can be resumed from its checkpoint
+        self.db.rollback()
+        self._discard_pending()
+        self.run_record.status = "failed"
+        self.run_record.error_message = str(error) or error.__class__.__name__
+        self._checkpoint()
+
+    def _record_completion(self):
+        self.run_record.status = "completed"
+        self.run_record.completed_at = datetime.utcnow()
+        self._checkpoint()
+
+    # ------------------------
+    # Orchestration
+    # ------------------------
+    async def run(self) -> DiscoveryRun:
+        """Run all stages concurrently and return the finished DiscoveryRun"""
+        run = self._start_run()
+        logger.info(
+            f"🚀 Ingestion run {run.id}: sources={self.sources}, date={self.chart_date}, "
+            f"resumed_with={len(self.written_ids)} checkpointed tracks"
+        )
+
+        charts_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        labelled_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        enriched_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        try:
+            try:
+                await asyncio.gather(
+                    self._stage_fetch_charts(charts_q),
+                    self._run_workers(self._check_label, charts_q, labelled_q, self.workers),
+                    self._run_workers(self._fetch_history, labelled_q, enriched_q, self.workers),
+                    self._stage_write(enriched_q),
+                )
+            except BaseException as e:
+                # Queued behind a write that may still be running on the writer thread
+                await self._in_writer(self._record_failure, e)
+                raise
+            await self._in_writer(self._record_completion)
+        finally:
+            self._writer.shutdown(wait=False)  # Stages still winding down can't write any more
+        logger.info(f"✅ Ingestion run {run.id} completed: {self.stats}")
+        return run
+
+
+def find_resumable_run(db: Session) -> Optional[DiscoveryRun]:
+    """Latest ingestion run that did not complete"""
+    return db.query(DiscoveryRun).filter(
+        DiscoveryRun.run_type == "ingestion",
+        DiscoveryRun.status != "completed",
+    ).order_by(DiscoveryRun.started_at.desc()).first()
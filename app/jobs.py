@@ -0,0 +1,335 @@
+"""
+Scheduled background jobs
+Pre-warm the trending cache and rescore tracks so dashboards are warm before anyone logs in.
+
+Jobs run in the dedicated worker process (python -m app.worker), never in API
+workers. A DB-backed JobLock makes sure each job runs once even if several
+worker processes are scheduled at the same time.
+
+Every job run is recorded as a DiscoveryRun row (run_type "job:<name>") with its
+duration and error, which is what /api/discovery/jobs/status reports.
+"""
+import asyncio
+import functools
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import BaseScheduler
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.discovery import DiscoveryRun, JobLock, Track
+
+logger = logging.getLogger(__name__)
+
+# Sort modes offered by the discover dashboard
+TIKTOK_SORT_MODES = [
+    "tiktok_last_24_hours_video_count",
+    "tiktok_last_7_days_video_count",
+    "tiktok_last_24_hours_video_percentage",
+]
+SPOTIFY_SORT_MODES = ["daily_streams", "weekly_streams", "total_streams"]
+DEFAULT_TIKTOK_METRIC = "tiktok_last_24_hours_video_count"
+
+
+def _split(value: str) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+_LOCK_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_job_lock(db: Session, name: str, ttl_seconds: int, owner: str = _LOCK_OWNER) -> bool:
+    """
+    Take the named lock if it is free or expired
+    The conditional UPDATE is atomic, so only one process can win.
+    """
+    if db.query(JobLock).filter(JobLock.name == name).first() is None:
+        try:
+            db.add(JobLock(name=name))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another process created it first
+
+    now = datetime.utcnow()
+    updated = db.query(JobLock).filter(
+        JobLock.name == name,
+        or_(JobLock.locked_until.is_(None), JobLock.locked_until < now)
+    ).update({
+        JobLock.owner: owner,
+        JobLock.acquired_at: now,
+        JobLock.locked_until: now + timedelta(seconds=ttl_seconds)
+    }, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def release_job_lock(db: Session, name: str, owner: str = _LOCK_OWNER):
+    db.query(JobLock).filter(
+        JobLock.name == name,
+        JobLock.owner == owner
+    ).update({JobLock.locked_until: None}, synchronize_session=False)
+    db.commit()
+
+
+def tracked_job(name: str, lock_ttl_seconds: int = 3600):
+    """
+    Run a job under its DB lock and record duration, status and errors as a DiscoveryRun row
+    If another process holds the lock the run is skipped. lock_ttl_seconds should exceed
+    the job's worst-case duration.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            db = SessionLocal()
+            if not acquire_job_lock(db, name, lock_ttl_seconds):
+                logger.info(f"⏭️  Job {name} already running elsewhere - skipped")
+                db.close()
+                return
+
+            run = DiscoveryRun(run_type=f"job:{name}", started_at=datetime.utcnow(), status="running")
+            db.add(run)
+            db.commit()
+
+            logger.info(f"🔄 Job {name} started")
+            start = time.perf_counter()
+            result: Dict[str, Any] = {}
+            try:
+                result = fn(*args, **kwargs) or {}
+                run.status = "completed"
+            except Exception as e:
+                run.status = "failed"
+                run.error_message = str(e)
+                logger.exception(f"❌ Job {name} failed: {e}")
+            finally:
+                duration = time.perf_counter() - start
+                run.completed_at = datetime.utcnow()
+                run.config = {"duration_seconds": round(duration, 3), **result}
+                db.commit()
+                release_job_lock(db, name)
+                db.close()
+                logger.info(f"{'✅' if run.status == 'completed' else '❌'} Job {name} {run.status} in {duration:.1f}s")
+        return wrapper
+    return decorator
+
+
+def prewarm_combinations() -> List[Dict[str, Any]]:
+    """/songs parameter sets the dashboard requests by default, for every configured country and label type"""
+    from app.api.discovery.tiktok_trending import trending_params
+
+    combos = []
+    for country in [None] + _split(settings.PREWARM_COUNTRIES):
+        for label_type in [None] + _split(settings.PREWARM_LABEL_TYPES):
+            for metric in TIKTOK_SORT_MODES:
+                combos.append(trending_params(
+                    sort_by=metric,
+                    country_code=country,
+                    label_type=label_type
+                ))
+            for spotify_metric in SPOTIFY_SORT_MODES:
+                combos.append(trending_params(
+                    sort_by="spotify_streams",
+                    tiktok_metric=DEFAULT_TIKTOK_METRIC,
+                    spotify_sort_metric=spotify_metric,
+                    country_code=country,
+                    label_type=label_type,
+                    include_spotify_metadata=True
+                ))
+    return combos
+
+
+async def _prewarm(combos: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from app.api.discovery import tiktok_trending
+
+    semaphore = asyncio.Semaphore(max(1, settings.PREWARM_CONCURRENCY))
+    warmed = 0
+    failed = 0
+
+    async def warm(params: Dict[str, Any]):
+        nonlocal warmed, failed
+        async with semaphore:
+            try:
+                data = await tiktok_trending.build_trending_response(**params)
+            except Exception as e:
+                failed += 1
+                logger.warning(f"⚠️  Pre-warm failed for {params}: {e}")
+                return
+            if data["songs"]:
+                tiktok_trending._response_cache.set(tiktok_trending._response_cache.make_key(params), data)
+                warmed += 1
+
+    # The same songs show up under every label filter and sort - refetch each series once per run
+    with tiktok_trending.refreshing_history():
+        await asyncio.gather(*(warm(params) for params in combos))
+    if warmed:
+        # API workers hold the previous pages in memory - make them read the new rows
+        tiktok_trending._response_cache.reload()
+    return {"combinations": len(combos), "warmed": warmed, "failed": failed}
+
+
+@tracked_job("prewarm_trending")
+def prewarm_trending_cache() -> Dict[str, Any]:
+    """Recompute trending lists + history series for the common filter combinations"""
+    if not settings.TIKTOK_TRENDING_CACHE_TTL_SECONDS:
+        logger.info("Trending cache disabled - nothing to pre-warm")
+        return {"skipped": True}
+
+    # History series of these combos are refetched and overwritten; every other cached
+    # series and trending response stays served until it is overwritten or expires
+    result = asyncio.run(_prewarm(prewarm_combinations()))
+    if result["combinations"] and not result["warmed"]:
+        raise RuntimeError(f"Pre-warm produced no results ({result['failed']} failures)")
+    return result
+
+
+@tracked_job("ingest", lock_ttl_seconds=6 * 3600)
+def run_ingestion() -> Dict[str, Any]:
+    """Daily chart ingestion - resumes the last unfinished run if there is one"""
+    from app.ingest import IngestionPipeline, find_resumable_run
+
+    db = SessionLocal()
+    try:
+        pipeline = IngestionPipeline(db, resume_run=find_resumable_run(db))
+        run = asyncio.run(pipeline.run())
+        return {"ingestion_run_id": run.id, **pipeline.stats}
+    finally:
+        db.close()
+
+
+@tracked_job("rescore_tracks", lock_ttl_seconds=3 * 3600)
+def rescore_tracks() -> Dict[str, Any]:
+    """Recompute trending and evergreen scores for every stored track"""
+    # Imported lazily - scoring pulls in numpy
+    from app.core.discovery.selectors import TrendingSelector, EvergreenSelector
+
+    db = SessionLocal()
+    try:
+        track_ids = [row[0] for row in db.query(Track.id).all()]
+        trending_run = TrendingSelector.run_discovery_batch(db, track_ids)
+        evergreen_run = EvergreenSelector.run_discovery_batch(db, track_ids)
+        return {
+            "tracks": len(track_ids),
+            "trending_scored": trending_run.tracks_updated,
+            "evergreen_scored": evergreen_run.tracks_updated,
+        }
+    finally:
+        db.close()
+
+
+@tracked_job("purge_shared_state", lock_ttl_seconds=600)
+def purge_shared_state() -> Dict[str, Any]:
+    """Delete expired shared state entries (abandoned OAuth logins and the like)"""
+    from app.core.state_store import get_state_store
+
+    return {"purged": get_state_store().purge_expired()}
+
+
+def build_scheduler(scheduler: Optional[BaseScheduler] = None, prewarm_on_start: bool = True) -> BaseScheduler:
+    """Scheduler with the pre-warm, ingestion, rescoring and cleanup jobs registered (not started)"""
+    scheduler = scheduler or BackgroundScheduler()
+    # New day of Chartex data - rebuild right after midnight
+    scheduler.add_job(
+        prewarm_trending_cache,
+        'cron',
+        hour=0,
+        minute=5,
+        name='daily_tiktok_refresh',
+        id='daily_tiktok_refresh',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600
+    )
+    # Keep entries fresh through the day - interval stays below the cache TTL
+    scheduler.add_job(
+        prewarm_trending_cache,
+        'interval',
+        minutes=settings.PREWARM_INTERVAL_MINUTES,
+        next_run_time=datetime.now() if prewarm_on_start else None,
+        name='prewarm_trending',
+        id='prewarm_trending',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=None  # The on-start run must not be dropped if startup is slow
+    )
+    # Ingest yesterday's charts, then rescore everything once it has landed
+    scheduler.add_job(
+        run_ingestion,
+        'cron',
+        hour=0,
+        minute=30,
+        name='daily_ingestion',
+        id='daily_ingestion',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600
+    )
+    scheduler.add_job(
+        rescore_tracks,
+        'cron',
+        hour=2,
+        minute=0,
+        name='rescore_tracks',
+        id='rescore_tracks',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600
+    )
+    scheduler.add_job(
+        purge_shared_state,
+        'interval',
+        hours=1,
+        name='purge_shared_state',
+        id='purge_shared_state',
+        coalesce=True,
+        max_instances=1
+    )
+    return scheduler
+
+
+def get_job_metrics(db, recent: int = 50) -> Dict[str, Dict[str, Any]]:
+    """Per-job run counts, failures and durations over the most recent runs"""
+    rows = db.query(DiscoveryRun).filter(
+        DiscoveryRun.run_type.like("job:%")
+    ).order_by(DiscoveryRun.started_at.desc()).limit(recent * 10).all()
+
+    metrics: Dict[str, Dict[str, Any]] = {}
+    for run in rows:
+        name = run.run_type[len("job:"):]
+        entry = metrics.setdefault(name, {"runs": 0, "failures": 0, "durations": [], "last": None})
+        if entry["runs"] >= recent:
+            continue
+        entry["runs"] += 1
+        if run.status == "failed":
+            entry["failures"] += 1
+        duration: Optional[float] = (run.config or {}).get("duration_seconds")
+        if duration is not None:
+            entry["durations"].append(duration)
+        if entry["last"] is None:
+            entry["last"] = run
+
+    result = {}
+    for name, entry in metrics.items():
+        last = entry["last"]
+        durations = entry["durations"]
+        result[name] = {
+            "runs": entry["runs"],
+            "failures": entry["failures"],
+            "failure_rate": round(entry["failures"] / entry["runs"], 3) if entry["runs"] else 0.0,
+            "avg_duration_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+            "max_duration_seconds": max(durations) if durations else None,
+            "last_status": last.status,
+            "last_started_at": last.started_at.isoformat(),
+            "last_completed_at": last.completed_at.isoformat() if last.completed_at else None,
+            "last_duration_seconds": (last.config or {}).get("duration_seconds"),
+            "last_error": last.error_message,
+            "last_result": {k: v for k, v in (last.config or {}).items() if k != "duration_seconds"},
+        }
+    return result
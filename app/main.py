@@ -1,103 +1,74 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi.responses import FileResponse, ORJSONResponse, RedirectResponse, Response
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime
+import asyncio
+import hmac
 import logging
 import time
 import sys
 
+_import_started = time.perf_counter()
+
 from app.api import auth, discover, mail, contracts
 from app.api.discovery import router as discovery_router
 from app.api.discovery.tiktok_trending import router as tiktok_trending_router
 from app.api.discovery.pinned_songs import router as pinned_songs_router
 from app.api.discovery.creators import router as creators_router
 from app.api.discovery.song_analytics import router as song_analytics_router
-
-# Configure logging - force unbuffered output
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout,
-    force=True
-)
+from app.core import metrics, tracing
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.log_config import begin_request, configure_logging
+from app.db.session import engine
+
+# Logs go through a queue to a background writer - see app.core.log_config for LOG_* settings
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Force unbuffered stdout/stderr
-sys.stdout.reconfigure(line_buffering=True)
-sys.stderr.reconfigure(line_buffering=True)
-
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
 app = FastAPI(
     title="A&R Portal",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse  # Large discovery payloads - see python -m app.serialization_bench
 )
 
 # Add rate limiter to app state
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# Daily data refresh scheduler
-def refresh_tiktok_data():
-    """Refresh TikTok trending data from Chartex API"""
-    try:
-        from app.api.discovery import tiktok_trending
-        logger.info(f"🔄 Starting daily TikTok data refresh at {datetime.now()}")
-        
-        # Clear the cache to force fresh data fetch
-        tiktok_trending._response_cache.clear()
-        
-        logger.info("✅ Cache cleared successfully. Fresh data will be fetched on next request.")
-    except Exception as e:
-        logger.error(f"❌ Error refreshing TikTok data: {str(e)}")
-
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    refresh_tiktok_data, 
-    'cron', 
-    hour=0,  # Run at midnight (00:00)
-    minute=0,
-    name='daily_tiktok_refresh'
-)
+# Background jobs (pre-warm, ingestion, rescoring) run in the worker process: python -m app.worker
+# Schema is managed by alembic migrations (alembic upgrade head), not created at startup
 
 @app.on_event("startup")
-def startup_event():
-    """Start the scheduler on app startup"""
-    # Initialize database tables
-    try:
-        from app.db.base import Base
-        from app.db.session import engine
-        from app.models.user import User
-        from app.models.discovery import Track, TrackMetric, TrackScore, Shortlist, DiscoveryRun, PinnedSong
-        
-        Base.metadata.create_all(bind=engine)
-        logger.info("✅ Database tables initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {str(e)}")
-    
-    # Clear cache on startup to ensure fresh data
-    try:
-        from app.api.discovery import tiktok_trending
-        tiktok_trending._response_cache.clear()
-        logger.info("🧹 Cleared TikTok data cache on startup")
-    except Exception as e:
-        logger.warning(f"⚠️  Could not clear cache on startup: {str(e)}")
-    
-    scheduler.start()
-    logger.info("🚀 Background scheduler started. Daily refresh scheduled at 00:00")
+async def startup_event():
+    """Publish this worker's metrics for /metrics on every worker"""
+    if settings.METRICS_ENABLED:
+        app.state.metrics_publisher = asyncio.create_task(_publish_metrics())
+
+async def _publish_metrics():
+    while True:
+        try:
+            await asyncio.to_thread(metrics.publish_snapshot)
+        except Exception as e:
+            logger.warning("⚠️  Publishing metrics failed: %s", e)
+        await asyncio.sleep(settings.METRICS_PUBLISH_SECONDS)
 
 @app.on_event("shutdown")
-def shutdown_event():
-    """Shutdown the scheduler on app shutdown"""
-    scheduler.shutdown()
-    logger.info("⛔ Background scheduler stopped")
+async def shutdown_event():
+    """Stop the contract render workers and LibreOffice converters, close pooled Graph connections"""
+    render_pool = sys.modules.get("app.core.contracts.render_pool")  # Not imported unless contracts were used
+    if render_pool is not None:
+        render_pool.shutdown_render_pool()
+    from app.core.converter_pool import shutdown_converter_pool
+    shutdown_converter_pool()
+    from app.core.graph_client import close_graph_client
+    await close_graph_client()
 
 # ------------------------
 # CORS
@@ -116,15 +87,49 @@ app.add_middleware(
 )
 
 # ------------------------
-# Request logging middleware
+# Compression (brotli when installed, else gzip) for JSON / text bodies
 # ------------------------
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+
+# ------------------------
+# Request logging + metrics + tracing middleware
+# ------------------------
+metrics.instrument_engine(engine)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    logger.info(f"➡️  {request.method} {request.url.path}{'?' + str(request.url.query) if request.url.query else ''}")
-    response = await call_next(request)
-    duration = time.time() - start_time
-    logger.info(f"⬅️  {request.method} {request.url.path} → {response.status_code} ({duration:.2f}s)")
+    start_time = time.perf_counter()
+    stats = metrics.start_request_stats()
+    request_id = begin_request(request.headers.get("x-request-id"))
+    trace_root = tracing.start_trace(
+        f"{request.method} {request.url.path}",
+        force=request.query_params.get("debug_timing") in ("1", "true"),
+        request_id=request_id
+    )
+    logger.info("➡️  %s %s", request.method, request.url.path)
+    status_code = 500
+    try:
+        with metrics.HTTP_REQUESTS_IN_FLIGHT.track_inprogress(method=request.method):
+            response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        duration = time.perf_counter() - start_time
+        # Route template (e.g. /api/mail/message/{message_id}), so ids don't explode label cardinality
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        metrics.HTTP_REQUEST_DURATION.observe(
+            duration, method=request.method, route=route_path, status=str(status_code)
+        )
+        metrics.HTTP_REQUEST_DB_QUERIES.observe(stats.db_queries, route=route_path)
+        if trace_root is not None:
+            trace_root.name = f"{request.method} {route_path}"
+            trace_root.set(status_code=status_code, db_queries=stats.db_queries)
+            tracing.finish_trace(trace_root)
+    logger.info(
+        "⬅️  %s %s → %s (%.2fs, %d queries)",
+        request.method, request.url.path, status_code, duration, stats.db_queries
+    )
+    response.headers["X-Request-ID"] = request_id
     return response
 
 # ------------------------
@@ -145,6 +150,9 @@ app.include_router(song_analytics_router)  # Detailed song analytics (TikTok + S
 app.include_router(mail.router)
 app.include_router(contracts.router)
 
+# Profile what dominates this with: python -m app.import_profile
+logger.info(f"🚀 App loaded in {time.perf_counter() - _import_started:.2f}s")
+
 # ------------------------
 # Public routes
 # ------------------------
@@ -192,3 +200,20 @@ def dashboard_creator_analytics():
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """
+    Prometheus text exposition of every worker's metrics (labelled worker=...)
+    Needs "Authorization: Bearer <METRICS_TOKEN>"; without a token configured only
+    loopback clients are answered.
+    """
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected.encode()):
+            return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        return Response(status_code=403)
+    return Response(content=metrics.render_all_workers(), media_type=metrics.CONTENT_TYPE)
@@ -202,3 +202,30 @@ class PinnedSong(Base):
     
     # Status
     is_active = Column(Boolean, default=True)
+
+
+class DiscoveryCache(Base):
+    """
+    Pre-computed discovery responses (trending lists, history series)
+    Written by background jobs, read by every API worker
+    """
+    __tablename__ = "discovery_cache"
+
+    cache_key = Column(String, primary_key=True)  # "{namespace}:{params hash}"
+    namespace = Column(String, nullable=False, index=True)  # e.g. tiktok_trending, tiktok_history
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class JobLock(Base):
+    """
+    Cross-process lock for scheduled jobs
+    A job runs only in the process that moves locked_until into the future.
+    """
+    __tablename__ = "job_locks"
+
+    name = Column(String, primary_key=True)  # Job name, e.g. prewarm_trending
+    owner = Column(String, nullable=True)  # "{hostname}:{pid}" of the holder
+    acquired_at = Column(DateTime, nullable=True)
+    locked_until = Column(DateTime, nullable=True)  # Expiry, so a crashed holder can't block forever
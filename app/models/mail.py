@@ -0,0 +1,45 @@
+"""
+Outreach mailbox cache
+Message headers of synced mail folders, kept up to date with Graph delta queries
+"""
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, JSON, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+from app.db.base import Base
+
+
+class MailMessage(Base):
+    """
+    Header of one message in a synced folder (bodies and attachments stay in Graph)
+    Deleted/moved messages are kept as tombstones so clients syncing with
+    ?since= learn about them.
+    """
+    __tablename__ = "mail_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    folder = Column(String, nullable=False)  # Folder id or well-known name (inbox, sentitems)
+    message_id = Column(String, nullable=False)  # Graph message id
+    conversation_id = Column(String, nullable=True, index=True)
+    sort_date = Column(DateTime, nullable=True)  # receivedDateTime, falling back to sentDateTime
+    header = Column(JSON, nullable=False)  # Graph fields from the header $select
+    changed_at = Column(Float, nullable=False)  # Sync clock value of the last change
+    removed = Column(Boolean, default=False, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'folder', 'message_id', name='uq_mail_messages_user_folder_message'),
+        Index('ix_mail_messages_user_folder_date', 'user_id', 'folder', 'sort_date'),
+        Index('ix_mail_messages_user_folder_changed', 'user_id', 'folder', 'changed_at'),
+    )
+
+
+class MailSyncState(Base):
+    """
+    Delta sync position of one user's folder
+    """
+    __tablename__ = "mail_sync_state"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    folder = Column(String, primary_key=True)
+    delta_link = Column(Text, nullable=True)  # @odata.deltaLink from the last completed sync
+    clock = Column(Float, nullable=False, default=0.0)  # changed_at of the last sync that changed anything
+    synced_at = Column(DateTime, nullable=True, default=datetime.utcnow)
@@ -0,0 +1,22 @@
+"""
+Shared short-lived state
+Key/value rows every API worker sees - OAuth login states, cache generations
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from datetime import datetime
+from app.db.base import Base
+
+
+class SharedState(Base):
+    """
+    One entry of the shared state store (see app.core.state_store)
+    Rows past expires_at are treated as missing and purged by the worker.
+    """
+    __tablename__ = "shared_state"
+
+    namespace = Column(String, primary_key=True)  # e.g. oauth_state, generation
+    key = Column(String, primary_key=True)
+    value = Column(JSON, nullable=True)
+    version = Column(Integer, default=0, nullable=False)  # incr() counter value; put() leaves it alone
+    expires_at = Column(DateTime, nullable=True, index=True)  # NULL = never expires
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
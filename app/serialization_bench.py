@@ -0,0 +1,105 @@
+"""
+JSON serialization benchmark for trending pages
+Times encoding one page of enriched songs (the /tiktok-trending/songs payload
+shape, with TikTok and Spotify history series) three ways:
+
+    fastapi   jsonable_encoder + json.dumps (FastAPI's default JSONResponse)
+    orjson    render_json (ORJSONResponse / json_response on a cache miss)
+    cached    CacheEntry.body on a cache hit - already encoded
+
+    python -m app.serialization_bench                    # 100 songs, 90 days of history
+    python -m app.serialization_bench --songs 50 --history-days 3 --repeat 50
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.http_cache import render_json
+
+
+def _series(days: int, base: int) -> List[Dict[str, Any]]:
+    start = date.today() - timedelta(days=days)
+    return [{"date": (start + timedelta(days=i)).isoformat(), "value": base + i * 37} for i in range(days)]
+
+
+def sample_page(songs: int = 100, history_days: int = 90) -> Dict[str, Any]:
+    """A trending page shaped like build_trending_response output"""
+    return {
+        "total": songs,
+        "songs": [
+            {
+                "id": f"spotify{i:06d}",
+                "title": f"Song {i}",
+                "artist": f"Artist {i % 37}",
+                "album_image": f"https://i.scdn.co/image/{i:032x}",
+                "spotify_id": f"spotify{i:06d}",
+                "tiktok_sound_id": str(7000000000000000000 + i),
+                "label": "Independent",
+                "distributor": "DistroKid",
+                "record_label": "Independent / DistroKid",
+                "tiktok_metrics": {
+                    "total_videos": 120000 + i,
+                    "last_7_days_videos": 8400 + i,
+                    "last_24h_videos": 1200 + i,
+                    "last_24h_percentage": 1.37,
+                    "total_sounds": 12,
+                    "sound_id": str(7000000000000000000 + i)
+                },
+                "spotify": None,
+                "history": {
+                    "tiktok": {"video_counts": _series(history_days, 100), "video_views": _series(history_days, 10 ** 6)},
+                    "spotify": {"streams": _series(history_days, 5000), "total_streams": 12345678}
+                }
+            }
+            for i in range(songs)
+        ],
+        "has_more": True,
+        "filters": {"sort_by": "tiktok_last_24_hours_video_count", "country_codes": None, "min_video_count": None}
+    }
+
+
+def fastapi_default(payload: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_ms(fn: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization of a trending page")
+    parser.add_argument("--songs", type=int, default=100)
+    parser.add_argument("--history-days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = sample_page(args.songs, args.history_days)
+    body = render_json(payload)
+    assert json.loads(body) == json.loads(fastapi_default(payload)), "encoders disagree"
+
+    print(f"{args.songs} songs, {args.history_days} days of history: {len(body) / 1024:.0f} KiB")
+    print(f"{'encoder':<10} {'median':>10} {'p95':>10}")
+    for name, fn in (
+        ("fastapi", lambda: fastapi_default(payload)),
+        ("orjson", lambda: render_json(payload)),
+        ("cached", lambda: body),
+    ):
+        timings = sorted(time_ms(fn, args.repeat))
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<10} {statistics.median(timings):>8.2f}ms {p95:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Background worker process
+Owns the scheduler (trending pre-warm, ingestion, rescoring) so API workers don't.
+
+    python -m app.worker
+
+Run one or more of these next to the web processes (see Procfile). Jobs take a
+DB lock before running, so extra worker instances never duplicate work.
+"""
+import logging
+import signal
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from app.core.log_config import configure_logging
+from app.jobs import build_scheduler
+
+logger = logging.getLogger("app.worker")
+
+
+def main():
+    configure_logging()
+
+    scheduler = build_scheduler(BlockingScheduler())
+
+    def handle_sigterm(signum, frame):
+        logger.info("⛔ SIGTERM received - stopping scheduler")
+        scheduler.shutdown(wait=False)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
+    logger.info("🚀 Worker started: " + ", ".join(job.name for job in scheduler.get_jobs()))
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    logger.info("⛔ Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 Ingest data from Chartex API
 - Evergreens: 10k+ daily streams for past year
 - Trending: TikTok, Spotify, and cross-platform
+
+Deprecated: use the unified pipeline instead - python -m app.ingest
 """
 import asyncio
 from datetime import datetime, timedelta
@@ -3,6 +3,8 @@ Data Ingestion Script for Discovery System
 Fetches data from Chartmetric and populates the database
 
 Run this daily via cron job or scheduled task
+
+Deprecated: use the unified pipeline instead - python -m app.ingest
 """
 import asyncio
 from datetime import datetime, timedelta
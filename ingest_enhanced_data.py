@@ -1,6 +1,8 @@
 """
 Enhanced Data Ingestion - Fetches both TikTok AND Spotify streaming data
 Plus historical metrics for evergreen detection
+
+Deprecated: use the unified pipeline instead - python -m app.ingest
 """
 import asyncio
 from datetime import datetime, timedelta
@@ -118,7 +120,7 @@ async def ingest_cross_platform_data(db: Session):
         tracks_skipped_major = 0
         tracks_skipped_no_label = 0
         
-        for idx, track_data in enumerate(tiktok_tracks[:50]):  # Process top 50
+        for idx, track_data in enumerate(tiktok_tracks):
             # Extract track info
             track_id = str(track_data.get("id") or track_data.get("cm_track"))
             track_name = track_data.get("name", "Unknown")
@@ -1,6 +1,8 @@
 """
 Real Data Ingestion from Chartmetric
 Filters for indie labels and DistroKid only
+
+Deprecated: use the unified pipeline instead - python -m app.ingest
 """
 import asyncio
 from datetime import datetime, timedelta
@@ -163,7 +165,7 @@ async def ingest_real_data(db: Session):
         tracks_skipped_major = 0
         tracks_skipped_no_label = 0
         
-        for idx, track_data in enumerate(all_tracks[:30]):  # Limit to avoid rate limits
+        for idx, track_data in enumerate(all_tracks):
             # Extract track info
             track_id = track_data.get("id") or track_data.get("cm_track")
             track_name = track_data.get("name") or track_data.get("track_name", "Unknown")
@@ -1,15 +1,16 @@
 """
 Initialize database tables
+Applies the alembic migrations - same as running: alembic upgrade head
 """
-from app.db.base import Base
-from app.db.session import engine
-from app.models.user import User
-from app.models.discovery import Track, TrackMetric, TrackScore, Shortlist, DiscoveryRun, PinnedSong
+from pathlib import Path
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+from alembic import command
+from alembic.config import Config
 
-print("✅ Database tables created successfully!")
+config = Config(str(Path(__file__).parent / "alembic.ini"))
+command.upgrade(config, "head")
+
+print("✅ Database migrated to the latest schema!")
 print("   - users")
 print("   - tracks")
 print("   - track_metrics")
@@ -17,3 +18,5 @@ print("   - track_scores")
 print("   - shortlists")
 print("   - discovery_runs")
 print("   - pinned_songs")
+print("   - discovery_cache")
+print("   - job_locks")
@@ -333,16 +333,11 @@ async function loadSongs(append = false) {
       
       console.log('Fetching TikTok trending with params:', params.toString());
       
-      // Add timestamp to prevent browser caching
-      params.append('_t', Date.now());
-      
       response = await fetch(`/api/discovery/tiktok-trending/songs?${params}`, {
         headers: {
-          'Authorization': `Bearer ${token}`,
-          'Cache-Control': 'no-cache, no-store, must-revalidate',
-          'Pragma': 'no-cache'
+          'Authorization': `Bearer ${token}`
         },
-        cache: 'no-store'  // Prevent browser from caching this request
+        cache: 'no-cache'  // Revalidate with the stored ETag - an unchanged page comes back as an empty 304
       });
     } else if (currentView === 'spotify-trending') {
       // Load Spotify trending data - sorted by Spotify streaming metrics
@@ -375,16 +370,11 @@ async function loadSongs(append = false) {
       
       console.log('Fetching Spotify trending with params:', params.toString());
       
-      // Add timestamp to prevent browser caching
-      params.append('_t', Date.now());
-      
       response = await fetch(`/api/discovery/tiktok-trending/songs?${params}`, {
         headers: {
-          'Authorization': `Bearer ${token}`,
-          'Cache-Control': 'no-cache, no-store, must-revalidate',
-          'Pragma': 'no-cache'
+          'Authorization': `Bearer ${token}`
         },
-        cache: 'no-store'
+        cache: 'no-cache'  // Revalidate with the stored ETag - an unchanged page comes back as an empty 304
       });
     } else {
       // Fallback  view
@@ -0,0 +1,60 @@
+"""
+Shared test setup
+Settings come from the environment, so the required ones get dummy values
+before anything under app/ is imported; shared state stays in process.
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AZURE_CLIENT_ID", "test-client")
+os.environ.setdefault("AZURE_TENANT_ID", "test-tenant")
+os.environ.setdefault("AZURE_CLIENT_SECRET", "test-secret")
+os.environ.setdefault("STATE_STORE_BACKEND", "memory")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+
+@pytest.fixture
+def db():
+    """Session on a fresh in-memory database with every model's table"""
+    from app.db.base import Base
+    import app.models.discovery  # noqa: F401 - registers the tables
+    import app.models.mail  # noqa: F401
+    import app.models.state  # noqa: F401
+    import app.models.user  # noqa: F401
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    """A users row and the AuthenticatedUser the endpoints receive for it"""
+    from app.core.security import AuthenticatedUser
+    from app.models.user import User
+
+    row = User(email="ar@example.com", name="A&R", role="user", is_active=True, microsoft_token="graph-token")
+    db.add(row)
+    db.commit()
+    return AuthenticatedUser(
+        id=row.id,
+        email=row.email,
+        name=row.name,
+        role=row.role,
+        is_active=row.is_active,
+        microsoft_token=row.microsoft_token,
+    )
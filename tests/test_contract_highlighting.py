@@ -0,0 +1,62 @@
+"""Highlighting of filled-in contract values (app/core/contracts/exporter.py)"""
+from docx import Document
+from docx.enum.text import WD_COLOR_INDEX
+
+from app.core.contracts.exporter import _build_matcher, _highlight_paragraph
+
+
+def _matches(matcher, text):
+    return [match.group(0) for match in matcher.finditer(text)]
+
+
+def test_matcher_without_values_is_none():
+    assert _build_matcher([]) is None
+
+
+def test_matcher_matches_whole_words_only():
+    matcher = _build_matcher(["50"])
+    assert _matches(matcher, "Clause 150 pays 50 percent") == ["50"]
+    assert _matches(matcher, "50-day term") == ["50"]
+    assert _matches(matcher, "x50 and 500") == []
+
+
+def test_matcher_prefers_the_longest_value():
+    matcher = _build_matcher(["John", "John Smith"])
+    assert _matches(matcher, "Signed by john smith and John") == ["john smith", "John"]
+
+
+def test_matcher_accepts_values_with_punctuation():
+    matcher = _build_matcher(["$1,000", "John Smith's"])
+    assert _matches(matcher, "An advance of $1,000 to John Smith's label") == [
+        "$1,000",
+        "John Smith's",
+    ]
+
+
+def _paragraph(*texts):
+    paragraph = Document().add_paragraph()
+    for text in texts:
+        paragraph.add_run(text)
+    return paragraph
+
+
+def _highlighted(paragraph):
+    return [run.text for run in paragraph.runs if run.font.highlight_color == WD_COLOR_INDEX.YELLOW]
+
+
+def test_highlight_marks_every_run_a_match_spans():
+    paragraph = _paragraph("Artist: Jo", "hn Sm", "ith", " signs today")
+    _highlight_paragraph(paragraph, _build_matcher(["John Smith"]))
+    assert _highlighted(paragraph) == ["Artist: Jo", "hn Sm", "ith"]
+
+
+def test_highlight_skips_values_inside_longer_numbers():
+    paragraph = _paragraph("See Clause 150", " for the ", "50", " split")
+    _highlight_paragraph(paragraph, _build_matcher(["50"]))
+    assert _highlighted(paragraph) == ["50"]
+
+
+def test_highlight_leaves_blank_paragraphs_alone():
+    paragraph = _paragraph("   ")
+    _highlight_paragraph(paragraph, _build_matcher(["50"]))
+    assert _highlighted(paragraph) == []
@@ -0,0 +1,101 @@
+"""Graph paging past the mail sync window (list_messages_before_window)"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import mail_sync
+from app.models.mail import MailMessage
+
+NEWEST = datetime(2026, 3, 1, 12, 0, 0)
+
+
+class _FakeGraph:
+    """Answers with `available` older messages and records the query"""
+
+    def __init__(self, available):
+        self.available = available
+        self.calls = []
+
+    async def get_json(self, path, token, params=None):
+        self.calls.append((path, token, params))
+        start = params["$skip"]
+        messages = [{"id": f"old-{n}"} for n in range(self.available)]
+        return {"value": messages[start:start + params["$top"]]}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    def install(available):
+        fake = _FakeGraph(available)
+        monkeypatch.setattr(mail_sync, "get_graph_client", lambda: fake)
+        return fake
+    return install
+
+
+def _cache(db, user, count, removed=0):
+    for n in range(count + removed):
+        db.add(MailMessage(
+            user_id=user.id,
+            folder="inbox",
+            message_id=f"m{n}",
+            sort_date=NEWEST - timedelta(hours=n),
+            header={"id": f"m{n}"},
+            changed_at=1.0,
+            removed=n >= count,
+        ))
+    db.commit()
+
+
+def _before_window(db, user, top, skip):
+    return asyncio.run(mail_sync.list_messages_before_window(db, user, "inbox", "/me/messages", top=top, skip=skip))
+
+
+def test_page_straddling_the_window_asks_only_for_the_rest(db, user, graph):
+    _cache(db, user, 30)
+    fake = graph(available=100)
+
+    messages, has_more = _before_window(db, user, top=50, skip=20)
+
+    (path, token, params), = fake.calls
+    assert path == "/me/messages"
+    assert token == "graph-token"
+    assert params["$skip"] == 0
+    assert params["$top"] == 41  # 40 past the 10 cached ones, plus one to detect more
+    assert params["$filter"] == "receivedDateTime lt 2026-02-28T07:00:00Z"
+    assert len(messages) == 40
+    assert has_more is True
+
+
+def test_page_past_the_window_skips_what_earlier_pages_read(db, user, graph):
+    _cache(db, user, 30)
+    fake = graph(available=15)
+
+    messages, has_more = _before_window(db, user, top=10, skip=40)
+
+    params = fake.calls[0][2]
+    assert params["$skip"] == 10
+    assert params["$top"] == 11
+    assert [message["id"] for message in messages] == [f"old-{n}" for n in range(10, 15)]
+    assert has_more is False
+
+
+def test_tombstones_do_not_count_as_cached(db, user, graph):
+    _cache(db, user, 30, removed=5)
+    fake = graph(available=100)
+
+    _before_window(db, user, top=50, skip=20)
+
+    assert fake.calls[0][2]["$top"] == 41
+
+
+def test_empty_cache_pages_graph_directly(db, user, graph):
+    fake = graph(available=100)
+
+    messages, has_more = _before_window(db, user, top=25, skip=50)
+
+    params = fake.calls[0][2]
+    assert (params["$skip"], params["$top"]) == (50, 26)
+    assert "$filter" not in params
+    assert len(messages) == 25
+    assert has_more is True
@@ -0,0 +1,63 @@
+"""Size bound and LRU order of the contract preview cache"""
+import os
+
+from app.core.contracts.preview_cache import PreviewCache
+
+
+def _age(cache, name, mtime):
+    """Pin an entry's LRU position (mtimes are too coarse to rely on within a test)"""
+    os.utime(cache.root / name, (mtime, mtime))
+
+
+def test_put_evicts_least_recently_used_entries(tmp_path):
+    cache = PreviewCache(tmp_path, max_bytes=250)
+    cache.put_page("p", 1, 100, "png", b"a" * 100)
+    _age(cache, "page-p-1-100-png", 1000)
+    cache.put_page("p", 2, 100, "png", b"b" * 100)
+    _age(cache, "page-p-2-100-png", 2000)
+
+    cache.put_page("p", 3, 100, "png", b"c" * 100)
+
+    assert cache.get_page("p", 1, 100, "png") is None
+    assert cache.get_page("p", 2, 100, "png") == b"b" * 100
+    assert cache.get_page("p", 3, 100, "png") == b"c" * 100
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_reads_refresh_the_lru_order(tmp_path):
+    cache = PreviewCache(tmp_path, max_bytes=250)
+    cache.put_page("p", 1, 100, "png", b"a" * 100)
+    _age(cache, "page-p-1-100-png", 1000)
+    cache.put_page("p", 2, 100, "png", b"b" * 100)
+    _age(cache, "page-p-2-100-png", 2000)
+
+    assert cache.get_page("p", 1, 100, "png") is not None  # Now the most recently used
+    cache.put_page("p", 3, 100, "png", b"c" * 100)
+
+    assert cache.get_page("p", 1, 100, "png") == b"a" * 100
+    assert cache.get_page("p", 2, 100, "png") is None
+
+
+def test_bound_holds_across_instances_sharing_the_directory(tmp_path):
+    first = PreviewCache(tmp_path, max_bytes=250)
+    second = PreviewCache(tmp_path, max_bytes=250)
+    for page in range(1, 6):
+        cache = first if page % 2 else second
+        cache.put_page("p", page, 100, "png", bytes([page]) * 100)
+        _age(cache, f"page-p-{page}-100-png", 1000 * page)
+
+    stats = first.stats()
+    assert stats["bytes"] <= 250
+    assert stats["entries"] == 2
+    assert second.get_page("p", 5, 100, "png") == bytes([5]) * 100
+
+
+def test_new_entry_is_kept_even_when_larger_than_the_bound(tmp_path):
+    cache = PreviewCache(tmp_path, max_bytes=50)
+    cache.put_page("p", 1, 100, "png", b"a" * 40)
+    _age(cache, "page-p-1-100-png", 1000)
+
+    cache.put_page("p", 2, 100, "png", b"b" * 100)
+
+    assert cache.get_page("p", 1, 100, "png") is None
+    assert cache.get_page("p", 2, 100, "png") == b"b" * 100
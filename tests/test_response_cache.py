@@ -0,0 +1,85 @@
+"""Expiry, LRU bound and invalidation of the in-process response cache"""
+import pytest
+
+from app.core.discovery import response_cache
+from app.core.discovery.response_cache import ResponseCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(response_cache.time, "time", fake.time)
+    monkeypatch.setattr(response_cache.time, "monotonic", fake.monotonic)
+    return fake
+
+
+def _cache(name, ttl=60, max_entries=100):
+    return ResponseCache(f"test_{name}", ttl, persist=False, max_entries=max_entries)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = _cache("expiry")
+    entry = cache.set("a", {"songs": [1]})
+    assert cache.get_entry("a") is entry
+
+    clock.now += 59
+    assert cache.get("a") == {"songs": [1]}
+    clock.now += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_zero_ttl_disables_caching(clock):
+    cache = _cache("disabled", ttl=0)
+    assert cache.set("a", 1) is None
+    assert cache.get("a") is None
+
+
+def test_expired_entries_are_swept_on_write(clock):
+    cache = _cache("sweep")
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock.now += response_cache._SWEEP_INTERVAL_SECONDS + 1
+
+    cache.set("c", 3)
+    assert len(cache) == 1
+    assert cache.get("c") == 3
+
+
+def test_least_recently_used_entries_go_first(clock):
+    cache = _cache("lru", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # b is now the least recently used
+
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_clear_and_reload_invalidate_other_instances(clock):
+    writer = _cache("shared")
+    reader = _cache("shared")  # Another worker's copy of the same namespace
+    reader.set("a", 1)
+
+    writer.clear()
+    clock.now += reader._generation.poll_seconds  # Next generation poll
+    assert reader.get("a") is None
+
+    reader.set("a", 2)
+    writer.reload()
+    clock.now += reader._generation.poll_seconds
+    assert reader.get("a") is None
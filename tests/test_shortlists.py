@@ -0,0 +1,94 @@
+"""Keyset pagination and counts of the shortlist listing"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.discovery.shortlists import get_shortlist
+from app.models.discovery import Shortlist, Track, TrackMetric
+
+ADDED = datetime(2026, 3, 1, 9, 0, 0)
+
+
+@pytest.fixture
+def items(db, user):
+    """Shortlist ids in display order; ties on priority and added_at fall back to the id"""
+    rows = [
+        # (track, priority, hours after ADDED, status)
+        ("t0", 0, 0, "new"),
+        ("t1", 2, 0, "contacted"),
+        ("t2", 1, 5, "new"),
+        ("t3", 1, 5, "new"),
+        ("t4", None, 3, "passed"),
+        ("t5", 1, 1, "new"),
+        ("t6", 0, 3, "contacted"),
+    ]
+    for track_id, *_ in rows:
+        db.add(Track(id=track_id, title=f"Song {track_id}", artist_name="Artist"))
+    for track_id, priority, hours, status in rows:
+        db.add(Shortlist(
+            track_id=track_id,
+            user_id=user.id,
+            priority=priority,
+            status=status,
+            added_at=ADDED + timedelta(hours=hours),
+        ))
+    # Track deleted since it was shortlisted - left out of the items and the counts
+    db.add(Shortlist(track_id="gone", user_id=user.id, priority=2, status="new", added_at=ADDED))
+    db.add(TrackMetric(track_id="t1", timestamp=ADDED, spotify_streams=100))
+    db.add(TrackMetric(track_id="t1", timestamp=ADDED + timedelta(days=1), spotify_streams=250))
+    db.commit()
+
+    shown = db.query(Shortlist).filter(Shortlist.track_id != "gone").all()
+    shown.sort(key=lambda item: (-(item.priority or 0), -item.added_at.timestamp(), -item.id))
+    return [item.id for item in shown]
+
+
+def _list(db, user, **kwargs):
+    params = {"status": None, "limit": None, "cursor": None, **kwargs}
+    return asyncio.run(get_shortlist(user=user, db=db, **params))
+
+
+def test_without_limit_returns_the_whole_list(db, user, items):
+    result = _list(db, user)
+    assert [item["id"] for item in result["items"]] == items
+    assert result["next_cursor"] is None
+    assert result["total"] == 7
+    assert result["status_counts"] == {"new": 4, "contacted": 2, "passed": 1}
+
+
+def test_cursor_pages_cover_the_list_once_in_order(db, user, items):
+    seen = []
+    cursor = None
+    while True:
+        result = _list(db, user, limit=2, cursor=cursor)
+        assert len(result["items"]) <= 2
+        seen.extend(item["id"] for item in result["items"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == items
+
+
+def test_status_filter_pages_and_counts(db, user, items):
+    first = _list(db, user, status="new", limit=3)
+    second = _list(db, user, status="new", limit=3, cursor=first["next_cursor"])
+    ids = [item["id"] for item in first["items"] + second["items"]]
+    assert ids == [item_id for item_id in items if item_id in set(ids)]
+    assert len(ids) == 4
+    assert second["next_cursor"] is None
+    assert first["total"] == second["total"] == 4
+
+
+def test_items_carry_the_latest_metric(db, user, items):
+    first = _list(db, user, limit=1)["items"][0]
+    assert first["track"]["id"] == "t1"
+    assert first["latest_metric"]["spotify_streams"] == 250
+    assert first["latest_score"] is None
+
+
+def test_invalid_cursor_is_rejected(db, user, items):
+    with pytest.raises(HTTPException) as error:
+        _list(db, user, limit=2, cursor="not-a-cursor")
+    assert error.value.status_code == 400
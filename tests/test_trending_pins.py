@@ -0,0 +1,126 @@
+"""Page arithmetic of pinned songs spliced into the trending chart"""
+import asyncio
+
+import pytest
+
+from app.api.discovery import tiktok_trending
+from app.core.discovery.response_cache import ResponseCache
+
+LIMIT = 10
+CHART = [{"spotify_id": f"s{i}", "title": f"Song {i}", "artist": "Artist"} for i in range(40)]
+
+
+def _pin(position, spotify_id):
+    return {
+        "id": position,
+        "spotify_id": spotify_id,
+        "song_name": f"Pinned {spotify_id}",
+        "artist_name": "Pinned Artist",
+        "label_name": None,
+        "pin_position": position,
+        "notes": None,
+    }
+
+
+# One pin that also charts organically (moves up from #16), one that doesn't chart
+PINS = [_pin(3, "s15"), _pin(12, "p1")]
+
+
+class _Snapshot:
+    generation = 1
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Organic chart pages served from CHART; returns the offsets built, in order"""
+    built = []
+
+    async def build_trending_response(**params):
+        built.append(params["offset"])
+        offset, limit = params["offset"], params["limit"]
+        songs = CHART[offset:offset + limit]
+        return {"songs": songs, "total": len(songs), "has_more": offset + limit < len(CHART)}
+
+    async def pinned_entry(pin, generation, spotify_client, include_history, history_days):
+        return {
+            "spotify_id": pin["spotify_id"],
+            "title": pin["song_name"],
+            "artist": pin["artist_name"],
+            "pinned": True,
+            "pin_position": pin["pin_position"],
+        }
+
+    monkeypatch.setattr(tiktok_trending, "build_trending_response", build_trending_response)
+    monkeypatch.setattr(tiktok_trending, "_pinned_entry", pinned_entry)
+    monkeypatch.setattr(tiktok_trending, "get_pinned_snapshot", lambda: _Snapshot())
+    for name in ("_response_cache", "_spliced_cache", "_pinned_cache"):
+        monkeypatch.setattr(tiktok_trending, name, ResponseCache(f"test{name}", 600, persist=False))
+    return built
+
+
+def _expected_chart():
+    """The whole chart with pins at their positions and the pinned songs dropped below"""
+    pinned = {pin["spotify_id"] for pin in PINS}
+    chart = [song["spotify_id"] for song in CHART if song["spotify_id"] not in pinned]
+    for pin in PINS:
+        chart.insert(pin["pin_position"] - 1, pin["spotify_id"])
+    return chart
+
+
+def _page(offset):
+    params = tiktok_trending.trending_params(limit=LIMIT, offset=offset)
+    data, _, _ = asyncio.run(tiktok_trending._splice_pinned_songs(PINS, params))
+    return data
+
+
+def test_paging_forward_covers_the_chart_once(builds):
+    expected = _expected_chart()
+    seen = []
+    offset = 0
+    while True:
+        data = _page(offset)
+        ids = [song["spotify_id"] for song in data["songs"]]
+        assert ids == expected[offset:offset + LIMIT]
+        seen.extend(ids)
+        if not data["has_more"]:
+            break
+        assert len(ids) == LIMIT  # Pages keep their length around the pins
+        offset += LIMIT
+
+    assert seen == expected
+    assert len(set(seen)) == len(seen)
+    assert builds == [0, 10, 20, 30]  # Each organic page built once
+
+
+def test_pins_land_on_their_positions(builds):
+    first, second = _page(0), _page(10)
+    assert first["songs"][2]["spotify_id"] == "s15"
+    assert first["songs"][2]["pinned"] is True
+    assert first["pinned"] == 1
+    assert second["songs"][1]["spotify_id"] == "p1"
+    assert [song["spotify_id"] for song in first["songs"]].count("s15") == 1
+
+
+def test_page_without_pins_or_shift_is_the_cached_organic_page(builds):
+    pins = [_pin(35, "p1")]
+    params = tiktok_trending.trending_params(limit=LIMIT, offset=0)
+    data, version, entry = asyncio.run(tiktok_trending._splice_pinned_songs(pins, params))
+    assert entry is not None and data is entry.value
+    assert version is not None
+    assert data["has_more"] is True
+
+
+def test_cold_deep_page_builds_only_the_window(builds):
+    data = _page(30)
+    assert builds == [20, 30]  # Pages above the window are not built
+    assert len(data["songs"]) == LIMIT
+
+
+def test_deep_page_counts_pinned_songs_from_cached_pages(builds):
+    for offset in (0, 10, 20):
+        _page(offset)
+    builds.clear()
+
+    data = _page(30)
+    assert [song["spotify_id"] for song in data["songs"]] == _expected_chart()[30:40]
+    assert builds == [30]  # Pages above come from the cache